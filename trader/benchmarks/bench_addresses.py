@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for address normalization on the bet path
+Compares re-running to_checksum_address with the interned Address lookup
+for the normalizations a single copy trade performs.
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from eth_utils import to_checksum_address
+from addresses import to_address
+
+WALLET = "0x9858effd232b4033e47d90003d41ec34ecaeda94"
+CONDITIONAL_TOKENS = "0x4d97dcd97ec945f40cf65f87097ace5ea0476045"
+ITERATIONS = int(os.environ.get('BENCH_ITERATIONS', '20000'))
+
+# Normalizations on one execute_polymarket_bet call:
+# get_usdc_balance x2, get_usdc_allowance (wallet + spender),
+# assess_trade, record_trade, bet template sender
+PER_TRADE = [WALLET, WALLET, WALLET, CONDITIONAL_TOKENS, CONDITIONAL_TOKENS, CONDITIONAL_TOKENS, WALLET]
+
+
+def bench(label, normalize):
+    for address in PER_TRADE:
+        normalize(address)  # warm up
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        for address in PER_TRADE:
+            normalize(address)
+    elapsed = time.perf_counter() - start
+    per_trade_us = elapsed / ITERATIONS * 1e6
+    print(f"{label:<24} {per_trade_us:8.2f} us/trade")
+    return per_trade_us
+
+
+def main():
+    print(f"Normalizing {len(PER_TRADE)} addresses per trade, {ITERATIONS} trades...")
+    checksum_us = bench("to_checksum_address", to_checksum_address)
+    interned_us = bench("to_address (interned)", to_address)
+    print(f"Saved per trade: {checksum_us - interned_us:.2f} us ({checksum_us / interned_us:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark for CLOB order submission
+Signs and submits orders against the local mock CLOB one request per order
+and through the batch endpoint, then cancels them in bulk. Set
+MOCK_CLOB_LATENCY_MS to model the network round trip.
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+os.environ.setdefault('MNEMONIC', "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about")
+os.environ.setdefault('MOCK_CLOB_LATENCY_MS', '20')
+
+from mock_clob import serve_in_thread
+from wallet_manager import WalletManager
+from clob_client import ClobClient, BUY
+
+ORDERS = int(os.environ.get('BENCH_ORDERS', '30'))
+TOKEN_ID = "71321045679252212594626385532706912750332728571942532289631379312455583992563"
+
+
+def make_specs():
+    return [{'token_id': TOKEN_ID, 'side': BUY, 'price': round(0.30 + i * 0.01, 2), 'size': 10} for i in range(ORDERS)]
+
+
+def main():
+    server, url = serve_in_thread()
+    client = ClobClient(WalletManager(), host=url)
+    print(f"{ORDERS} orders, mock latency {os.environ['MOCK_CLOB_LATENCY_MS']} ms")
+
+    start = time.perf_counter()
+    for spec in make_specs():
+        order = client.build_order(spec['token_id'], spec['side'], spec['price'], spec['size'])
+        client.post_orders([order])
+    single = time.perf_counter() - start
+    print(f"one request per order   {single * 1e3:8.1f} ms")
+
+    start = time.perf_counter()
+    results = client.place_orders(make_specs())
+    batched = time.perf_counter() - start
+    print(f"batched ({client.batch_size}/request)     {batched * 1e3:8.1f} ms  ({sum(r['success'] for r in results)} accepted)")
+
+    open_ids = [order['order_id'] for order in client.get_open_orders()]
+    start = time.perf_counter()
+    canceled = client.cancel_orders(open_ids)
+    print(f"bulk cancel             {(time.perf_counter() - start) * 1e3:8.1f} ms  ({len(canceled['canceled'])} canceled)")
+    print(f"Speedup: {single / batched:.1f}x, open after cancel: {len(client.get_open_orders())}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
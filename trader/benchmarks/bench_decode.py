@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark for decoding data-api position rows
+Decodes the scraper-backend closed-position dumps with json.loads into
+dicts and with the typed data_api decoder, reporting time and retained
+memory per row.
+"""
+
+import sys
+import os
+import json
+import time
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from data_api import decode_positions
+
+DUMP_DIR = os.environ.get('BENCH_DUMP_DIR', os.path.join(os.path.dirname(__file__), '..', '..', 'scraper-backend'))
+ROUNDS = int(os.environ.get('BENCH_ROUNDS', '5'))
+
+
+def load_bodies():
+    bodies = []
+    for name in sorted(os.listdir(DUMP_DIR)):
+        if name.startswith('0x') and name.endswith('.json'):
+            with open(os.path.join(DUMP_DIR, name), 'rb') as f:
+                bodies.append(f.read())
+    return bodies
+
+
+def bench(label, decode, bodies):
+    rows = sum(len(decode(body)) for body in bodies)  # warm up
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for body in bodies:
+            decode(body)
+    elapsed = (time.perf_counter() - start) / ROUNDS
+
+    tracemalloc.start()
+    kept = [decode(body) for body in bodies]
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+
+    print(f"{label:<22} {elapsed * 1e3:8.1f} ms  {rows / elapsed / 1e6:5.2f} M rows/s  {retained / rows:6.0f} B/row")
+    return elapsed
+
+
+def main():
+    bodies = load_bodies()
+    total = sum(len(body) for body in bodies)
+    print(f"{len(bodies)} dumps, {total / 1e6:.1f} MB")
+    dict_time = bench("json.loads (dicts)", json.loads, bodies)
+    typed_time = bench("decode_positions", decode_positions, bodies)
+    print(f"Speedup: {dict_time / typed_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the copy-trade hot path
+Runs a real TradingEngine against local stand-ins (mock_chain for the
+Polygon RPC, mock_data_api for closed-positions) and measures:
+
+- detection to submission: end of the poll that found the trade to the
+  return of eth_sendRawTransaction, from the trade's trace spans
+- sustained bets/sec with trades spread over many whales and markets
+- RPC calls per copied trade, by method
+- polling cycle time against the number of followed whales
+- memory per followed whale, registered and after its first poll
+
+Results are written as JSON (BENCH_OUTPUT, default
+results/hot_path-<commit>.json) so runs can be compared between commits;
+set BENCH_BASELINE to a previous result to print the change per metric.
+"""
+
+import sys
+import os
+import json
+import time
+import asyncio
+import hashlib
+import platform
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+os.environ.setdefault('MNEMONIC', "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about")
+os.environ.setdefault('WALLET_ACCOUNT_COUNT', '4')
+os.environ.setdefault('ALLOWED_CONTRACTS', "0x4D97DCd97eC945f40cF65F87097ACe5EA0476045")
+os.environ.setdefault('TRADE_EXECUTION_DELAY', '0')
+# Measure the bot, not its safety limits
+os.environ.setdefault('MAX_HOURLY_TRADES', '1000000000')
+os.environ.setdefault('MAX_DAILY_TRADES', '1000000000')
+os.environ.setdefault('MAX_DAILY_VOLUME_ETH', '1000000000')
+os.environ.setdefault('API_RATE_LIMIT_RPS', '100000')
+os.environ.setdefault('API_RATE_LIMIT_BURST', '100000')
+
+import requests
+from mock_chain import serve_in_thread as serve_chain
+from mock_data_api import PositionFeed, serve_in_thread as serve_data_api
+from log_pipeline import configure_logging, stop_logging
+from wallet_manager import WalletManager
+from web3_client import Web3Client
+from risk_manager import RiskManager
+from trading_logic import TradingEngine
+from whale_monitor import WhaleMonitor, WhaleConfig
+from addresses import to_address
+from tracing import tracer
+
+TRADES = int(os.environ.get('BENCH_TRADES', '200'))
+SUSTAINED_WHALES = int(os.environ.get('BENCH_SUSTAINED_WHALES', '100'))
+WHALE_COUNTS = [int(count) for count in os.environ.get('BENCH_WHALE_COUNTS', '10,100,1000').split(',')]
+CYCLES = int(os.environ.get('BENCH_CYCLES', '5'))
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def git_commit():
+    """(short commit, dirty) of the tree being measured, or (None, None) outside git"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def percentiles(values):
+    """count/mean/p50/p95/p99/max of a list of milliseconds"""
+    if not values:
+        return {'count': 0}
+    values = sorted(values)
+
+    def at(fraction):
+        return round(values[min(len(values) - 1, int(fraction * len(values)))], 3)
+
+    return {
+        'count': len(values),
+        'mean': round(sum(values) / len(values), 3),
+        'p50': at(0.50),
+        'p95': at(0.95),
+        'p99': at(0.99),
+        'max': round(values[-1], 3)
+    }
+
+
+def whale_addresses(count, salt):
+    return ['0x' + hashlib.sha256(f"{salt}-{index}".encode()).hexdigest()[:40] for index in range(count)]
+
+
+def follow(monitor, addresses):
+    for index, address in enumerate(addresses):
+        monitor.add_whale(WhaleConfig(address=address, name=f"bench-{index}", category='bench'))
+    return [to_address(address) for address in addresses]
+
+
+async def poll_all(monitor, addresses):
+    """One monitoring cycle over addresses, returning when their copy trades have finished"""
+    semaphore = asyncio.Semaphore(monitor.poll_concurrency)
+    await asyncio.gather(*(monitor._poll_whale(address, semaphore) for address in addresses))
+    await asyncio.gather(*monitor.copy_tasks)
+
+
+def rpc_calls(chain_url):
+    return requests.get(f"{chain_url}/stats", timeout=10).json()['calls']
+
+
+def span_latencies():
+    """Per-trace (poll to detection, detection to submission) in ms from the recorded spans"""
+    detected, polled, submitted = {}, {}, {}
+    for span in list(tracer.spans):
+        if span.name == 'check_whale_trades':
+            detected[span.trace_id] = span.end_ns
+            polled[span.trace_id] = (span.end_ns - span.start_ns) / 1e6
+        elif span.name == 'send_raw_transaction':
+            # The first tranche's send is the submission
+            submitted[span.trace_id] = min(span.end_ns, submitted.get(span.trace_id, span.end_ns))
+    return (
+        [polled[trace_id] for trace_id in submitted if trace_id in polled],
+        [(submitted[trace_id] - detected[trace_id]) / 1e6 for trace_id in submitted if trace_id in detected]
+    )
+
+
+async def bench_detection_to_submission(engine, feed):
+    """Trades copied one at a time, so each measures an idle bot's latency"""
+    monitor = engine.whale_monitor
+    addresses = follow(monitor, whale_addresses(10, 'latency'))
+    await poll_all(monitor, addresses)  # first responses cached; polls now revalidate
+
+    tracer.spans.clear()
+    for index in range(TRADES):
+        address = addresses[index % len(addresses)]
+        feed.add_trade(address)
+        await poll_all(monitor, [address])
+
+    polled, submitted = span_latencies()
+    return {
+        'poll_to_detection_ms': percentiles(polled),
+        'detection_to_submission_ms': percentiles(submitted)
+    }
+
+
+async def bench_sustained(engine, feed, chain_url):
+    """A burst of trades over many whales and markets, copied across the account lanes"""
+    monitor = engine.whale_monitor
+    addresses = follow(monitor, whale_addresses(SUSTAINED_WHALES, 'sustained'))
+    await poll_all(monitor, addresses)
+
+    for index in range(TRADES):
+        feed.add_trade(addresses[index % len(addresses)])
+
+    calls_before = rpc_calls(chain_url)
+    started = time.perf_counter()
+    # Polls read the newest 5 rows; keep polling until every trade was seen
+    pending = TRADES
+    while pending > 0:
+        seen = sum(len(monitor.recent_trades[address]) for address in addresses)
+        await poll_all(monitor, addresses)
+        found = sum(len(monitor.recent_trades[address]) for address in addresses) - seen
+        if not found:
+            break
+        pending -= found
+    elapsed = time.perf_counter() - started
+    calls_after = rpc_calls(chain_url)
+
+    calls = {method: calls_after[method] - calls_before.get(method, 0) for method in calls_after}
+    calls = {method: count for method, count in sorted(calls.items()) if count}
+    bets = calls.get('eth_sendRawTransaction', 0)
+    return {
+        'sustained': {
+            'trades': TRADES,
+            'bets': bets,
+            'seconds': round(elapsed, 3),
+            'bets_per_second': round(bets / elapsed, 2) if elapsed else None
+        },
+        'rpc_calls_per_trade': {
+            'total': round(sum(calls.values()) / TRADES, 2),
+            'by_method': {method: round(count / TRADES, 2) for method, count in calls.items()}
+        }
+    }
+
+
+async def bench_poll_cycles(engine, data_api_url):
+    """Full cycle over N whales with nothing new: first (200s) and steady state (304s)"""
+    cycles = {}
+    for count in WHALE_COUNTS:
+        monitor = WhaleMonitor(engine, engine.web3_client)
+        monitor.polymarket_data_api = data_api_url
+        addresses = follow(monitor, whale_addresses(count, f"cycle-{count}"))
+
+        started = time.perf_counter()
+        await poll_all(monitor, addresses)
+        first_ms = (time.perf_counter() - started) * 1000
+
+        steady = []
+        for _ in range(CYCLES):
+            started = time.perf_counter()
+            await poll_all(monitor, addresses)
+            steady.append((time.perf_counter() - started) * 1000)
+        await monitor.api_client.close()
+
+        steady.sort()
+        cycles[str(count)] = {
+            'first_ms': round(first_ms, 3),
+            'steady_ms': round(steady[len(steady) // 2], 3),
+            'steady_per_whale_ms': round(steady[len(steady) // 2] / count, 4)
+        }
+    return {'poll_cycle': cycles}
+
+
+async def bench_memory(engine, data_api_url):
+    """Traced bytes per followed whale: registered, then with its first response cached"""
+    count = max(WHALE_COUNTS)
+    monitor = WhaleMonitor(engine, engine.web3_client)
+    monitor.polymarket_data_api = data_api_url
+    addresses = whale_addresses(count, 'memory')
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        addresses = follow(monitor, addresses)
+        registered, _ = tracemalloc.get_traced_memory()
+        await poll_all(monitor, addresses)
+        polled, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    await monitor.api_client.close()
+
+    return {
+        'memory_per_whale_bytes': {
+            'whales': count,
+            'registered': round((registered - before) / count),
+            'after_first_poll': round((polled - before) / count)
+        }
+    }
+
+
+def flatten(results, prefix=''):
+    """Dotted metric name -> number for every numeric leaf"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline_path, results):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old, new = flatten(baseline['results']), flatten(results)
+    print(f"\nAgainst {baseline.get('commit')} ({baseline_path}):")
+    for name in sorted(set(old) & set(new)):
+        change = f"{(new[name] - old[name]) / old[name] * 100:+7.1f}%" if old[name] else '     n/a'
+        print(f"  {name:<58} {old[name]:>12} -> {new[name]:>12}  {change}")
+
+
+async def run(engine, feed, chain_url, data_api_url):
+    results = {}
+    print(f"Detection to submission over {TRADES} trades...")
+    results.update(await bench_detection_to_submission(engine, feed))
+    print(f"Sustained: {TRADES} trades over {SUSTAINED_WHALES} whales...")
+    results.update(await bench_sustained(engine, feed, chain_url))
+    print(f"Polling cycles for {WHALE_COUNTS} whales...")
+    results.update(await bench_poll_cycles(engine, data_api_url))
+    print("Memory per whale...")
+    results.update(await bench_memory(engine, data_api_url))
+    await engine.whale_monitor.api_client.close()
+    return results
+
+
+def main():
+    configure_logging(os.environ.get('LOG_LEVEL', 'WARNING'), 'text')
+    chain_server, chain_url = serve_chain()
+    feed = PositionFeed()
+    data_api_server, data_api_url = serve_data_api(feed)
+
+    os.environ['ETHEREUM_RPC_URL'] = chain_url
+    wallet_manager = WalletManager()
+    engine = TradingEngine(wallet_manager, Web3Client(wallet_manager), RiskManager())
+    engine.whale_monitor.polymarket_data_api = data_api_url
+
+    try:
+        results = asyncio.run(run(engine, feed, chain_url, data_api_url))
+    finally:
+        engine.account_scheduler.shutdown()
+        chain_server.shutdown()
+        data_api_server.shutdown()
+        stop_logging()
+
+    commit, dirty = git_commit()
+    report = {
+        'benchmark': 'hot_path',
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'config': {
+            'trades': TRADES,
+            'sustained_whales': SUSTAINED_WHALES,
+            'whale_counts': WHALE_COUNTS,
+            'accounts': wallet_manager.account_count,
+            'poll_concurrency': engine.whale_monitor.poll_concurrency,
+            'chain_latency_ms': float(os.environ.get('MOCK_CHAIN_LATENCY_MS', '0')),
+            'data_api_latency_ms': float(os.environ.get('MOCK_DATA_API_LATENCY_MS', '0')),
+            'pre_trade_simulation': engine.polymarket_client.simulate_bets
+        },
+        'results': results
+    }
+
+    output = os.environ.get('BENCH_OUTPUT') or os.path.join(RESULTS_DIR, f"hot_path-{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f"Wrote {output}")
+    if os.environ.get('BENCH_BASELINE'):
+        compare(os.environ['BENCH_BASELINE'], results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark for logging on the copy-trade path
+Replays the log calls one copy trade makes, as the code made them before
+(eleven eager f-string INFO lines written by a StreamHandler on the calling
+thread) and as it makes them now (lazy %-style calls, most at DEBUG, through
+the queue pipeline), and reports the time spent on the trading thread per
+trade. Output goes to os.devnull, so real stdout/pipe costs come on top of
+the baseline figure.
+"""
+
+import sys
+import os
+import time
+import logging
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from log_pipeline import configure_logging, stop_logging, JSONFormatter, TEXT_FORMAT
+import log_pipeline
+
+TRADES = int(os.environ.get('BENCH_TRADES', '20000'))
+
+logger = logging.getLogger('bench.trade_path')
+
+TX_HASH = '0x' + 'ab' * 32
+WHALE = '0x' + '12' * 20
+
+
+def eager_trade(i):
+    """The log calls of one copy trade before the overhaul"""
+    amount, balance, price = 25.0 + i % 7, 1_000_000_000 + i, 0.42
+    logger.info(f"Executing copy trade for whale-{i % 50}: {amount} USDC on market-{i % 200}")
+    logger.info(f"USDC balance: {balance / 1e6} USDC")
+    logger.info(f"Current gas price: {30_000_000_000 + i} wei")
+    logger.info(f"Executing Polymarket bet: {amount} USDC on outcome 1 (account {i % 4})")
+    logger.info(f"Trade assessment completed: approved={True}, risk_score={5}")
+    logger.info(f"USDC balance: {balance / 1e6} USDC")
+    logger.info(f"Placing bet: {amount} USDC on outcome 1 at price {price} (account {i % 4})")
+    logger.info(f"Expected tokens to receive: {amount / price}")
+    logger.info(f"Bet placed successfully: {TX_HASH}")
+    logger.info(f"Trade recorded: {amount / 2000} ETH to {WHALE}, tx: {TX_HASH}")
+    logger.info(f"Copy trade executed successfully: {amount} USDC via amm")
+
+
+def lazy_trade(i):
+    """The same trade's log calls after the overhaul"""
+    amount, balance, price = 25.0 + i % 7, 1_000_000_000 + i, 0.42
+    logger.info("Executing copy trade for %s: %s USDC on %s", f"whale-{i % 50}", amount, f"market-{i % 200}",
+                extra={'trace_id': TX_HASH[2:34], 'whale': WHALE})
+    logger.debug("USDC balance: %s units (account %s)", balance, i % 4)
+    logger.debug("Current gas price: %s wei", 30_000_000_000 + i)
+    logger.info("Executing Polymarket bet: %s USDC on outcome %s (account %s)", amount, 1, i % 4,
+                extra={'market_id': i % 200, 'amount_usdc': amount, 'account': i % 4})
+    logger.debug("Trade assessment completed: approved=%s, risk_score=%s", True, 5)
+    logger.debug("USDC balance: %s units (account %s)", balance, i % 4)
+    logger.debug("Placing bet: %s USDC on outcome %s at price %s (account %s)", amount, 1, price, i % 4)
+    logger.debug("Expected tokens to receive: %s", amount / price)
+    logger.info("Bet placed successfully: %s", TX_HASH, extra={'tx_hash': TX_HASH, 'amount_usdc': amount})
+    logger.debug("Trade recorded: %s ETH to %s, tx: %s", amount / 2000, WHALE, TX_HASH)
+    logger.info("Copy trade executed successfully: %s USDC via %s", amount, 'amm', extra={'venue': 'amm'})
+
+
+def bench(label, fn):
+    fn(0)  # warm up
+    start = time.perf_counter()
+    for i in range(TRADES):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    per_trade_us = elapsed / TRADES * 1e6
+    print(f"{label:<44} {per_trade_us:8.1f} us/trade on the trading thread")
+    return per_trade_us
+
+
+def direct_logging(devnull):
+    """basicConfig-style setup: format and write on the calling thread"""
+    stop_logging()
+    handler = logging.StreamHandler(devnull)
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(logging.INFO)
+
+
+def queued_logging(devnull):
+    """The pipeline, with its listener writing JSON to devnull"""
+    stop_logging()
+    configure_logging('INFO', 'json')
+    log_pipeline._listener.handlers[0].setStream(devnull)
+
+
+def drain_seconds() -> float:
+    start = time.perf_counter()
+    stop_logging()
+    return time.perf_counter() - start
+
+
+def main():
+    with open(os.devnull, 'w') as devnull:
+        print(f"Logging {TRADES} copy trades...")
+        direct_logging(devnull)
+        before_us = bench("before: f-strings, handler on caller thread", eager_trade)
+
+        queued_logging(devnull)
+        queued_us = bench("f-strings through the queue pipeline", eager_trade)
+        drain = drain_seconds()
+
+        queued_logging(devnull)
+        after_us = bench("after: lazy calls through the queue pipeline", lazy_trade)
+        drain_after = drain_seconds()
+
+    print(f"Listener drain after the loop: {drain * 1e3:.0f} ms / {drain_after * 1e3:.0f} ms (off the trading thread)")
+    print(f"Removed from each trade: {before_us - after_us:.1f} us ({before_us / after_us:.1f}x less; "
+          f"queue alone {before_us / queued_us:.1f}x)")
+
+    # JSON records carry the extra fields as keys
+    record = logging.LogRecord('bench', logging.INFO, __file__, 0, "Bet placed successfully: %s", (TX_HASH,), None)
+    record.tx_hash = TX_HASH
+    print(f"Sample record: {JSONFormatter().format(record)}")
+
+
+if __name__ == "__main__":
+    main()
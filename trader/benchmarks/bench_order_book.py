@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the local order book mirror
+Writes a seeded market-channel feed (book snapshots, then price_change
+messages) to JSONL, replays it through OrderBookMirror and checks every
+book against a plain dict rebuild. Pass a path to replay a feed recorded
+with ORDER_BOOK_RECORD_PATH instead.
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from order_book import OrderBookMirror, to_ticks
+
+TOKENS = int(os.environ.get('BENCH_TOKENS', '20'))
+MESSAGES = int(os.environ.get('BENCH_MESSAGES', '50000'))
+LOOKUPS = 200_000
+
+
+def write_feed(path: str, seed: int = 7):
+    """Seeded feed in the market channel's wire format"""
+    rng = random.Random(seed)
+    tokens = [str(rng.getrandbits(250)) for _ in range(TOKENS)]
+    with open(path, 'w') as f:
+        for token in tokens:
+            mid = rng.randint(10, 90) / 100
+            bids = [{'price': f"{mid - i / 100:.2f}", 'size': f"{rng.uniform(10, 500):.2f}"} for i in range(1, 6) if mid - i / 100 > 0]
+            asks = [{'price': f"{mid + i / 100:.2f}", 'size': f"{rng.uniform(10, 500):.2f}"} for i in range(1, 6) if mid + i / 100 < 1]
+            f.write(json.dumps({'event_type': 'book', 'asset_id': token, 'market': '0x', 'bids': bids, 'asks': asks, 'hash': '0x'}) + '\n')
+        for _ in range(MESSAGES):
+            token = rng.choice(tokens)
+            side = rng.choice(('BUY', 'SELL'))
+            price = f"{rng.randint(1, 99) / 100:.2f}"
+            size = '0' if rng.random() < 0.3 else f"{rng.uniform(1, 500):.2f}"
+            f.write(json.dumps({'event_type': 'price_change', 'market': '0x', 'price_changes': [
+                {'asset_id': token, 'price': price, 'size': size, 'side': side}
+            ]}) + '\n')
+
+
+def reference_books(path: str):
+    """Rebuild the final books with plain dicts"""
+    books = {}
+    with open(path) as f:
+        for line in f:
+            for event in (lambda m: m if isinstance(m, list) else [m])(json.loads(line)):
+                if event.get('event_type') == 'book':
+                    books[event['asset_id']] = (
+                        {to_ticks(l['price']): float(l['size']) for l in event['bids']},
+                        {to_ticks(l['price']): float(l['size']) for l in event['asks']}
+                    )
+                elif event.get('event_type') == 'price_change':
+                    changes = event.get('price_changes') or [dict(c, asset_id=event['asset_id']) for c in event.get('changes', [])]
+                    for change in changes:
+                        bids, asks = books.setdefault(change['asset_id'], ({}, {}))
+                        levels = bids if change['side'] == 'BUY' else asks
+                        tick = to_ticks(change['price'])
+                        if float(change['size']) > 0:
+                            levels[tick] = float(change['size'])
+                        else:
+                            levels.pop(tick, None)
+    return books
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(tempfile.gettempdir(), 'book_feed_bench.jsonl')
+    if len(sys.argv) <= 1:
+        write_feed(path)
+
+    mirror = OrderBookMirror()
+    start = time.perf_counter()
+    count = mirror.replay(path)
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {count} messages into {len(mirror.books)} books in {elapsed * 1e3:.1f} ms "
+          f"({count / elapsed:,.0f} msg/s, JSON decode included)")
+
+    mismatches = 0
+    for token, (bids, asks) in reference_books(path).items():
+        book = mirror.books[token]
+        if book.bids.sizes != bids or book.asks.sizes != asks or book.bids.ticks != sorted(bids) or book.asks.ticks != sorted(asks):
+            mismatches += 1
+    print(f"Books matching the dict rebuild: {len(mirror.books) - mismatches}/{len(mirror.books)}")
+
+    # Top of book: sorted array ends vs scanning a dict of levels
+    book = max(mirror.books.values(), key=lambda b: len(b.asks))
+    start = time.perf_counter()
+    for _ in range(LOOKUPS):
+        book.best_ask()
+    mirrored = time.perf_counter() - start
+    levels = dict(book.asks.sizes)
+    start = time.perf_counter()
+    for _ in range(LOOKUPS):
+        min(levels)
+    scanned = time.perf_counter() - start
+    print(f"best ask ({len(levels)} levels): {mirrored / LOOKUPS * 1e9:.0f} ns sorted array, {scanned / LOOKUPS * 1e9:.0f} ns dict scan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the bet signing path
+Compares WalletManager.sign_transaction with the pre-built template path.
+Runs offline: chain id, nonce and gas price are served by a local stand-in.
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+os.environ.setdefault(
+    "MNEMONIC",
+    "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+)
+
+from eth_utils import to_checksum_address
+from wallet_manager import WalletManager
+from tx_templates import TransactionTemplateCache, BUY_SELECTOR, encode_uint256
+
+MARKET_MAKER = to_checksum_address("0x89cb14b8e8cf0d5c3e7e6b9b0c0c0c0c0c0c0c0c")
+CHAIN_ID = 137
+GAS_PRICE = 30_000_000_000
+ITERATIONS = int(os.environ.get('BENCH_ITERATIONS', '2000'))
+
+
+class _OfflineEth:
+    chain_id = CHAIN_ID
+
+    def get_transaction_count(self, address, block_identifier=None):
+        return 0
+
+    def estimate_gas(self, transaction):
+        return 400000
+
+
+class _OfflineW3:
+    eth = _OfflineEth()
+
+
+class OfflineWeb3Client:
+    """Serves the fields the template cache pre-computes without an RPC node"""
+    w3 = _OfflineW3()
+
+    def get_gas_price(self) -> int:
+        return GAS_PRICE
+
+
+def bench(label, fn):
+    fn(0)  # warm up
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    per_call_us = elapsed / ITERATIONS * 1e6
+    print(f"{label:<32} {per_call_us:10.1f} us/sign")
+    return per_call_us
+
+
+def main():
+    wallet_manager = WalletManager()
+    templates = TransactionTemplateCache(OfflineWeb3Client(), wallet_manager)
+    templates.prepare()
+
+    def data_for(i):
+        return BUY_SELECTOR + encode_uint256(1) + encode_uint256(10_000_000 + i) + encode_uint256(5 * 10**17)
+
+    def legacy_sign(i):
+        wallet_manager.sign_transaction({
+            'to': MARKET_MAKER,
+            'value': 0,
+            'data': data_for(i),
+            'gas': 480000,
+            'gasPrice': GAS_PRICE,
+            'nonce': i,
+            'chainId': CHAIN_ID
+        })
+
+    def template_sign(i):
+        templates.sign_bet(MARKET_MAKER, 1, 10_000_000 + i, 5 * 10**17)
+
+    # The template path must produce the exact same bytes as eth-account
+    templates.reset_nonce()
+    fast = templates.sign_bet(MARKET_MAKER, 1, 10_000_000, 5 * 10**17)
+    reference = wallet_manager.sign_transaction({
+        'to': MARKET_MAKER,
+        'value': 0,
+        'data': data_for(0),
+        'gas': fast['gas'],
+        'gasPrice': GAS_PRICE,
+        'nonce': fast['nonce'],
+        'chainId': CHAIN_ID
+    })
+    assert fast['raw_transaction'][2:] == reference['raw_transaction'].replace('0x', ''), "template signature mismatch"
+    print("✓ Template path matches WalletManager.sign_transaction")
+
+    print(f"Signing {ITERATIONS} bet transactions...")
+    legacy_us = bench("WalletManager.sign_transaction", legacy_sign)
+    template_us = bench("TransactionTemplateCache.sign_bet", template_sign)
+    print(f"Speedup: {legacy_us / template_us:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Benchmark for whale trade history memory
+Compares a list of WhaleTrade records with the column-wise TradeHistory
+for a backtest-sized history.
+"""
+
+import sys
+import os
+import time
+import random
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from trade_history import TradeHistory, WhaleTrade
+
+TRADES = int(os.environ.get('BENCH_TRADES', '1000000'))
+WHALES = 2000
+MARKETS = 5000
+
+
+def make_trades(rng):
+    whales = ['0x' + rng.randbytes(20).hex() for _ in range(WHALES)]
+    markets = [f"market-{i}" for i in range(MARKETS)]
+    start = 1_700_000_000
+    for i in range(TRADES):
+        yield WhaleTrade(
+            whale_address=rng.choice(whales),
+            market_id=rng.choice(markets),
+            outcome=rng.randint(0, 1),
+            amount_usdc=round(rng.uniform(1, 5000), 2),
+            price=round(rng.random(), 3),
+            timestamp=start + i,
+            trade_hash='0x' + rng.randbytes(32).hex()
+        )
+
+
+def measure(label, build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    container = build(make_trades(random.Random(7)))
+    elapsed = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<26} {retained / 1e6:8.1f} MB  {retained / TRADES:6.0f} B/trade  (built in {elapsed:.1f}s)")
+    return container
+
+
+def main():
+    print(f"{TRADES} trades, {WHALES} whales, {MARKETS} markets")
+    records = measure("list[WhaleTrade]", list)
+    history = measure("TradeHistory (columns)", TradeHistory)
+    assert history[12345] == records[12345]
+    del records
+
+    start = time.perf_counter()
+    recent = history.since(1_700_000_000 + TRADES - 10000)
+    print(f"since() scan: {(time.perf_counter() - start) * 1e3:.1f} ms for {len(recent)} trades")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark for whale membership filtering
+Filters synthetic block-log topics and activity-feed rows against a
+leaderboard-sized follow list, compares the hash set with a Bloom-style
+probe of the same keys (why the index has no Bloom prefilter), and checks
+that membership tests do not intern the addresses they are asked about.
+"""
+
+import sys
+import os
+import time
+import random
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from whale_index import WhaleIndex
+from addresses import interned_count
+
+WHALES = int(os.environ.get('BENCH_WHALES', '10000'))
+ENTRIES = int(os.environ.get('BENCH_ENTRIES', '1000000'))
+HIT_RATE = 0.01
+
+
+def make_data(rng):
+    whales = [rng.randbytes(20) for _ in range(WHALES)]
+    topics = []
+    for _ in range(ENTRIES):
+        raw = rng.choice(whales) if rng.random() < HIT_RATE else rng.randbytes(20)
+        topics.append(b'\x00' * 12 + raw)
+    return whales, topics
+
+
+def bloom_probe(keys, bits_per_item: int = 10, hashes: int = 4):
+    """might_contain of a Bloom filter over keys, probing slices of the key as a prefilter would"""
+    size = max(64, len(keys) * bits_per_item)
+    counters = bytearray(size)
+    for raw in keys:
+        for i in range(hashes):
+            counters[int.from_bytes(raw[i * 4:i * 4 + 4], 'big') % size] = 1
+    return lambda raw: all(counters[int.from_bytes(raw[i * 4:i * 4 + 4], 'big') % size] for i in range(hashes))
+
+
+def bench(label, fn, count):
+    start = time.perf_counter()
+    matched = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {count / elapsed / 1e6:6.2f} M entries/s  ({len(matched)} matches)")
+
+
+def main():
+    rng = random.Random(1234)
+    whales, topics = make_data(rng)
+    rows = [{'proxyWallet': '0x' + topic[12:].hex()} for topic in topics[:ENTRIES // 10]]
+
+    index = WhaleIndex()
+    for raw in whales:
+        index.add(raw)
+
+    print(f"{WHALES} whales, {ENTRIES} log topics, {len(rows)} feed rows")
+    bench("filter_topics (hash set)", lambda: index.filter_topics(topics), len(topics))
+    might_contain = bloom_probe(whales)
+    bench("Bloom probe (for comparison)", lambda: [t for t in topics if might_contain(t[12:])], len(topics))
+    bench("filter_rows (hex feed rows)", lambda: list(index.filter_rows(rows)), len(rows))
+
+    # Membership tests on counterparties must not grow the intern table
+    before = interned_count()
+    bench("'in' (hex strings)", lambda: [row for row in rows if row['proxyWallet'] in index], len(rows))
+    print(f"addresses interned by 'in'          {interned_count() - before}")
+
+    # Incremental updates
+    start = time.perf_counter()
+    for raw in whales[:1000]:
+        index.remove(raw)
+        index.add(raw)
+    elapsed = time.perf_counter() - start
+    print(f"remove+add                          {elapsed / 1000 * 1e6:6.2f} us/update")
+
+
+if __name__ == "__main__":
+    main()
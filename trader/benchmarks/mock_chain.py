@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Mock Polygon JSON-RPC node
+Answers the calls the trader makes on the bet path (chain id, nonce, fees,
+USDC balance/allowance, calcBuyAmount, simulated buys, raw transaction
+submission and receipts) and counts every request by method, so benchmarks
+can report RPC calls per trade. Blocks advance every MOCK_CHAIN_BLOCK_SECONDS;
+a transaction gets its receipt in the block after it was sent.
+MOCK_CHAIN_LATENCY_MS adds a fixed delay per request to stand in for the
+network round trip.
+
+Run standalone:  python mock_chain.py  (serves on MOCK_CHAIN_PORT, default 8545)
+"""
+
+import sys
+import os
+import time
+import logging
+import threading
+from collections import Counter
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from flask import Flask, request, jsonify
+from werkzeug.serving import make_server
+from eth_utils import keccak
+
+LATENCY = float(os.environ.get('MOCK_CHAIN_LATENCY_MS', '0')) / 1000
+BLOCK_SECONDS = float(os.environ.get('MOCK_CHAIN_BLOCK_SECONDS', '2'))
+USDC_BALANCE = int(float(os.environ.get('MOCK_CHAIN_USDC_BALANCE', '5000')) * 1e6)
+
+CHAIN_ID = 137
+GAS_PRICE = 30 * 10**9
+ETH_BALANCE = 10**18
+
+BALANCE_OF = keccak(text="balanceOf(address)")[:4]
+ALLOWANCE = keccak(text="allowance(address,address)")[:4]
+CALC_BUY_AMOUNT = keccak(text="calcBuyAmount(uint256,uint256)")[:4]
+BUY = keccak(text="buy(uint256,uint256,uint256)")[:4]
+GET_PRICE = keccak(text="getPrice()")[:4]
+
+
+def word(value: int) -> str:
+    return int(value).to_bytes(32, 'big').hex()
+
+
+def tokens_for(amount_units: int) -> int:
+    """Outcome tokens (18 decimals) for amount_units of USDC on a deep curve at ~0.5"""
+    depth = 10**12  # 1M USDC of liquidity keeps copy-size impact far under the cap
+    return amount_units * 2 * 10**12 * depth // (depth + amount_units)
+
+
+def call_result(data: str) -> str:
+    """Return data of an eth_call, dispatched on the function selector"""
+    calldata = bytes.fromhex(data[2:] if data.startswith('0x') else data)
+    selector, args = calldata[:4], calldata[4:]
+    if selector == BALANCE_OF:
+        return '0x' + word(USDC_BALANCE)
+    if selector == ALLOWANCE:
+        return '0x' + word(2**256 - 1)
+    if selector == CALC_BUY_AMOUNT:
+        return '0x' + word(tokens_for(int.from_bytes(args[32:64], 'big')))
+    if selector == BUY:
+        amount_units = int.from_bytes(args[32:64], 'big')
+        tokens = tokens_for(amount_units)
+        return '0x' + word(tokens) + word(tokens) + word(amount_units // 50)
+    if selector == GET_PRICE:
+        return '0x' + word(5 * 10**17)
+    return '0x' + word(0)
+
+
+def create_app() -> Flask:
+    app = Flask(__name__)
+    started = time.time()
+    sent = {}  # tx hash -> block it was sent in
+    calls: Counter = Counter()
+    lock = threading.Lock()
+
+    def block_number() -> int:
+        return 1_000_000 + int((time.time() - started) / BLOCK_SECONDS)
+
+    def block(number: int) -> dict:
+        return {
+            'number': hex(number),
+            'hash': '0x' + keccak(number.to_bytes(8, 'big')).hex(),
+            'parentHash': '0x' + keccak((number - 1).to_bytes(8, 'big')).hex(),
+            'timestamp': hex(int(started + (number - 1_000_000) * BLOCK_SECONDS)),
+            'gasLimit': hex(30_000_000),
+            'gasUsed': '0x0',
+            'baseFeePerGas': hex(GAS_PRICE),
+            'miner': '0x' + '00' * 20,
+            'extraData': '0x',
+            'transactions': []
+        }
+
+    def receipt(tx_hash: str):
+        with lock:
+            sent_block = sent.get(tx_hash)
+        if sent_block is None or block_number() <= sent_block:
+            return None
+        number = sent_block + 1
+        return {
+            'transactionHash': tx_hash,
+            'transactionIndex': '0x0',
+            'blockNumber': hex(number),
+            'blockHash': block(number)['hash'],
+            'from': '0x' + '00' * 20,
+            'to': '0x' + '00' * 20,
+            'cumulativeGasUsed': hex(150_000),
+            'gasUsed': hex(150_000),
+            'effectiveGasPrice': hex(GAS_PRICE),
+            'contractAddress': None,
+            'logs': [],
+            'logsBloom': '0x' + '00' * 256,
+            'status': '0x1',
+            'type': '0x0'
+        }
+
+    def handle(method: str, params: list):
+        if method == 'eth_chainId':
+            return hex(CHAIN_ID)
+        if method == 'net_version':
+            return str(CHAIN_ID)
+        if method == 'web3_clientVersion':
+            return 'mock-chain/1.0'
+        if method == 'eth_blockNumber':
+            return hex(block_number())
+        if method == 'eth_getBlockByNumber':
+            tag = params[0] if params else 'latest'
+            return block(block_number() if tag in ('latest', 'pending', 'safe', 'finalized') else int(tag, 16))
+        if method == 'eth_gasPrice':
+            return hex(GAS_PRICE)
+        if method == 'eth_maxPriorityFeePerGas':
+            return hex(GAS_PRICE // 10)
+        if method == 'eth_getBalance':
+            return hex(ETH_BALANCE)
+        if method == 'eth_getTransactionCount':
+            return '0x0'  # templates keep their own nonce after the first read
+        if method == 'eth_estimateGas':
+            return hex(200_000)
+        if method == 'eth_call':
+            return call_result(params[0].get('data') or params[0].get('input') or '0x')
+        if method == 'eth_sendRawTransaction':
+            tx_hash = '0x' + keccak(bytes.fromhex(params[0][2:])).hex()
+            with lock:
+                sent[tx_hash] = block_number()
+            return tx_hash
+        if method == 'eth_getTransactionReceipt':
+            return receipt(params[0])
+        if method == 'eth_getLogs':
+            return []
+        raise KeyError(method)
+
+    def respond(payload: dict) -> dict:
+        method = payload.get('method', '')
+        with lock:
+            calls[method] += 1
+        try:
+            return {'jsonrpc': '2.0', 'id': payload.get('id'), 'result': handle(method, payload.get('params') or [])}
+        except KeyError:
+            return {'jsonrpc': '2.0', 'id': payload.get('id'), 'error': {'code': -32601, 'message': f"method {method} not supported"}}
+
+    @app.route('/', methods=['POST'])
+    def rpc():
+        if LATENCY:
+            time.sleep(LATENCY)
+        payload = request.get_json(force=True)
+        if isinstance(payload, list):
+            return jsonify([respond(entry) for entry in payload])
+        return jsonify(respond(payload))
+
+    @app.route('/stats', methods=['GET'])
+    def get_stats():
+        with lock:
+            return jsonify({'calls': dict(calls), 'transactions': len(sent), 'block_number': block_number()})
+
+    return app
+
+
+def serve_in_thread(port: int = 0):
+    """Start the mock on a background thread; returns (server, base_url)"""
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', port, create_app(), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+if __name__ == "__main__":
+    create_app().run(host='127.0.0.1', port=int(os.environ.get('MOCK_CHAIN_PORT', '8545')))
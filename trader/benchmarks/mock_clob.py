@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Mock Polymarket CLOB server
+Implements the order endpoints the trader uses (/order, /orders, /cancel-all,
+/data/orders) and API key derivation (/auth/derive-api-key, /auth/api-key).
+Like the real CLOB it ties each API key to one address and checks the L2
+HMAC of every order request, recovers the EIP-712 signer of every order,
+answers with the order hash as orderID and pages /data/orders. Open orders
+are kept in memory. MOCK_CLOB_LATENCY_MS adds a fixed delay per request to
+stand in for the network round trip.
+
+Run standalone:  python mock_clob.py  (serves on MOCK_CLOB_PORT, default 8765)
+"""
+
+import sys
+import os
+import time
+import base64
+import hashlib
+import logging
+import threading
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from flask import Flask, request, jsonify, abort
+from werkzeug.serving import make_server, WSGIRequestHandler
+from eth_keys import keys
+from clob_client import OrderSigner, clob_auth_hash, build_hmac_signature, END_CURSOR
+
+LATENCY = float(os.environ.get('MOCK_CLOB_LATENCY_MS', '0')) / 1000
+
+
+class PolyHeadersHandler(WSGIRequestHandler):
+    """Keeps the POLY_* headers, which the dev server drops for containing underscores"""
+
+    def make_environ(self):
+        environ = super().make_environ()
+        for key, value in self.headers.items():
+            if '_' in key:
+                environ[f"HTTP_{key.upper()}"] = value
+        return environ
+
+
+def _recover(signature_hex: str, message_hash: bytes) -> str:
+    signature = bytes.fromhex(signature_hex[2:])
+    return keys.Signature(signature[:64] + bytes([signature[64] - 27])).recover_public_key_from_msg_hash(
+        message_hash
+    ).to_checksum_address().lower()
+
+
+def create_app(chain_id: int = 137, exchange_address: str = None, page_size: int = 100) -> Flask:
+    app = Flask(__name__)
+    signer = OrderSigner(None, chain_id, exchange_address) if exchange_address else OrderSigner(None, chain_id)
+    orders = {}
+    api_keys = {}  # api_key -> (address, secret, passphrase)
+    stats = {'requests': 0, 'orders': 0}
+
+    @app.before_request
+    def simulate_latency():
+        stats['requests'] += 1
+        if LATENCY:
+            time.sleep(LATENCY)
+
+    @app.before_request
+    def authenticate():
+        if request.path.startswith('/auth/'):
+            headers = request.headers
+            digest = clob_auth_hash(chain_id, headers['POLY_ADDRESS'], headers['POLY_TIMESTAMP'], int(headers.get('POLY_NONCE', '0')))
+            if _recover(headers['POLY_SIGNATURE'], digest) != headers['POLY_ADDRESS'].lower():
+                abort(401)
+        elif request.path != '/stats':
+            # L2: the key must belong to POLY_ADDRESS and sign this request
+            credentials = api_keys.get(request.headers.get('POLY_API_KEY'))
+            if credentials is None or credentials[0] != request.headers.get('POLY_ADDRESS', '').lower():
+                abort(401)
+            expected = build_hmac_signature(credentials[1], request.headers.get('POLY_TIMESTAMP', ''), request.method,
+                                            request.path, request.get_data(as_text=True))
+            if request.headers.get('POLY_SIGNATURE') != expected or request.headers.get('POLY_PASSPHRASE') != credentials[2]:
+                abort(401)
+
+    @app.route('/auth/derive-api-key', methods=['GET'])
+    @app.route('/auth/api-key', methods=['POST'])
+    def derive_api_key():
+        address = request.headers['POLY_ADDRESS'].lower()
+        seed = hashlib.sha256(address.encode()).digest()
+        api_key = seed[:16].hex()
+        secret = base64.urlsafe_b64encode(seed).decode()
+        passphrase = seed[16:].hex()
+        api_keys[api_key] = (address, secret, passphrase)
+        return jsonify({'apiKey': api_key, 'secret': secret, 'passphrase': passphrase})
+
+    def accept(entry):
+        order = entry['order']
+        order_hash = signer.order_hash(order)
+        if _recover(order['signature'], order_hash) != order['signer'].lower():
+            return {'success': False, 'errorMsg': 'invalid signature'}
+        order_id = '0x' + order_hash.hex()
+        orders[order_id] = {'id': order_id, 'owner': request.headers.get('POLY_ADDRESS'), 'order': order}
+        stats['orders'] += 1
+        return {'success': True, 'errorMsg': '', 'orderID': order_id, 'status': 'live'}
+
+    @app.route('/order', methods=['POST'])
+    def post_order():
+        return jsonify(accept(request.get_json(force=True)))
+
+    @app.route('/orders', methods=['POST'])
+    def post_orders():
+        return jsonify([accept(entry) for entry in request.get_json(force=True)])
+
+    @app.route('/orders', methods=['DELETE'])
+    def cancel_orders():
+        canceled, not_canceled = [], {}
+        for order_id in request.get_json(force=True):
+            if orders.pop(order_id, None):
+                canceled.append(order_id)
+            else:
+                not_canceled[order_id] = 'order not found'
+        return jsonify({'canceled': canceled, 'not_canceled': not_canceled})
+
+    @app.route('/cancel-all', methods=['DELETE'])
+    def cancel_all():
+        owner = request.headers.get('POLY_ADDRESS')
+        canceled = [order_id for order_id, order in orders.items() if order['owner'] == owner]
+        for order_id in canceled:
+            del orders[order_id]
+        return jsonify({'canceled': canceled, 'not_canceled': {}})
+
+    @app.route('/data/orders', methods=['GET'])
+    def open_orders():
+        owner = request.headers.get('POLY_ADDRESS')
+        owned = [{'id': order['id']} for order in orders.values() if order['owner'] == owner]
+        cursor = request.args.get('next_cursor')
+        offset = int(base64.b64decode(cursor)) if cursor else 0
+        end = offset + page_size
+        next_cursor = base64.b64encode(str(end).encode()).decode() if end < len(owned) else END_CURSOR
+        return jsonify({'data': owned[offset:end], 'next_cursor': next_cursor, 'count': len(owned[offset:end])})
+
+    @app.route('/stats', methods=['GET'])
+    def get_stats():
+        return jsonify(dict(stats, open_orders=len(orders)))
+
+    return app
+
+
+def serve_in_thread(port: int = 0, **kwargs):
+    """Start the mock on a background thread; returns (server, base_url)"""
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', port, create_app(**kwargs), threaded=True, request_handler=PolyHeadersHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+if __name__ == "__main__":
+    create_app().run(host='127.0.0.1', port=int(os.environ.get('MOCK_CLOB_PORT', '8765')), request_handler=PolyHeadersHandler)
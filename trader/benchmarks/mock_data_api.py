@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Mock Polymarket data-api server
+Serves /closed-positions for any number of whales from an in-memory feed,
+newest row first, with ETag/If-None-Match revalidation like the real API.
+Each whale starts with a page of old (already settled) rows; benchmarks call
+PositionFeed.add_trade() to make a whale trade right now. MOCK_DATA_API_LATENCY_MS
+adds a fixed delay per request to stand in for the network round trip.
+
+Run standalone:  python mock_data_api.py  (serves on MOCK_DATA_API_PORT, default 8766)
+"""
+
+import sys
+import os
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from typing import Dict, List
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from flask import Flask, Response, request, jsonify
+from werkzeug.serving import make_server
+from data_api import ClosedPosition, encode
+
+LATENCY = float(os.environ.get('MOCK_DATA_API_LATENCY_MS', '0')) / 1000
+TOKEN_ID = "71321045679252212594626385532706912750332728571942532289631379312455583992563"
+
+
+class PositionFeed:
+    """closed-positions rows per whale"""
+
+    def __init__(self, history_rows: int = 5):
+        self.history_rows = history_rows
+        self.rows: Dict[str, List[ClosedPosition]] = {}
+        self.trades = 0
+        self._lock = threading.Lock()
+
+    def _row(self, address: str, timestamp: int, market: str) -> ClosedPosition:
+        return ClosedPosition(
+            proxy_wallet=address,
+            asset=TOKEN_ID,
+            condition_id='0x' + hashlib.sha256(market.encode()).hexdigest(),
+            avg_price=0.42,
+            total_bought=250.0,
+            cur_price=0.45,
+            title=f"Will {market} happen?",
+            slug=market,
+            outcome='Yes',
+            outcome_index=0,
+            amount=250.0,
+            timestamp=timestamp,
+            tx_hash='0x' + uuid.uuid4().hex + uuid.uuid4().hex
+        )
+
+    def rows_for(self, address: str) -> List[ClosedPosition]:
+        address = address.lower()
+        with self._lock:
+            rows = self.rows.get(address)
+            if rows is None:
+                # Settled a day ago: outside the monitor's five-minute window
+                settled = int(time.time()) - 86_400
+                rows = [self._row(address, settled - i * 60, f"settled-{address[2:10]}-{i}") for i in range(self.history_rows)]
+                self.rows[address] = rows
+            return rows
+
+    def add_trade(self, address: str, market: str = None) -> str:
+        """Record a trade the whale made just now; returns its tx hash"""
+        rows = self.rows_for(address)
+        with self._lock:
+            self.trades += 1
+            row = self._row(address.lower(), int(time.time()), market or f"market-{self.trades}")
+            rows.insert(0, row)
+        return row.tx_hash
+
+
+def create_app(feed: PositionFeed) -> Flask:
+    app = Flask(__name__)
+    stats = {'requests': 0, 'not_modified': 0}
+
+    @app.before_request
+    def simulate_latency():
+        stats['requests'] += 1
+        if LATENCY:
+            time.sleep(LATENCY)
+
+    @app.route('/closed-positions', methods=['GET'])
+    def closed_positions():
+        limit = int(request.args.get('limit', 10))
+        offset = int(request.args.get('offset', 0))
+        body = encode(feed.rows_for(request.args.get('user', ''))[offset:offset + limit])
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        if request.headers.get('If-None-Match') == etag:
+            stats['not_modified'] += 1
+            return Response(status=304, headers={'ETag': etag})
+        return Response(body, mimetype='application/json', headers={'ETag': etag})
+
+    @app.route('/stats', methods=['GET'])
+    def get_stats():
+        return jsonify(dict(stats, whales=len(feed.rows), trades=feed.trades))
+
+    return app
+
+
+def serve_in_thread(feed: PositionFeed, port: int = 0):
+    """Start the mock on a background thread; returns (server, base_url)"""
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', port, create_app(feed), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+if __name__ == "__main__":
+    create_app(PositionFeed()).run(host='127.0.0.1', port=int(os.environ.get('MOCK_DATA_API_PORT', '8766')))
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Deterministic replay of recorded whale activity
+Feeds recorded closed-positions responses into a real WhaleMonitor and
+TradingEngine on a virtual clock, one monitoring cycle at a time and as fast
+as the copies execute, so a day of whale behaviour replays in minutes.
+
+Sources (REPLAY_SOURCE):
+- a JSONL recording written by the monitor with WHALE_RECORD_PATH; each
+  whale's response is served as of its capture time
+- a scraper-backend directory of <address>.json dumps (the default); the
+  dumps carry no trade times, so each position is placed a deterministic
+  (hash-derived) 0..REPLAY_DUMP_HOLD_HOURS before its market's end date
+
+Bets go to REPLAY_RPC_URL, a local fork (e.g. anvil --fork-url <polygon rpc>);
+its accounts are funded with ETH and USDC through anvil_* calls. Without it
+they go to mock_chain. The report carries the production metrics (detection
+lag, queue wait, pre-trade read, signing, RPC latency, copy outcomes) plus
+detection-to-submission from trace spans, fills and missed trades; the raw
+/metrics text is written next to it.
+"""
+
+import sys
+import os
+import json
+import time
+import asyncio
+import hashlib
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+os.environ.setdefault('MNEMONIC', "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about")
+os.environ.setdefault('ALLOWED_CONTRACTS', "0x4D97DCd97eC945f40cF65F87097ACe5EA0476045")
+# Every copy of a cycle is collected before the clock moves on
+os.environ.setdefault('EVENT_SUBSCRIBER_BUFFER', '100000')
+
+import msgspec
+from mock_chain import serve_in_thread as serve_chain
+from log_pipeline import configure_logging, stop_logging
+from wallet_manager import WalletManager
+from web3_client import Web3Client
+from risk_manager import RiskManager
+from trading_logic import TradingEngine
+from whale_monitor import WhaleConfig
+from data_api import ClosedPosition, decode_recorded_response, load_position_dumps, timestamp_to_epoch
+from metrics import (COPY_TRADES, DETECTION_LAG, PRETRADE_READ, QUEUE_WAIT, RPC_BUCKETS, RPC_LATENCY,
+                     SIGN_TIME, SUBMIT_TO_INCLUSION, Histogram, render_metrics)
+from tracing import tracer
+
+DEFAULT_SOURCE = os.path.join(os.path.dirname(__file__), '..', '..', 'scraper-backend')
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+DETECTION_TO_SUBMISSION = Histogram(
+    'replay_detection_to_submission_seconds', 'Detection of a whale trade to return of its first eth_sendRawTransaction', buckets=RPC_BUCKETS)
+
+
+class VirtualClock:
+    """Replay time: set at each cycle, advancing with real time within it"""
+
+    def __init__(self, start: float):
+        self.now = start
+        self._anchor = time.perf_counter()
+
+    def __call__(self) -> float:
+        return self.now + (time.perf_counter() - self._anchor)
+
+    def advance_to(self, now: float):
+        self.now = now
+        self._anchor = time.perf_counter()
+
+
+class RecordedTimeline:
+    """One whale's captured responses, each served from its capture time on"""
+
+    def __init__(self):
+        self.times: List[float] = []
+        self.responses: List[List[ClosedPosition]] = []
+
+    def add(self, ts: float, rows: List[ClosedPosition]):
+        self.times.append(ts)
+        self.responses.append(rows)
+
+    def at(self, now: float, limit: int, offset: int = 0) -> Tuple[int, List[ClosedPosition]]:
+        """(version, newest rows) as the data-api returned them at now"""
+        index = bisect_right(self.times, now)
+        return index, (self.responses[index - 1][offset:offset + limit] if index else [])
+
+    def trade_hashes(self, start: float, end: float) -> set:
+        return {row.tx_hash for rows in self.responses for row in rows
+                if row.tx_hash and start <= (timestamp_to_epoch(row.timestamp) or 0) < end}
+
+    def bounds(self) -> Tuple[float, float]:
+        return self.times[0], self.times[-1]
+
+
+class PositionTimeline:
+    """One whale's positions, each appearing in the feed at its trade time"""
+
+    def __init__(self, rows: List[ClosedPosition]):
+        self.rows = sorted(rows, key=lambda row: row.timestamp)
+        self.times = [row.timestamp for row in self.rows]
+
+    def at(self, now: float, limit: int, offset: int = 0) -> Tuple[int, List[ClosedPosition]]:
+        index = bisect_right(self.times, now)
+        end = max(0, index - offset)
+        return index, self.rows[max(0, end - limit):end][::-1]
+
+    def trade_hashes(self, start: float, end: float) -> set:
+        return {row.tx_hash for row in self.rows if start <= row.timestamp < end}
+
+    def bounds(self) -> Tuple[float, float]:
+        return self.times[0], self.times[-1]
+
+
+def load_recording(path: str) -> Dict[str, RecordedTimeline]:
+    """Timelines from a WHALE_RECORD_PATH recording"""
+    timelines: Dict[str, RecordedTimeline] = defaultdict(RecordedTimeline)
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                response = decode_recorded_response(line)
+                timelines[response.whale.lower()].add(response.ts, response.rows)
+    return dict(timelines)
+
+
+def load_dumps(directory: str, hold_hours: float) -> Dict[str, PositionTimeline]:
+    """Timelines from scraper-backend dumps, with trade fields derived from each position"""
+    timelines = {}
+    for address, positions in load_position_dumps(directory).items():
+        rows = []
+        for position in positions:
+            try:
+                end = timestamp_to_epoch(position.end_date)
+            except ValueError:
+                end = None
+            if not end:
+                continue
+            digest = hashlib.blake2b(f"{address}:{position.asset}:{position.condition_id}".encode(), digest_size=32).digest()
+            held = int.from_bytes(digest[:4], 'big') / 2**32 * hold_hours * 3600
+            rows.append(msgspec.structs.replace(
+                position,
+                timestamp=int(end - held),
+                amount=round(position.total_bought * position.avg_price, 6),
+                tx_hash='0x' + digest.hex()
+            ))
+        if rows:
+            timelines[address] = PositionTimeline(rows)
+    return timelines
+
+
+def default_start(timelines: Dict[str, Any]) -> float:
+    """First capture of a recording, or the start (UTC midnight) of the dumps' busiest day"""
+    if any(isinstance(timeline, RecordedTimeline) for timeline in timelines.values()):
+        return min(timeline.bounds()[0] for timeline in timelines.values())
+    days = Counter(row.timestamp // 86400 for timeline in timelines.values() for row in timeline.rows)
+    return days.most_common(1)[0][0] * 86400.0
+
+
+class ReplayDataSource:
+    """Stands in for the monitor's PolymarketAPIClient, answering from timelines at the virtual time"""
+
+    def __init__(self, timelines: Dict[str, Any], clock: VirtualClock):
+        self.timelines = timelines
+        self.clock = clock
+        self.rate = float(os.environ.get('API_RATE_LIMIT_RPS', '5'))
+        self.versions: Dict[Tuple[str, int], int] = {}
+        self.requests = 0
+        self.unchanged = 0
+
+    async def get_json_conditional(self, url: str, params: Optional[Dict[str, Any]] = None, decoder=None) -> Tuple[Optional[Any], bool]:
+        self.requests += 1
+        user = str(params['user']).lower()
+        timeline = self.timelines.get(user)
+        if timeline is None:
+            return [], False
+        offset = int(params.get('offset', 0))
+        version, rows = timeline.at(self.clock(), int(params.get('limit', 10)), offset)
+        changed = self.versions.get((user, offset)) != version
+        self.versions[(user, offset)] = version
+        if not changed:
+            self.unchanged += 1
+        return rows, changed
+
+    def current_rate(self, url_or_host: str) -> float:
+        return self.rate
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'requests': self.requests, 'unchanged': self.unchanged}
+
+    async def close(self):
+        pass
+
+
+def fund_fork_accounts(engine, usdc: float):
+    """Give every derived account gas and USDC on an anvil fork (bets approve their spender themselves)"""
+    client = engine.polymarket_client
+    provider = engine.web3_client.w3.provider
+    for index in range(engine.wallet_manager.account_count):
+        address = engine.wallet_manager.get_address(index)
+        provider.make_request('anvil_setBalance', [address, hex(10**20)])
+        override = client.simulator.build_state_override(address, int(usdc * 1e6))
+        for slot, value in override[client.USDC_CONTRACT]['stateDiff'].items():
+            provider.make_request('anvil_setStorageAt', [client.USDC_CONTRACT, slot, value])
+
+
+def collect_submissions():
+    """Observe detection to submission for the traces of the last cycle"""
+    detected, submitted = {}, {}
+    for span in list(tracer.spans):
+        if span.name == 'check_whale_trades':
+            detected[span.trace_id] = span.end_ns
+        elif span.name == 'send_raw_transaction':
+            submitted[span.trace_id] = min(span.end_ns, submitted.get(span.trace_id, span.end_ns))
+    for trace_id, sent_ns in submitted.items():
+        if trace_id in detected:
+            DETECTION_TO_SUBMISSION.observe((sent_ns - detected[trace_id]) / 1e9)
+    tracer.spans.clear()
+
+
+async def replay(engine, timelines, start: float, end: float) -> Dict[str, Any]:
+    monitor = engine.whale_monitor
+    clock = VirtualClock(start)
+    source = ReplayDataSource(timelines, clock)
+    monitor.api_client = source
+    monitor.clock = clock
+    engine.risk_manager.clock = clock
+    configured_delay = monitor.trade_execution_delay
+    monitor.trade_execution_delay = 0  # Skipped in virtual time; reported as configured
+
+    for address in sorted(timelines):
+        monitor.add_whale(WhaleConfig(address=address, name=address[:10], category='replay'))
+
+    events = engine.event_bus.subscribe(['copy_fill', 'copy_failed', 'risk_rejected', 'bet_failed'])
+    fills = Counter()
+    fill_usdc = defaultdict(float)
+    whale_fills = Counter()
+    failures = Counter()
+    rejections = Counter()
+
+    semaphore = asyncio.Semaphore(monitor.poll_concurrency)
+    cycles = polls = 0
+    wall_started = time.perf_counter()
+    now = start
+    while now < end:
+        clock.advance_to(now)
+        batch = monitor.scheduler.next_batch(clock())
+        await asyncio.gather(*(monitor._poll_whale(address, semaphore) for address in batch))
+        await asyncio.gather(*monitor.copy_tasks)
+        cycles += 1
+        polls += len(batch)
+
+        collect_submissions()
+        for event in events.get(0)[0]:
+            data = event['data']
+            if event['type'] == 'copy_fill':
+                fills[data['venue']] += 1
+                fill_usdc[data['venue']] += data['amount_usdc']
+                whale_fills[data['whale_address']] += 1
+            elif event['type'] == 'risk_rejected':
+                rejections[data['reason'].split(':')[0]] += 1
+            else:
+                failures[event['type']] += 1
+        now += monitor.check_interval
+    wall = time.perf_counter() - wall_started
+    events.close()
+
+    in_window = {address: timeline.trade_hashes(start, end) for address, timeline in timelines.items()}
+    copied = {trade.trade_hash for trade in monitor.trade_history}
+    detected = sum(len(hashes & copied) for hashes in in_window.values())
+    return {
+        'replay': {
+            'cycles': cycles,
+            'polls': polls,
+            'data_api_requests': source.requests,
+            'unchanged_responses': source.unchanged,
+            'virtual_seconds': round(end - start, 1),
+            'wall_seconds': round(wall, 3),
+            'speedup': round((end - start) / wall, 1) if wall else None,
+            'execution_delay_seconds': configured_delay
+        },
+        'trades': {
+            'in_window': sum(len(hashes) for hashes in in_window.values()),
+            'detected_in_window': detected,
+            'copy_outcomes': {','.join(labels): int(count) for labels, count in COPY_TRADES.values.items()},
+            'fills': dict(fills),
+            'fill_usdc': {venue: round(amount, 6) for venue, amount in fill_usdc.items()},
+            'top_whales_by_fills': dict(whale_fills.most_common(10)),
+            'failures': dict(failures),
+            'risk_rejections': dict(rejections)
+        },
+        'latency_seconds': {
+            'detection_lag': DETECTION_LAG.summary().get('', {}),
+            'detection_to_submission': DETECTION_TO_SUBMISSION.summary().get('', {}),
+            'queue_wait_by_account': QUEUE_WAIT.summary(),
+            'pretrade_read': PRETRADE_READ.summary().get('', {}),
+            'sign': SIGN_TIME.summary(),
+            'submit_to_inclusion': SUBMIT_TO_INCLUSION.summary(),
+            'rpc_by_method': RPC_LATENCY.summary()
+        }
+    }
+
+
+def parse_time(value: str) -> float:
+    return float(value) if value.replace('.', '', 1).isdigit() else float(timestamp_to_epoch(value))
+
+
+def main():
+    configure_logging(os.environ.get('LOG_LEVEL', 'WARNING'), 'text')
+    source = os.environ.get('REPLAY_SOURCE', DEFAULT_SOURCE)
+    if os.path.isdir(source):
+        timelines = load_dumps(source, float(os.environ.get('REPLAY_DUMP_HOLD_HOURS', '72')))
+    else:
+        timelines = load_recording(source)
+    if not timelines:
+        raise SystemExit(f"No whale activity in {source}")
+
+    start = parse_time(os.environ['REPLAY_START']) if os.environ.get('REPLAY_START') else default_start(timelines)
+    end = start + float(os.environ.get('REPLAY_HOURS', '24')) * 3600
+
+    rpc_url = os.environ.get('REPLAY_RPC_URL')
+    chain_server = None
+    if not rpc_url:
+        chain_server, rpc_url = serve_chain()
+    os.environ['ETHEREUM_RPC_URL'] = rpc_url
+
+    wallet_manager = WalletManager()
+    engine = TradingEngine(wallet_manager, Web3Client(wallet_manager), RiskManager())
+    if chain_server is None:
+        fund_fork_accounts(engine, float(os.environ.get('REPLAY_USDC', '5000')))
+
+    started_at = datetime.fromtimestamp(start, timezone.utc)
+    print(f"Replaying {len(timelines)} whales from {started_at.isoformat()} for {(end - start) / 3600:g}h against {rpc_url}...")
+    try:
+        results = asyncio.run(replay(engine, timelines, start, end))
+    finally:
+        engine.account_scheduler.shutdown()
+        if chain_server is not None:
+            chain_server.shutdown()
+        stop_logging()
+
+    report = {
+        'benchmark': 'replay',
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'config': {
+            'source': os.path.abspath(source),
+            'start': started_at.isoformat(),
+            'hours': (end - start) / 3600,
+            'whales': len(timelines),
+            'rpc': 'mock_chain' if chain_server is not None else rpc_url,
+            'accounts': wallet_manager.account_count,
+            'check_interval': engine.whale_monitor.check_interval,
+            'poll_budget_per_cycle': engine.whale_monitor.scheduler.budget_per_cycle(),
+            'copy_venue': engine.whale_monitor.copy_venue,
+            'max_price_impact': engine.position_sizer.max_price_impact
+        },
+        'results': results
+    }
+
+    output = os.environ.get('REPLAY_OUTPUT') or os.path.join(RESULTS_DIR, f"replay-{started_at:%Y%m%d}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    with open(os.path.splitext(output)[0] + '.prom', 'w') as f:
+        f.write(render_metrics())
+
+    print(json.dumps(results, indent=2))
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
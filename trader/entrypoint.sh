@@ -0,0 +1,20 @@
+#!/bin/bash
+# Container entrypoint: one engine process (signing, nonces, risk state,
+# whale monitoring) plus stateless gunicorn workers that reach it over
+# ENGINE_SOCKET. If either exits, the other is stopped and the container
+# exits with its status, so the orchestrator restarts both together.
+
+python src/engine_service.py &
+engine=$!
+
+gunicorn --chdir src --bind 0.0.0.0:${PORT:-8080} --workers ${WEB_WORKERS:-4} --timeout 120 \
+    --worker-class aiohttp.GunicornWebWorker server:create_app &
+web=$!
+
+trap 'kill -TERM $engine $web 2>/dev/null' TERM INT
+
+wait -n $engine $web
+status=$?
+kill -TERM $engine $web 2>/dev/null
+wait
+exit $status
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Account Scheduler - Shards copy trades across the derived wallet accounts
+Each account has its own nonce sequence and execution lane, so trades on
+different accounts run in parallel and one stuck transaction only blocks
+its own lane
+"""
+
+import os
+import time
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, List, Callable
+from collections import defaultdict
+from metrics import QUEUE_WAIT
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+class AccountScheduler:
+    """Assigns trades to wallet accounts and keeps their USDC balanced"""
+
+    def __init__(self, wallet_manager, polymarket_client):
+        """Initialize scheduler over all accounts derived by the wallet manager"""
+        self.wallet_manager = wallet_manager
+        self.polymarket_client = polymarket_client
+        self.account_count = wallet_manager.account_count
+
+        # Configuration
+        self.rebalance_threshold = float(os.environ.get('ACCOUNT_REBALANCE_THRESHOLD', '0.5'))
+        self.min_transfer_usdc = float(os.environ.get('ACCOUNT_MIN_TRANSFER_USDC', '5'))
+
+        # Sticky market -> account assignment keeps positions consolidated
+        self.market_accounts: Dict[str, int] = {}
+        self.market_counts: Dict[int, int] = defaultdict(int)
+        self.in_flight: Dict[int, int] = defaultdict(int)
+        self.usdc_balances: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+        # One single-threaded lane per account serializes its nonces
+        self._lanes = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"account-{index}")
+            for index in range(self.account_count)
+        ]
+
+        logger.info(f"Account scheduler initialized with {self.account_count} accounts")
+
+    def refresh_balances(self) -> Dict[int, int]:
+        """Reload USDC balances (in USDC units) for every account"""
+        balances = {}
+        for index in range(self.account_count):
+            try:
+                balances[index] = self.polymarket_client.get_usdc_balance(index)
+            except Exception as e:
+                logger.warning(f"Failed to refresh USDC balance for account {index}: {e}")
+                balances[index] = self.usdc_balances.get(index, 0)
+
+        with self._lock:
+            self.usdc_balances = balances
+        return balances
+
+    def assign(self, market_id: str) -> int:
+        """Get the account for a market, picking the least loaded one for new markets"""
+        with self._lock:
+            if market_id in self.market_accounts:
+                return self.market_accounts[market_id]
+
+        if not self.usdc_balances:
+            self.refresh_balances()
+
+        with self._lock:
+            # Re-check in case another lane assigned it meanwhile
+            if market_id in self.market_accounts:
+                return self.market_accounts[market_id]
+
+            # Prefer idle accounts, then the fewest markets, then the most USDC
+            account_index = min(
+                range(self.account_count),
+                key=lambda index: (
+                    self.in_flight[index],
+                    self.market_counts[index],
+                    -self.usdc_balances.get(index, 0)
+                )
+            )
+            self.market_accounts[market_id] = account_index
+            self.market_counts[account_index] += 1
+
+        logger.info("Assigned market %s to account %s", market_id, account_index)
+        return account_index
+
+    def submit(self, market_id: str, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Run fn(account_index, *args) on the lane of the account assigned to market_id"""
+        account_index = self.assign(market_id)
+
+        with self._lock:
+            self.in_flight[account_index] += 1
+        queued_ns = time.time_ns()
+        lane = str(account_index)
+
+        def run():
+            QUEUE_WAIT.observe((time.time_ns() - queued_ns) / 1e9, lane)
+            tracer.record('account_queue', queued_ns, account=account_index)
+            try:
+                return fn(account_index, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self.in_flight[account_index] -= 1
+
+        # Carry the caller's trace into the lane thread
+        return self._lanes[account_index].submit(contextvars.copy_context().run, run)
+
+    def record_spend(self, account_index: int, amount_units: int):
+        """Update the cached balance after a bet without another RPC call"""
+        with self._lock:
+            self.usdc_balances[account_index] = max(0, self.usdc_balances.get(account_index, 0) - amount_units)
+
+    def record_credit(self, account_index: int, amount_units: int):
+        """Update the cached balance after USDC comes back (e.g. redemptions)"""
+        with self._lock:
+            self.usdc_balances[account_index] = self.usdc_balances.get(account_index, 0) + amount_units
+
+    def plan_rebalance(self) -> List[Dict[str, Any]]:
+        """Plan USDC transfers that move every account towards the average balance"""
+        balances = self.refresh_balances()
+        if self.account_count < 2:
+            return []
+
+        target = sum(balances.values()) // self.account_count
+        tolerance = target * self.rebalance_threshold
+        min_transfer = int(self.min_transfer_usdc * 1e6)
+
+        surplus = sorted(
+            [[index, balance - target] for index, balance in balances.items() if balance - target > tolerance],
+            key=lambda item: -item[1]
+        )
+        deficit = sorted(
+            [[index, target - balance] for index, balance in balances.items() if target - balance > tolerance],
+            key=lambda item: -item[1]
+        )
+
+        transfers = []
+        while surplus and deficit:
+            amount = min(surplus[0][1], deficit[0][1])
+            if amount >= min_transfer:
+                transfers.append({
+                    'from_account': surplus[0][0],
+                    'to_account': deficit[0][0],
+                    'amount': amount
+                })
+            surplus[0][1] -= amount
+            deficit[0][1] -= amount
+            if surplus[0][1] <= 0:
+                surplus.pop(0)
+            if deficit[0][1] <= 0:
+                deficit.pop(0)
+
+        return transfers
+
+    def rebalance(self) -> List[Dict[str, Any]]:
+        """Move USDC between accounts so each one can keep trading"""
+        transfers = self.plan_rebalance()
+
+        for transfer in transfers:
+            to_address = self.wallet_manager.get_address(transfer['to_account'])
+            future = self._lanes[transfer['from_account']].submit(
+                self.polymarket_client.transfer_usdc,
+                to_address,
+                transfer['amount'],
+                transfer['from_account']
+            )
+            try:
+                transfer['tx_hash'] = future.result()
+            except Exception as e:
+                logger.error(f"Rebalance transfer failed: {e}")
+                transfer['error'] = str(e)
+
+        # Cached balances move only once a transfer is mined successfully
+        for transfer in transfers:
+            if 'tx_hash' not in transfer:
+                continue
+            try:
+                receipt = self.polymarket_client.wait_for_receipt(transfer['tx_hash'], transfer['from_account'])
+            except Exception as e:
+                logger.error(f"No receipt for rebalance transfer {transfer['tx_hash']}: {e}")
+                transfer['error'] = str(e)
+                continue
+            if receipt['status'] != 1:
+                logger.error(f"Rebalance transfer {transfer['tx_hash']} reverted")
+                transfer['error'] = 'transfer reverted'
+                continue
+            transfer['confirmed'] = True
+            self.record_spend(transfer['from_account'], transfer['amount'])
+            self.record_credit(transfer['to_account'], transfer['amount'])
+
+        if transfers:
+            logger.info(f"Rebalanced USDC across accounts: {len(transfers)} transfers")
+        return transfers
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get per-account load and balance information"""
+        with self._lock:
+            return {
+                'account_count': self.account_count,
+                'accounts': [
+                    {
+                        'index': index,
+                        'address': self.wallet_manager.get_address(index),
+                        'usdc_balance': self.usdc_balances.get(index, 0) / 1e6,
+                        'in_flight': self.in_flight[index],
+                        'markets': self.market_counts[index]
+                    }
+                    for index in range(self.account_count)
+                ]
+            }
+
+    def shutdown(self):
+        """Stop the account lanes"""
+        for lane in self._lanes:
+            lane.shutdown(wait=False)
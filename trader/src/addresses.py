@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Interned Ethereum addresses
+Checksums each address once per process and reuses the result, so hot paths
+compare and hash plain strings instead of re-running Keccak
+"""
+
+import threading
+from typing import Dict, Union
+from eth_utils import to_checksum_address, to_canonical_address
+
+# Stop interning new addresses past this size (user input must not grow it forever)
+MAX_INTERNED_ADDRESSES = 1_000_000
+
+# raw bytes -> Address, plus a lookup of every spelling we've seen
+_addresses: Dict[bytes, 'Address'] = {}
+_lookup: Dict[Union[str, bytes], 'Address'] = {}
+_lock = threading.Lock()
+
+
+class Address(str):
+    """Checksummed address string that also carries its raw 20 bytes"""
+
+    __slots__ = ('raw',)
+
+    def __new__(cls, checksum: str, raw: bytes):
+        address = super().__new__(cls, checksum)
+        address.raw = raw
+        return address
+
+    def __reduce__(self):
+        return (to_address, (str(self),))
+
+
+def to_address(value: Union[str, bytes]) -> Address:
+    """Get the interned Address for a hex string (any case) or 20 raw bytes"""
+    if type(value) is Address:
+        return value
+    if isinstance(value, bytearray):
+        value = bytes(value)
+
+    address = _lookup.get(value)
+    if address is not None:
+        return address
+
+    # Raises ValueError for malformed input, like to_checksum_address
+    if isinstance(value, bytes):
+        raw = value
+        if len(raw) != 20:
+            raise ValueError(f"Address must be 20 bytes, got {len(raw)}")
+    else:
+        raw = to_canonical_address(value)
+
+    with _lock:
+        address = _addresses.get(raw)
+        if address is None:
+            address = Address(to_checksum_address(raw), raw)
+            if len(_addresses) >= MAX_INTERNED_ADDRESSES:
+                return address
+            _addresses[raw] = address
+            _lookup[raw] = address
+            _lookup[str(address)] = address
+            _lookup[address.lower()] = address
+        if isinstance(value, str):
+            _lookup[value] = address
+
+    return address
+
+
+def to_raw(value: Union[str, bytes]) -> bytes:
+    """20 raw bytes of an address without interning it (for membership tests on untrusted input)"""
+    if type(value) is Address:
+        return value.raw
+    if isinstance(value, (bytes, bytearray)):
+        if len(value) != 20:
+            raise ValueError(f"Address must be 20 bytes, got {len(value)}")
+        return bytes(value)
+    address = _lookup.get(value)
+    if address is not None:
+        return address.raw
+    if len(value) == 42 and value[:2] in ('0x', '0X'):
+        return bytes.fromhex(value[2:])
+    return to_canonical_address(value)
+
+
+def interned_count() -> int:
+    """Number of distinct addresses currently interned"""
+    return len(_addresses)
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Polymarket API Client - Shared HTTP access to data-api and gamma-api
+Every request goes through a per-host adaptive token bucket and a retry
+policy (exponential backoff with jitter, honouring Retry-After) bounded by
+a global retry budget, so concurrent polling backs off instead of
+cascading into 429s. Responses are cached with their validators so repeat
+polls are conditional and unchanged bodies are never parsed twice.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit, urlencode
+import aiohttp
+import msgspec
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying; anything else non-200 is returned to the caller
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class AdaptiveTokenBucket:
+    """Token bucket whose rate backs off on 429s and slowly recovers (AIMD)"""
+
+    def __init__(self, rate: float, burst: float, min_rate: float, max_rate: float):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.requests = 0
+        self.rejections = 0
+        self.throttled_seconds = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        """Wait until a request may be sent"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.requests += 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+                self.throttled_seconds += wait
+                await asyncio.sleep(wait)
+
+    def on_success(self):
+        """Additive increase towards the configured maximum"""
+        self.rate = min(self.max_rate, self.rate + 0.05)
+
+    def on_rejected(self, retry_after: Optional[float] = None):
+        """Multiplicative decrease, and pause the bucket for Retry-After"""
+        self.rejections += 1
+        self.rate = max(self.min_rate, self.rate * 0.5)
+        self.tokens = min(self.tokens, 0.0)
+        if retry_after:
+            self.pause(retry_after)
+
+    def pause(self, seconds: float):
+        """Hold back the next request for at least this long"""
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'current_rate': round(self.rate, 3),
+            'max_rate': self.max_rate,
+            'requests': self.requests,
+            'rejections': self.rejections,
+            'throttled_seconds': round(self.throttled_seconds, 2)
+        }
+
+
+class RetryBudget:
+    """Caps retries to a fraction of recent traffic so failures can't snowball"""
+
+    def __init__(self, ratio: float, min_per_second: float, max_tokens: float):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.updated_at = time.monotonic()
+        self.retries = 0
+        self.exhausted = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self.updated_at) * self.min_per_second)
+        self.updated_at = now
+
+    def deposit(self):
+        """Each first attempt earns a fraction of a retry"""
+        self._refill()
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        """Spend one retry if the budget allows it"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.retries += 1
+            return True
+        self.exhausted += 1
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'available': round(self.tokens, 2),
+            'retries': self.retries,
+            'exhausted': self.exhausted
+        }
+
+
+class CachedResponse:
+    """Validators, body hash and parsed value of one cached response
+
+    Entries loaded from disk keep their JSON body and are decoded on first
+    use, with the decoder of the request that hits them.
+    """
+
+    __slots__ = ('etag', 'last_modified', 'body_hash', 'value', 'size', 'body')
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], body_hash: str, value: Any, size: int, body: Optional[bytes] = None):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body_hash = body_hash
+        self.value = value
+        self.size = size
+        self.body = body
+
+    def get_value(self, decoder: Callable[[bytes], Any]) -> Any:
+        if self.body is not None:
+            self.value = decoder(self.body)
+            self.body = None
+        return self.value
+
+
+class ResponseCache:
+    """Bounded LRU of parsed responses keyed by URL and query, optionally persisted to disk"""
+
+    def __init__(self, max_entries: int, max_bytes: int, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        self.entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.total_bytes = 0
+
+        # Savings counters
+        self.conditional_requests = 0
+        self.not_modified = 0
+        self.unchanged_bodies = 0
+        self.bytes_downloaded = 0
+        self.bytes_saved = 0
+        self.parses = 0
+        self.parses_skipped = 0
+        self.evictions = 0
+
+        if path:
+            self.load()
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict[str, Any]]) -> str:
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted(params.items()))}"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CachedResponse):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.total_bytes -= old.size
+        self.entries[key] = entry
+        self.total_bytes += entry.size
+
+        while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+            self.evictions += 1
+
+    def load(self):
+        """Load persisted entries (validators and parsed values)"""
+        try:
+            with open(self.path, 'r') as f:
+                stored = json.load(f)
+            for key, item in stored.items():
+                self.put(key, CachedResponse(item['etag'], item['last_modified'], item['body_hash'], None, item['size'], item['body'].encode()))
+            logger.info(f"Loaded {len(self.entries)} cached API responses from {self.path}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Failed to load API response cache from {self.path}: {e}")
+
+    def save(self):
+        """Persist entries to disk if a path is configured"""
+        if not self.path:
+            return
+        try:
+            stored = {
+                key: {
+                    'etag': entry.etag,
+                    'last_modified': entry.last_modified,
+                    'body_hash': entry.body_hash,
+                    'body': entry.body.decode() if entry.body is not None else msgspec.json.encode(entry.value).decode(),
+                    'size': entry.size
+                }
+                for key, entry in self.entries.items()
+            }
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Failed to save API response cache to {self.path}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self.entries),
+            'bytes_cached': self.total_bytes,
+            'conditional_requests': self.conditional_requests,
+            'not_modified': self.not_modified,
+            'unchanged_bodies': self.unchanged_bodies,
+            'bytes_downloaded': self.bytes_downloaded,
+            'bytes_saved': self.bytes_saved,
+            'parses': self.parses,
+            'parses_skipped': self.parses_skipped,
+            'evictions': self.evictions
+        }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class PolymarketAPIClient:
+    """Rate-limited, retrying JSON client shared by everything that polls Polymarket"""
+
+    def __init__(self, max_connections: int = 10):
+        """Initialize client; limits come from the environment"""
+        self.max_connections = max_connections
+
+        # Configuration
+        self.rate_per_host = float(os.environ.get('API_RATE_LIMIT_RPS', '5'))
+        self.burst_per_host = float(os.environ.get('API_RATE_LIMIT_BURST', '10'))
+        self.max_attempts = int(os.environ.get('API_MAX_ATTEMPTS', '4'))
+        self.backoff_base = float(os.environ.get('API_BACKOFF_BASE', '0.5'))
+        self.backoff_max = float(os.environ.get('API_BACKOFF_MAX', '30'))
+        self.timeout = aiohttp.ClientTimeout(total=float(os.environ.get('API_TIMEOUT', '10')))
+
+        self.buckets: Dict[str, AdaptiveTokenBucket] = {}
+        self.retry_budget = RetryBudget(
+            ratio=float(os.environ.get('API_RETRY_BUDGET_RATIO', '0.1')),
+            min_per_second=float(os.environ.get('API_RETRY_BUDGET_MIN_RPS', '0.2')),
+            max_tokens=float(os.environ.get('API_RETRY_BUDGET_MAX', '20'))
+        )
+        self.cache = ResponseCache(
+            max_entries=int(os.environ.get('API_CACHE_MAX_ENTRIES', '20000')),
+            max_bytes=int(os.environ.get('API_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+            path=os.environ.get('API_CACHE_PATH') or None
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def get_bucket(self, host: str) -> AdaptiveTokenBucket:
+        """Get the rate limiter for a host"""
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = AdaptiveTokenBucket(
+                rate=self.rate_per_host,
+                burst=self.burst_per_host,
+                min_rate=min(0.2, self.rate_per_host),
+                max_rate=self.rate_per_host
+            )
+            self.buckets[host] = bucket
+        return bucket
+
+    def current_rate(self, url_or_host: str) -> float:
+        """Current allowed request rate for a host"""
+        host = urlsplit(url_or_host).netloc or url_or_host
+        return self.get_bucket(host).rate
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Shared HTTP session so requests reuse pooled connections"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=self.timeout
+            )
+        return self._session
+
+    async def close(self):
+        """Close the shared session and persist the response cache"""
+        self.cache.save()
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None,
+                       decoder: Optional[Callable[[bytes], Any]] = None) -> Optional[Any]:
+        """GET a JSON document; returns None once retries are exhausted or not allowed"""
+        value, _ = await self.get_json_conditional(url, params, decoder)
+        return value
+
+    async def get_json_conditional(self, url: str, params: Optional[Dict[str, Any]] = None,
+                                   decoder: Optional[Callable[[bytes], Any]] = None) -> Tuple[Optional[Any], bool]:
+        """GET a JSON document, returning (value, changed)
+
+        decoder turns the raw body into the returned value (e.g. a typed
+        data_api decoder); plain JSON decoding is used by default. changed is
+        False when the server answered 304 or sent the same body as last
+        time; the cached value is returned without parsing. The value is
+        shared with the cache and must not be mutated.
+        """
+        decoder = decoder or msgspec.json.decode
+        bucket = self.get_bucket(urlsplit(url).netloc)
+        self.retry_budget.deposit()
+
+        cache = self.cache
+        key = cache.make_key(url, params)
+        cached = cache.get(key)
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                headers['If-Modified-Since'] = cached.last_modified
+            if headers:
+                cache.conditional_requests += 1
+
+        for attempt in range(self.max_attempts):
+            await bucket.acquire()
+            retry_after = None
+            try:
+                session = self._get_session()
+                async with session.get(url, params=params, headers=headers) as response:
+                    if response.status == 304 and cached is not None:
+                        bucket.on_success()
+                        cache.not_modified += 1
+                        cache.bytes_saved += cached.size
+                        cache.parses_skipped += 1
+                        return cached.get_value(decoder), False
+
+                    if response.status == 200:
+                        bucket.on_success()
+                        body = await response.read()
+                        cache.bytes_downloaded += len(body)
+                        body_hash = hashlib.blake2b(body, digest_size=16).hexdigest()
+
+                        if cached is not None and cached.body_hash == body_hash:
+                            cache.unchanged_bodies += 1
+                            cache.parses_skipped += 1
+                            return cached.get_value(decoder), False
+
+                        try:
+                            value = decoder(body)
+                        except msgspec.DecodeError as e:
+                            logger.warning(f"GET {url} returned an undecodable body: {e}")
+                            return None, True
+                        cache.parses += 1
+                        cache.put(key, CachedResponse(
+                            response.headers.get('ETag'),
+                            response.headers.get('Last-Modified'),
+                            body_hash,
+                            value,
+                            len(body)
+                        ))
+                        return value, True
+
+                    if response.status not in RETRYABLE_STATUSES:
+                        logger.warning(f"GET {url} failed: {response.status}")
+                        return None, True
+
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    if retry_after is not None:
+                        retry_after = min(retry_after, self.backoff_max)
+                    if response.status == 429:
+                        bucket.on_rejected(retry_after)
+                    elif retry_after:
+                        bucket.pause(retry_after)
+                    logger.warning(f"GET {url} returned {response.status} (attempt {attempt + 1}/{self.max_attempts})")
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"GET {url} error: {e} (attempt {attempt + 1}/{self.max_attempts})")
+
+            if attempt + 1 >= self.max_attempts or not self.retry_budget.try_withdraw():
+                break
+            # A Retry-After pause is taken by the bucket in the next acquire()
+            if retry_after is None:
+                await asyncio.sleep(self._backoff(attempt))
+
+        return None, True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Limiter and retry budget state for status endpoints"""
+        return {
+            'hosts': {host: bucket.get_stats() for host, bucket in self.buckets.items()},
+            'retry_budget': self.retry_budget.get_stats(),
+            'cache': self.cache.get_stats()
+        }
@@ -7,41 +7,83 @@ A Flask-based trading bot running on Eigencloud's Trusted Execution Environment
 import os
 import sys
 import logging
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from dotenv import load_dotenv
 from typing import Dict, Any, Optional
 import json
+import functools
 from datetime import datetime
+import msgspec
 
 # Import our custom modules
 from wallet_manager import WalletManager
 from trading_logic import TradingEngine
 from web3_client import Web3Client
 from risk_manager import RiskManager
+from data_api import decode_leaderboard_follow
+from engine_rpc import EngineRPCClient, EngineProxy
+from read_cache import ReadCache, etag_matches
+from event_bus import format_sse, format_sse_drops
+from metrics import render_metrics
+from log_pipeline import configure_logging
+from profiler import ProfilerBusyError
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging (structured, formatted and written off the request threads)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Initialize Flask app
 app = Flask(__name__)
 
+# Short-TTL cache shared by the endpoints the UI polls
+read_cache = ReadCache()
+
+def cached_read(view):
+    """Serve a read endpoint from the read cache, coalescing concurrent requests, with ETag/304"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        def fetch():
+            response = app.make_response(view(*args, **kwargs))
+            return response.get_data(), response.status_code
+        
+        entry = read_cache.get_or_fetch(request.full_path, fetch)
+        if entry.status == 200 and etag_matches(request.headers.get('If-None-Match'), entry.etag):
+            read_cache.record_not_modified()
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(entry.body, status=entry.status, mimetype='application/json')
+        response.headers['ETag'] = entry.etag
+        response.headers['Cache-Control'] = f"max-age={int(read_cache.ttl)}"
+        return response
+    return wrapper
+
 # Global instances (initialized in main)
 wallet_manager: Optional[WalletManager] = None
 trading_engine: Optional[TradingEngine] = None
 web3_client: Optional[Web3Client] = None
 risk_manager: Optional[RiskManager] = None
 
-def initialize_services():
-    """Initialize all trading services"""
+def initialize_services(use_engine_socket: bool = True):
+    """Initialize all trading services
+
+    With ENGINE_SOCKET set, this process is a stateless HTTP worker: the
+    services are proxies to the engine process that owns them.
+    """
     global wallet_manager, trading_engine, web3_client, risk_manager
     
+    engine_socket = os.environ.get('ENGINE_SOCKET')
+    if use_engine_socket and engine_socket:
+        client = EngineRPCClient(engine_socket)
+        wallet_manager = EngineProxy(client, 'wallet_manager')
+        web3_client = EngineProxy(client, 'web3_client')
+        trading_engine = EngineProxy(client, 'trading_engine')
+        risk_manager = None
+        logger.info(f"Worker using engine process at {engine_socket}")
+        return
+    
     try:
         # Initialize wallet manager
         wallet_manager = WalletManager()
@@ -74,6 +116,7 @@ def initialize_services():
         logger.error("App will start with limited functionality")
 
 @app.route('/health', methods=['GET'])
+@cached_read
 def health_check():
     """Health check endpoint"""
     return jsonify({
@@ -101,6 +144,7 @@ def get_wallet_address():
         }), 500
 
 @app.route('/wallet/balance', methods=['GET'])
+@cached_read
 def get_wallet_balance():
     """Get the wallet's ETH balance"""
     try:
@@ -243,6 +287,7 @@ def get_config():
 
 # Polymarket-specific endpoints
 @app.route('/polymarket/balance', methods=['GET'])
+@cached_read
 def get_polymarket_balance():
     """Get Polymarket-related balances (USDC, ETH)"""
     try:
@@ -344,6 +389,289 @@ def place_polymarket_bet():
             'status': 'error'
         }), 500
 
+@app.route('/polymarket/simulate', methods=['POST'])
+def simulate_polymarket_bet():
+    """Simulate a Polymarket bet against the pending block without placing it"""
+    try:
+        if not request.is_json:
+            return jsonify({'error': 'Request must be JSON'}), 400
+        
+        if not trading_engine:
+            return jsonify({
+                'error': 'Trading engine not available',
+                'status': 'error'
+            }), 503
+        
+        bet_data = request.get_json()
+        
+        # Validate required fields
+        required_fields = ['market_id', 'outcome', 'amount_usdc', 'price']
+        for field in required_fields:
+            if field not in bet_data:
+                return jsonify({'error': f'Missing required field: {field}'}), 400
+        
+        result = trading_engine.simulate_polymarket_bet(
+            bet_data['market_id'],
+            int(bet_data['outcome']),
+            float(bet_data['amount_usdc']),
+            float(bet_data['price']),
+            int(bet_data.get('account_index', 0))
+        )
+        
+        return jsonify({
+            'simulation': result,
+            'status': 'success'
+        })
+        
+    except ValueError as e:
+        logger.warning(f"Invalid simulation request: {e}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 400
+    except Exception as e:
+        logger.error(f"Error simulating bet: {e}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
+@app.route('/polymarket/orders', methods=['GET'])
+def get_open_orders():
+    """Get locally tracked open CLOB orders"""
+    try:
+        if not trading_engine:
+            return jsonify({
+                'error': 'Trading engine not available',
+                'status': 'error'
+            }), 503
+        
+        orders = trading_engine.get_open_orders(request.args.get('token_id'))
+        
+        return jsonify({
+            'orders': orders,
+            'count': len(orders),
+            'status': 'success'
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting open orders: {e}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
+@app.route('/polymarket/positions', methods=['GET'])
+def get_polymarket_positions():
+    """Get conditional-token positions and PnL (optionally for one whale's copies)"""
+    try:
+        if not trading_engine:
+            return jsonify({
+                'error': 'Trading engine not available',
+                'status': 'error'
+            }), 503
+        
+        result = trading_engine.get_positions(request.args.get('whale'))
+        
+        return jsonify({
+            'positions': result['positions'],
+            'pnl': result['pnl'],
+            'tracker': result['tracker'],
+            'status': 'success'
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 400
+    except Exception as e:
+        logger.error(f"Error getting positions: {e}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
+@app.route('/polymarket/redeem', methods=['POST'])
+def redeem_polymarket_positions():
+    """Redeem held positions of resolved markets in one batch"""
+    try:
+        if not trading_engine:
+            return jsonify({
+                'error': 'Trading engine not available',
+                'status': 'error'
+            }), 503
+        
+        data = request.get_json(silent=True) or {}
+        result = trading_engine.redeem_resolved(bool(data.get('force', False)))
+        
+        return jsonify({
+            'result': result,
+            'status': 'success'
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 400
+    except Exception as e:
+        logger.error(f"Error redeeming positions: {e}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
+@app.route('/polymarket/book/<token_id>', methods=['GET'])
+def get_order_book(token_id: str):
+    """Get the local order book mirror's top of book for a token"""
+    try:
+        if not trading_engine:
+            return jsonify({
+                'error': 'Trading engine not available',
+                'status': 'error'
+            }), 503
+        
+        book = trading_engine.get_order_book(token_id)
+        if book is None:
+            return jsonify({
+                'error': 'Token not mirrored',
+                'status': 'error'
+            }), 404
+        
+        return jsonify({
+            'book': book,
+            'status': 'success'
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting order book: {e}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
+@app.route('/polymarket/orders', methods=['POST'])
+def place_limit_orders():
+    """Place a batch of CLOB limit orders ({token_id, side, price, size})"""
+    try:
+        if not request.is_json:
+            return jsonify({'error': 'Request must be JSON'}), 400
+        
+        if not trading_engine:
+            return jsonify({
+                'error': 'Trading engine not available',
+                'status': 'error'
+            }), 503
+        
+        order_data = request.get_json()
+        
+        orders = order_data.get('orders')
+        if not isinstance(orders, list) or not orders:
+            return jsonify({'error': 'Missing required field: orders'}), 400
+        
+        for order in orders:
+            for field in ['token_id', 'side', 'price', 'size']:
+                if field not in order:
+                    return jsonify({'error': f'Missing required order field: {field}'}), 400
+        
+        result = trading_engine.place_limit_orders(
+            orders,
+            order_data.get('order_type', 'GTC'),
+            int(order_data.get('account_index', 0))
+        )
+        
+        return jsonify({
+            'orders_result': result,
+            'status': 'success'
+        })
+        
+    except ValueError as e:
+        logger.warning(f"Invalid order request: {e}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 400
+    except Exception as e:
+        logger.error(f"Error placing orders: {e}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
+@app.route('/polymarket/orders', methods=['DELETE'])
+def cancel_orders():
+    """Cancel CLOB orders by id, or every open order when no ids are given"""
+    try:
+        if not trading_engine:
+            return jsonify({
+                'error': 'Trading engine not available',
+                'status': 'error'
+            }), 503
+        
+        cancel_data = request.get_json(silent=True) or {}
+        
+        result = trading_engine.cancel_orders(
+            cancel_data.get('order_ids'),
+            int(cancel_data.get('account_index', 0))
+        )
+        
+        return jsonify({
+            'cancel_result': result,
+            'status': 'success'
+        })
+        
+    except Exception as e:
+        logger.error(f"Error cancelling orders: {e}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
+@app.route('/polymarket/orders/replace', methods=['POST'])
+def replace_orders():
+    """Cancel CLOB orders and place their replacements"""
+    try:
+        if not request.is_json:
+            return jsonify({'error': 'Request must be JSON'}), 400
+        
+        if not trading_engine:
+            return jsonify({
+                'error': 'Trading engine not available',
+                'status': 'error'
+            }), 503
+        
+        replace_data = request.get_json()
+        
+        for field in ['order_ids', 'orders']:
+            if not isinstance(replace_data.get(field), list):
+                return jsonify({'error': f'Missing required field: {field}'}), 400
+        
+        result = trading_engine.replace_orders(
+            replace_data['order_ids'],
+            replace_data['orders'],
+            replace_data.get('order_type', 'GTC'),
+            int(replace_data.get('account_index', 0))
+        )
+        
+        return jsonify({
+            'replace_result': result,
+            'status': 'success'
+        })
+        
+    except ValueError as e:
+        logger.warning(f"Invalid replace request: {e}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 400
+    except Exception as e:
+        logger.error(f"Error replacing orders: {e}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
 # Bot Control Endpoints
 
 @app.route('/bot/start', methods=['POST'])
@@ -405,6 +733,7 @@ def stop_bot():
         }), 500
 
 @app.route('/bot/status', methods=['GET'])
+@cached_read
 def get_bot_status():
     """Get the current bot status"""
     try:
@@ -450,6 +779,13 @@ def withdraw_funds():
                 'status': 'error'
             }), 503
         
+        # Raw transfers bypass the risk manager, so the engine does not serve them to workers
+        if isinstance(web3_client, EngineProxy):
+            return jsonify({
+                'error': 'Withdrawals are not available from HTTP workers',
+                'status': 'error'
+            }), 403
+        
         withdraw_data = request.get_json()
         
         # Get the withdrawal address (could be from request or use a default)
@@ -500,6 +836,47 @@ def withdraw_funds():
             'status': 'error'
         }), 500
 
+@app.route('/wallet/accounts', methods=['GET'])
+def get_wallet_accounts():
+    """Get balances and load for every derived trading account"""
+    try:
+        if not trading_engine:
+            return jsonify({
+                'error': 'Trading engine not available',
+                'status': 'error'
+            }), 503
+        
+        pool_status = trading_engine.get_account_pool_status()
+        return jsonify({
+            'accounts': pool_status,
+            'status': 'success'
+        })
+    except Exception as e:
+        logger.error(f"Error getting wallet accounts: {e}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
+@app.route('/wallet/rebalance', methods=['POST'])
+def rebalance_wallet_accounts():
+    """Rebalance USDC across the derived trading accounts"""
+    try:
+        if not trading_engine:
+            return jsonify({
+                'error': 'Trading engine not available',
+                'status': 'error'
+            }), 503
+        
+        result = trading_engine.rebalance_accounts()
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error rebalancing wallet accounts: {e}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
 # Whale Management Endpoints
 
 @app.route('/whales/add', methods=['POST'])
@@ -541,6 +918,39 @@ def add_whale():
             'status': 'error'
         }), 500
 
+@app.route('/whales/leaderboard', methods=['POST'])
+def follow_leaderboard():
+    """Follow every whale on a leaderboard (entries as returned by /api/leaderboard)"""
+    try:
+        if not request.is_json:
+            return jsonify({'error': 'Request must be JSON'}), 400
+        
+        if not trading_engine:
+            return jsonify({
+                'error': 'Trading engine not available',
+                'status': 'error'
+            }), 503
+        
+        try:
+            leaderboard_data = decode_leaderboard_follow(request.get_data())
+        except msgspec.DecodeError as e:
+            return jsonify({'error': f'Invalid leaderboard: {e}'}), 400
+        
+        entries = leaderboard_data.entries if leaderboard_data.entries is not None else leaderboard_data.data
+        if entries is None:
+            return jsonify({'error': 'Missing required field: entries'}), 400
+        
+        result = trading_engine.follow_leaderboard(entries, leaderboard_data.category, leaderboard_data.position_percentage)
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        logger.error(f"Error following leaderboard: {e}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
 @app.route('/whales/remove', methods=['POST'])
 def remove_whale():
     """Remove a whale from monitoring"""
@@ -616,6 +1026,7 @@ def stop_whale_monitoring():
         }), 500
 
 @app.route('/whales/status', methods=['GET'])
+@cached_read
 def get_whale_monitoring_status():
     """Get whale monitoring status"""
     try:
@@ -636,6 +1047,177 @@ def get_whale_monitoring_status():
             'status': 'error'
         }), 500
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics (the engine's, when serving as a worker)"""
+    try:
+        text = trading_engine.render_metrics() if trading_engine else render_metrics()
+        return Response(text, mimetype='text/plain; version=0.0.4')
+    except Exception as e:
+        logger.error(f"Error rendering metrics: {e}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
+@app.route('/debug/traces', methods=['GET'])
+def get_traces():
+    """Recent copy-trade traces with per-hop span timings"""
+    try:
+        if not trading_engine:
+            return jsonify({
+                'error': 'Trading engine not available',
+                'status': 'error'
+            }), 503
+        
+        result = trading_engine.get_traces(
+            trace_id=request.args.get('trace_id'),
+            whale=request.args.get('whale'),
+            min_duration_ms=float(request.args.get('min_duration_ms', 0)),
+            limit=int(request.args.get('limit', 20))
+        )
+        result['status'] = 'success'
+        return jsonify(result)
+        
+    except ValueError as e:
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 400
+    except Exception as e:
+        logger.error(f"Error getting traces: {e}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
+@app.route('/debug/profile', methods=['POST'])
+def profile_cpu():
+    """Sample all engine threads for N seconds (collapsed stacks or speedscope JSON)"""
+    try:
+        if not trading_engine:
+            return jsonify({
+                'error': 'Trading engine not available',
+                'status': 'error'
+            }), 503
+        
+        data = request.get_json(silent=True) or {}
+        output = data.get('format', 'collapsed')
+        if output not in ('collapsed', 'speedscope'):
+            raise ValueError("format must be 'collapsed' or 'speedscope'")
+        
+        result = trading_engine.profile_cpu(
+            float(data.get('seconds', 10)),
+            output,
+            float(data.get('interval_ms', 5))
+        )
+        if output == 'collapsed':
+            return Response(result, mimetype='text/plain')
+        return jsonify(result)
+        
+    except ProfilerBusyError as e:
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 409
+    except ValueError as e:
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 400
+    except Exception as e:
+        logger.error(f"Error profiling: {e}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
+@app.route('/debug/memory', methods=['POST'])
+def profile_memory():
+    """tracemalloc allocation growth over N seconds, with container sizes"""
+    try:
+        if not trading_engine:
+            return jsonify({
+                'error': 'Trading engine not available',
+                'status': 'error'
+            }), 503
+        
+        data = request.get_json(silent=True) or {}
+        result = trading_engine.profile_memory(
+            float(data.get('seconds', 10)),
+            int(data.get('top', 25)),
+            int(data.get('frames', 1))
+        )
+        result['status'] = 'success'
+        return jsonify(result)
+        
+    except ProfilerBusyError as e:
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 409
+    except ValueError as e:
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 400
+    except Exception as e:
+        logger.error(f"Error taking memory diff: {e}")
+        return jsonify({
+            'error': str(e),
+            'status': 'error'
+        }), 500
+
+@app.route('/events', methods=['GET'])
+def stream_events():
+    """Server-sent events stream of bot activity"""
+    if not trading_engine:
+        return jsonify({
+            'error': 'Trading engine not available',
+            'status': 'error'
+        }), 503
+    
+    event_bus = trading_engine.event_bus
+    types = [t for t in request.args.get('types', '').split(',') if t] or None
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+    last_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    heartbeat = float(os.environ.get('EVENTS_HEARTBEAT_SECONDS', '15'))
+    
+    def generate():
+        # A proxied bus is long-polled from the engine; a local one pushes to a subscription
+        subscription = None
+        cursor = last_id
+        if isinstance(event_bus, EngineProxy):
+            if cursor is None:
+                cursor = event_bus.get_stats()['last_id']
+        else:
+            subscription = event_bus.subscribe(types, cursor)
+        
+        try:
+            while True:
+                if subscription is not None:
+                    events, dropped = subscription.get(heartbeat)
+                else:
+                    batch = event_bus.wait_since(cursor, heartbeat, types)
+                    events, dropped = batch['events'], batch['dropped']
+                    if events:
+                        cursor = events[-1]['id']
+                
+                if dropped:
+                    yield format_sse_drops(dropped)
+                if events:
+                    yield b''.join(format_sse(event) for event in events)
+                elif not dropped:
+                    yield b': keepalive\n\n'
+        finally:
+            if subscription is not None:
+                subscription.close()
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+CLOB Client - Limit orders on Polymarket's off-chain order book
+Orders are EIP-712 signed with the wallet's cached keys and submitted in
+batches, with no gas and no wait for a block. Open orders are tracked
+locally so they can be cancelled or replaced in bulk, and reconciled with
+the server every CLOB_ORDER_SYNC_SECONDS to drop filled, cancelled and
+expired ones. The CLOB ties API credentials to one address: the configured
+ones belong to account 0, and every other account derives its own with an
+L1 (ClobAuth) signature the first time it is used.
+"""
+
+import os
+import hmac
+import json
+import time
+import asyncio
+import base64
+import hashlib
+import logging
+import secrets
+import threading
+from typing import Any, Dict, List, Optional
+import requests
+from eth_utils import keccak
+from addresses import to_address
+from tx_templates import encode_address, encode_uint256
+from metrics import SIGN_TIME
+
+logger = logging.getLogger(__name__)
+
+BUY = 'BUY'
+SELL = 'SELL'
+SIDES = {BUY: 0, SELL: 1}
+
+# Signature types: plain EOA signer
+SIGNATURE_TYPE_EOA = 0
+
+ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
+
+# Polymarket CTF Exchange on Polygon
+CTF_EXCHANGE = '0x4bFb41d5B3570DeFd03C39a9A4D8dE6Bd8B8982E'
+POLYGON_CHAIN_ID = 137
+
+DOMAIN_TYPEHASH = keccak(text="EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)")
+ORDER_TYPEHASH = keccak(text=(
+    "Order(uint256 salt,address maker,address signer,address taker,uint256 tokenId,"
+    "uint256 makerAmount,uint256 takerAmount,uint256 expiration,uint256 nonce,"
+    "uint256 feeRateBps,uint8 side,uint8 signatureType)"
+))
+
+CLOB_AUTH_DOMAIN_TYPEHASH = keccak(text="EIP712Domain(string name,string version,uint256 chainId)")
+CLOB_AUTH_TYPEHASH = keccak(text="ClobAuth(address address,string timestamp,uint256 nonce,string message)")
+CLOB_AUTH_MESSAGE = "This message attests that I control the given wallet"
+
+# Cursor the CLOB returns on the last page of a paginated listing
+END_CURSOR = 'LTE='
+
+# Amounts on the exchange use the collateral's 6 decimals
+AMOUNT_UNITS = 1_000_000
+
+# Order statuses that leave an order resting on the book
+OPEN_STATUSES = {'live', 'delayed', 'unmatched'}
+
+
+def domain_separator(chain_id: int, exchange_address: str) -> bytes:
+    """EIP-712 domain separator of the CTF Exchange"""
+    return keccak(
+        DOMAIN_TYPEHASH
+        + keccak(text="Polymarket CTF Exchange")
+        + keccak(text="1")
+        + encode_uint256(chain_id)
+        + encode_address(exchange_address)
+    )
+
+
+def clob_auth_hash(chain_id: int, address: str, timestamp: str, nonce: int = 0) -> bytes:
+    """EIP-712 digest an address signs to create or derive its API credentials"""
+    domain = keccak(
+        CLOB_AUTH_DOMAIN_TYPEHASH
+        + keccak(text="ClobAuthDomain")
+        + keccak(text="1")
+        + encode_uint256(chain_id)
+    )
+    struct_hash = keccak(
+        CLOB_AUTH_TYPEHASH
+        + encode_address(address)
+        + keccak(text=timestamp)
+        + encode_uint256(nonce)
+        + keccak(text=CLOB_AUTH_MESSAGE)
+    )
+    return keccak(b'\x19\x01' + domain + struct_hash)
+
+
+def build_hmac_signature(secret: str, timestamp: str, method: str, path: str, body: str = '') -> str:
+    """L2 request signature: HMAC-SHA256 over timestamp + method + path + body"""
+    key = base64.urlsafe_b64decode(secret)
+    digest = hmac.new(key, f"{timestamp}{method}{path}{body}".encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode()
+
+
+class OrderSigner:
+    """Builds and EIP-712 signs CTF Exchange orders for the wallet's accounts"""
+
+    def __init__(self, wallet_manager, chain_id: int = POLYGON_CHAIN_ID, exchange_address: str = CTF_EXCHANGE):
+        self.wallet_manager = wallet_manager
+        self.chain_id = chain_id
+        self.exchange_address = to_address(exchange_address)
+        self.domain_separator = domain_separator(chain_id, self.exchange_address)
+
+    def amounts(self, side: str, price: float, size: float) -> tuple:
+        """(makerAmount, takerAmount) in 6-decimal units for size outcome tokens at price"""
+        tokens = int(round(size * AMOUNT_UNITS))
+        collateral = int(round(size * price * AMOUNT_UNITS))
+        return (collateral, tokens) if side == BUY else (tokens, collateral)
+
+    def order_hash(self, order: Dict[str, Any]) -> bytes:
+        """EIP-712 digest of an order"""
+        struct_hash = keccak(
+            ORDER_TYPEHASH
+            + encode_uint256(order['salt'])
+            + encode_address(order['maker'])
+            + encode_address(order['signer'])
+            + encode_address(order['taker'])
+            + encode_uint256(int(order['tokenId']))
+            + encode_uint256(int(order['makerAmount']))
+            + encode_uint256(int(order['takerAmount']))
+            + encode_uint256(int(order['expiration']))
+            + encode_uint256(int(order['nonce']))
+            + encode_uint256(int(order['feeRateBps']))
+            + encode_uint256(SIDES[order['side']])
+            + encode_uint256(order['signatureType'])
+        )
+        return keccak(b'\x19\x01' + self.domain_separator + struct_hash)
+
+    def build_order(self, token_id: str, side: str, price: float, size: float, account_index: int = 0,
+                    expiration: int = 0, fee_rate_bps: int = 0, nonce: int = 0) -> Dict[str, Any]:
+        """Build and sign an order in the CLOB's JSON shape"""
+        if side not in SIDES:
+            raise ValueError(f"Invalid order side: {side}")
+        if not 0 < price < 1:
+            raise ValueError(f"Order price must be between 0 and 1: {price}")
+
+        address = self.wallet_manager.get_address(account_index)
+        maker_amount, taker_amount = self.amounts(side, price, size)
+        order = {
+            'salt': secrets.randbits(52),
+            'maker': address,
+            'signer': address,
+            'taker': ZERO_ADDRESS,
+            'tokenId': str(token_id),
+            'makerAmount': str(maker_amount),
+            'takerAmount': str(taker_amount),
+            'expiration': str(expiration),
+            'nonce': str(nonce),
+            'feeRateBps': str(fee_rate_bps),
+            'side': side,
+            'signatureType': SIGNATURE_TYPE_EOA
+        }
+        started = time.perf_counter()
+        signature = self.wallet_manager.sign_hash(self.order_hash(order), account_index)
+        SIGN_TIME.observe(time.perf_counter() - started, 'order')
+        order['signature'] = '0x' + signature.hex()
+        return order
+
+
+class ClobClient:
+    """Batched order submission and local open-order tracking against the CLOB REST API"""
+
+    def __init__(self, wallet_manager, host: Optional[str] = None):
+        """Initialize CLOB client with API credentials from the environment"""
+        self.wallet_manager = wallet_manager
+        self.host = (host or os.environ.get('CLOB_API_URL', 'https://clob.polymarket.com')).rstrip('/')
+        # account_index -> {'api_key', 'secret', 'passphrase'}; the configured credentials are account 0's
+        self.credentials: Dict[int, Dict[str, str]] = {}
+        if os.environ.get('CLOB_API_KEY'):
+            self.credentials[0] = {
+                'api_key': os.environ['CLOB_API_KEY'],
+                'secret': os.environ.get('CLOB_API_SECRET', ''),
+                'passphrase': os.environ.get('CLOB_API_PASSPHRASE', '')
+            }
+        self.batch_size = int(os.environ.get('CLOB_BATCH_SIZE', '15'))
+        self.timeout = float(os.environ.get('CLOB_TIMEOUT', '5'))
+        self.sync_interval = float(os.environ.get('CLOB_ORDER_SYNC_SECONDS', '30'))
+        self.running = False
+
+        self.signer = OrderSigner(
+            wallet_manager,
+            chain_id=int(os.environ.get('CLOB_CHAIN_ID', str(POLYGON_CHAIN_ID))),
+            exchange_address=os.environ.get('CLOB_EXCHANGE_ADDRESS', CTF_EXCHANGE)
+        )
+
+        # order_id -> order record, for orders resting on the book
+        self.open_orders: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.session = requests.Session()
+
+        logger.info(f"CLOB client initialized for {self.host}")
+
+    def _l1_headers(self, account_index: int, nonce: int = 0) -> Dict[str, str]:
+        address = self.wallet_manager.get_address(account_index)
+        timestamp = str(int(time.time()))
+        signature = self.wallet_manager.sign_hash(clob_auth_hash(self.signer.chain_id, address, timestamp, nonce), account_index)
+        return {
+            'POLY_ADDRESS': address,
+            'POLY_SIGNATURE': '0x' + signature.hex(),
+            'POLY_TIMESTAMP': timestamp,
+            'POLY_NONCE': str(nonce)
+        }
+
+    def get_credentials(self, account_index: int = 0) -> Dict[str, str]:
+        """API credentials of an account, derived (or created) with an L1 signature on first use"""
+        with self._lock:
+            credentials = self.credentials.get(account_index)
+        if credentials is not None:
+            return credentials
+
+        response = self.session.get(f"{self.host}/auth/derive-api-key", headers=self._l1_headers(account_index), timeout=self.timeout)
+        if not response.ok:
+            # No key for this address yet
+            response = self.session.post(f"{self.host}/auth/api-key", headers=self._l1_headers(account_index), timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        credentials = {'api_key': data['apiKey'], 'secret': data['secret'], 'passphrase': data['passphrase']}
+        with self._lock:
+            self.credentials[account_index] = credentials
+        logger.info(f"Derived CLOB API credentials for account {account_index}")
+        return credentials
+
+    def _headers(self, method: str, path: str, body: str = '', account_index: int = 0) -> Dict[str, str]:
+        credentials = self.get_credentials(account_index)
+        timestamp = str(int(time.time()))
+        headers = {
+            'Content-Type': 'application/json',
+            'POLY_ADDRESS': self.wallet_manager.get_address(account_index),
+            'POLY_API_KEY': credentials['api_key'],
+            'POLY_PASSPHRASE': credentials['passphrase'],
+            'POLY_TIMESTAMP': timestamp
+        }
+        if credentials['secret']:
+            headers['POLY_SIGNATURE'] = build_hmac_signature(credentials['secret'], timestamp, method, path, body)
+        return headers
+
+    def _request(self, method: str, path: str, payload: Any = None, account_index: int = 0,
+                 params: Optional[Dict[str, Any]] = None) -> Any:
+        # Sign exactly the bytes that are sent (the path without its query string)
+        body = json.dumps(payload, separators=(',', ':')) if payload is not None else ''
+        response = self.session.request(
+            method,
+            f"{self.host}{path}",
+            params=params,
+            data=body or None,
+            headers=self._headers(method, path, body, account_index),
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json() if response.content else None
+
+    def build_order(self, token_id: str, side: str, price: float, size: float, account_index: int = 0, **kwargs) -> Dict[str, Any]:
+        """Build and sign an order without submitting it"""
+        return self.signer.build_order(token_id, side, price, size, account_index, **kwargs)
+
+    def post_orders(self, orders: List[Dict[str, Any]], order_type: str = 'GTC', account_index: int = 0) -> List[Dict[str, Any]]:
+        """Submit signed orders through the batch endpoint; returns one result per order"""
+        results = []
+        for start in range(0, len(orders), self.batch_size):
+            batch = orders[start:start + self.batch_size]
+            try:
+                owner = self.get_credentials(account_index)['api_key']
+                payload = [{'order': order, 'owner': owner, 'orderType': order_type} for order in batch]
+                responses = self._request('POST', '/orders', payload, account_index)
+            except Exception as e:
+                logger.error(f"Failed to submit batch of {len(batch)} orders: {e}")
+                responses = [{'success': False, 'errorMsg': str(e)} for _ in batch]
+
+            for order, response in zip(batch, self._match_responses(batch, responses)):
+                self._track(order, response, account_index)
+                results.append(response)
+
+        return results
+
+    def _match_responses(self, batch: List[Dict[str, Any]], responses: Any) -> List[Dict[str, Any]]:
+        """One response per order: by order hash (the CLOB's orderID), else by position in a full-length list"""
+        if not isinstance(responses, list):
+            # An error object (or nothing) for the whole batch
+            error = responses.get('errorMsg') or responses.get('error') if isinstance(responses, dict) else None
+            return [{'success': False, 'errorMsg': error or f"unexpected batch response: {responses!r}"} for _ in batch]
+
+        by_hash = {
+            str(response['orderID']).lower(): response
+            for response in responses if isinstance(response, dict) and response.get('orderID')
+        }
+        positional = len(responses) == len(batch)
+        matched = []
+        for index, order in enumerate(batch):
+            response = by_hash.get('0x' + self.signer.order_hash(order).hex())
+            if response is None and positional and isinstance(responses[index], dict) and not responses[index].get('orderID'):
+                response = responses[index]
+            matched.append(response or {'success': False, 'errorMsg': 'no response for order'})
+        return matched
+
+    def _track(self, order: Dict[str, Any], response: Dict[str, Any], account_index: int):
+        order_id = response.get('orderID')
+        if not response.get('success') or not order_id:
+            logger.warning(f"Order rejected: {response.get('errorMsg', 'unknown error')}")
+            return
+        if response.get('status', 'live') in OPEN_STATUSES:
+            with self._lock:
+                self.open_orders[order_id] = {
+                    'order_id': order_id,
+                    'token_id': order['tokenId'],
+                    'side': order['side'],
+                    'maker_amount': int(order['makerAmount']),
+                    'taker_amount': int(order['takerAmount']),
+                    'account_index': account_index,
+                    'status': response.get('status', 'live'),
+                    'created_at': time.time()
+                }
+
+    def place_orders(self, specs: List[Dict[str, Any]], order_type: str = 'GTC', account_index: int = 0) -> List[Dict[str, Any]]:
+        """Sign and submit several orders ({token_id, side, price, size}) in as few requests as possible"""
+        orders = [
+            self.build_order(spec['token_id'], spec['side'], spec['price'], spec['size'], account_index)
+            for spec in specs
+        ]
+        return self.post_orders(orders, order_type, account_index)
+
+    def cancel_orders(self, order_ids: List[str], account_index: int = 0) -> Dict[str, Any]:
+        """Cancel orders in bulk"""
+        if not order_ids:
+            return {'canceled': [], 'not_canceled': {}}
+        response = self._request('DELETE', '/orders', list(order_ids), account_index) or {}
+        canceled = response.get('canceled', [])
+        with self._lock:
+            for order_id in canceled:
+                self.open_orders.pop(order_id, None)
+        return {'canceled': canceled, 'not_canceled': response.get('not_canceled', {})}
+
+    def cancel_all(self, account_index: int = 0) -> Dict[str, Any]:
+        """Cancel every open order of an account"""
+        response = self._request('DELETE', '/cancel-all', None, account_index) or {}
+        canceled = response.get('canceled', [])
+        with self._lock:
+            for order_id in canceled:
+                self.open_orders.pop(order_id, None)
+        return {'canceled': canceled, 'not_canceled': response.get('not_canceled', {})}
+
+    def replace_orders(self, order_ids: List[str], specs: List[Dict[str, Any]], order_type: str = 'GTC',
+                       account_index: int = 0) -> Dict[str, Any]:
+        """Cancel orders and submit their replacements: one cancel request plus batched posts"""
+        # Sign the replacements first so the book is empty only for the round trips
+        orders = [
+            self.build_order(spec['token_id'], spec['side'], spec['price'], spec['size'], account_index)
+            for spec in specs
+        ]
+        canceled = self.cancel_orders(order_ids, account_index)
+        placed = self.post_orders(orders, order_type, account_index)
+        return {'canceled': canceled, 'placed': placed}
+
+    def get_open_orders(self, token_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Locally tracked open orders, optionally for one token"""
+        with self._lock:
+            orders = list(self.open_orders.values())
+        if token_id is not None:
+            orders = [order for order in orders if order['token_id'] == str(token_id)]
+        return orders
+
+    def sync_open_orders(self, account_index: int = 0) -> int:
+        """Reconcile the local view with the server's open orders; returns the number open"""
+        live_ids = set()
+        cursor = None
+        while True:
+            response = self._request('GET', '/data/orders', None, account_index, {'next_cursor': cursor} if cursor else None) or []
+            if not isinstance(response, dict):
+                live_ids.update(order.get('id') for order in response)
+                break
+            live_ids.update(order.get('id') for order in response.get('data', []))
+            next_cursor = response.get('next_cursor')
+            if not next_cursor or next_cursor == END_CURSOR or next_cursor == cursor:
+                break
+            cursor = next_cursor
+        with self._lock:
+            for order_id in list(self.open_orders):
+                if self.open_orders[order_id]['account_index'] == account_index and order_id not in live_ids:
+                    del self.open_orders[order_id]
+            return sum(1 for order in self.open_orders.values() if order['account_index'] == account_index)
+
+    def sync_all(self) -> int:
+        """Reconcile every account that has tracked orders; returns the number still open"""
+        with self._lock:
+            accounts = {order['account_index'] for order in self.open_orders.values()}
+        return sum(self.sync_open_orders(account_index) for account_index in sorted(accounts))
+
+    async def run(self):
+        """Reconcile open orders periodically until stopped"""
+        self.running = True
+        while self.running:
+            try:
+                await asyncio.to_thread(self.sync_all)
+            except Exception as e:
+                logger.warning(f"Open order sync failed: {e}")
+            await asyncio.sleep(self.sync_interval)
+
+    def stop(self):
+        """Stop the reconciliation loop"""
+        self.running = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Open order counts"""
+        with self._lock:
+            return {
+                'host': self.host,
+                'open_orders': len(self.open_orders),
+                'batch_size': self.batch_size
+            }
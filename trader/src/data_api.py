@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Data API Schemas - Typed records for Polymarket data-api responses
+Closed positions, trades and leaderboard rows are decoded straight from
+response bytes into frozen msgspec structs. Unknown fields are skipped
+during decoding, so no intermediate dicts are built for the live monitor
+or for the scraper-backend position dumps. List endpoints are accepted as
+a bare JSON list or wrapped in a {"data": [...]} envelope.
+"""
+
+import os
+import glob
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Generic, List, Optional, TypeVar, Union
+import msgspec
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class ClosedPosition(msgspec.Struct, rename='camel', frozen=True, gc=False):
+    """Row of /closed-positions (and of the scraper-backend dumps)"""
+    proxy_wallet: str = ''
+    asset: str = ''
+    condition_id: str = ''
+    avg_price: float = 0.0
+    total_bought: float = 0.0
+    realized_pnl: float = 0.0
+    cur_price: float = 0.0
+    title: str = ''
+    slug: str = ''
+    outcome: str = ''
+    outcome_index: int = 0
+    end_date: str = ''
+    # Trade-style fields read by the monitor when present
+    amount: float = 0.0
+    timestamp: Union[int, str, None] = None
+    tx_hash: str = ''
+
+
+class Trade(msgspec.Struct, rename='camel', frozen=True, gc=False):
+    """Row of /trades"""
+    proxy_wallet: str = ''
+    side: str = ''
+    asset: str = ''
+    condition_id: str = ''
+    size: float = 0.0
+    price: float = 0.0
+    timestamp: Union[int, str, None] = None
+    title: str = ''
+    slug: str = ''
+    outcome: str = ''
+    outcome_index: int = 0
+    transaction_hash: str = ''
+
+
+class LeaderboardEntry(msgspec.Struct, rename='camel', frozen=True, gc=False):
+    """Leaderboard row as served by the scraper backend"""
+    address: str
+    name: str = ''
+    pnl: float = 0.0
+    volume: float = 0.0
+    win_rate: float = 0.0
+    rank: Optional[int] = None
+
+
+class Envelope(msgspec.Struct, Generic[T], frozen=True):
+    """{"data": [...]} wrapper some responses put around their rows"""
+    data: List[T] = []
+
+
+class RecordedResponse(msgspec.Struct, frozen=True):
+    """Line of a WHALE_RECORD_PATH recording: a changed closed-positions response"""
+    ts: float
+    whale: str
+    rows: List[ClosedPosition]
+
+
+class LeaderboardFollowRequest(msgspec.Struct, frozen=True):
+    """Body of POST /whales/leaderboard (rows under entries or data)"""
+    entries: Optional[List[LeaderboardEntry]] = None
+    data: Optional[List[LeaderboardEntry]] = None
+    category: str = 'leaderboard'
+    position_percentage: float = 0.02
+
+
+_positions_decoder = msgspec.json.Decoder(Union[List[ClosedPosition], Envelope[ClosedPosition]])
+_trades_decoder = msgspec.json.Decoder(Union[List[Trade], Envelope[Trade]])
+_leaderboard_decoder = msgspec.json.Decoder(Union[List[LeaderboardEntry], Envelope[LeaderboardEntry]])
+_leaderboard_follow_decoder = msgspec.json.Decoder(LeaderboardFollowRequest)
+_recorded_response_decoder = msgspec.json.Decoder(RecordedResponse)
+
+
+def _rows(decoded: Union[List[T], Envelope[T]]) -> List[T]:
+    return decoded.data if isinstance(decoded, Envelope) else decoded
+
+
+def decode_positions(raw: bytes) -> List[ClosedPosition]:
+    """Decode a closed-positions response body"""
+    return _rows(_positions_decoder.decode(raw))
+
+
+def decode_trades(raw: bytes) -> List[Trade]:
+    """Decode a trades response body"""
+    return _rows(_trades_decoder.decode(raw))
+
+
+def decode_leaderboard(raw: bytes) -> List[LeaderboardEntry]:
+    """Decode a leaderboard response body"""
+    return _rows(_leaderboard_decoder.decode(raw))
+
+
+def decode_leaderboard_follow(raw: bytes) -> LeaderboardFollowRequest:
+    """Decode a follow-leaderboard request body"""
+    return _leaderboard_follow_decoder.decode(raw)
+
+
+def decode_recorded_response(raw: bytes) -> RecordedResponse:
+    """Decode one line of a whale monitor recording"""
+    return _recorded_response_decoder.decode(raw)
+
+
+def encode(value) -> bytes:
+    """Encode structs (or plain JSON values) back to JSON bytes"""
+    return msgspec.json.encode(value)
+
+
+def timestamp_to_epoch(value: Union[int, str, None]) -> Optional[int]:
+    """Convert an epoch (seconds or milliseconds) or ISO-8601 timestamp to epoch seconds"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, int):
+        return value // 1000 if value > 10_000_000_000 else value
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def load_position_dump(path: str) -> List[ClosedPosition]:
+    """Load one scraper-backend closed-positions dump"""
+    with open(path, 'rb') as f:
+        return decode_positions(f.read())
+
+
+def load_position_dumps(directory: str) -> Dict[str, List[ClosedPosition]]:
+    """Load every <address>.json dump in a scraper-backend directory, keyed by address"""
+    dumps = {}
+    for path in sorted(glob.glob(os.path.join(directory, '0x*.json'))):
+        address = os.path.splitext(os.path.basename(path))[0].lower()
+        try:
+            dumps[address] = load_position_dump(path)
+        except (OSError, msgspec.DecodeError) as e:
+            logger.warning(f"Skipping position dump {path}: {e}")
+    return dumps
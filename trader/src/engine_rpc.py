@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Engine RPC - Unix-socket RPC between the engine process and HTTP workers
+The engine process owns the wallet, nonces, risk state and whale monitoring;
+HTTP workers hold an EngineProxy per service instead, so gunicorn can run
+several workers without duplicating any of that state. Frames are a 4-byte
+big-endian length followed by a JSON body. Calls are never retried once
+sent, so a dropped connection cannot place a bet twice.
+"""
+
+import os
+import socket
+import struct
+import asyncio
+import inspect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+import msgspec
+from profiler import ProfilerBusyError
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('>I')
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+# The only engine methods a worker may call: the service entry points the
+# HTTP routes use. Bets and trades go through the engine's risk checks; keys,
+# signers, clients and raw transaction paths are never reachable
+RPC_METHODS = frozenset({
+    'wallet_manager.get_address',
+    'web3_client.is_connected',
+    'web3_client.is_connected_async',
+    'web3_client.get_balance',
+    'web3_client.get_balance_async',
+    'web3_client.get_transaction_status',
+    'web3_client.wei_to_eth',
+    'trading_engine.execute_trade',
+    'trading_engine.execute_polymarket_bet',
+    'trading_engine.simulate_polymarket_bet',
+    'trading_engine.place_limit_orders',
+    'trading_engine.cancel_orders',
+    'trading_engine.replace_orders',
+    'trading_engine.get_open_orders',
+    'trading_engine.get_order_book',
+    'trading_engine.get_polymarket_balance',
+    'trading_engine.get_polymarket_balance_async',
+    'trading_engine.get_polymarket_market_info',
+    'trading_engine.get_account_pool_status',
+    'trading_engine.rebalance_accounts',
+    'trading_engine.redeem_resolved',
+    'trading_engine.get_positions',
+    'trading_engine.add_whale_to_monitor',
+    'trading_engine.remove_whale_from_monitor',
+    'trading_engine.follow_leaderboard',
+    'trading_engine.start_whale_monitoring',
+    'trading_engine.stop_whale_monitoring',
+    'trading_engine.get_whale_monitoring_status',
+    'trading_engine.get_traces',
+    'trading_engine.profile_cpu',
+    'trading_engine.profile_memory',
+    'trading_engine.render_metrics',
+    'trading_engine.event_bus.get_stats',
+    'trading_engine.event_bus.wait_since',
+    'trading_engine.event_bus.wait_since_async'
+})
+
+# Attributes a worker may resolve besides those methods (objects resolve to
+# an opaque proxy whose own attributes are checked against these sets)
+RPC_ATTRIBUTES = frozenset({
+    'web3_client.network_name',
+    'trading_engine.event_bus',
+    'trading_engine.whale_monitor',
+    'trading_engine.polymarket_client'
+})
+
+# Calls that schedule tasks on the engine's event loop run on the loop thread
+LOOP_METHODS = frozenset({
+    'trading_engine.start_whale_monitoring',
+    'trading_engine.stop_whale_monitoring'
+})
+
+PLAIN_TYPES = (str, int, float, bool, type(None), list, tuple, dict)
+
+
+class EngineRPCError(RuntimeError):
+    """Remote call failed in the engine (or the engine is unreachable)"""
+
+
+def _encode(message: Dict[str, Any]) -> bytes:
+    body = msgspec.json.encode(message, enc_hook=str)
+    return HEADER.pack(len(body)) + body
+
+
+def _raise_remote(response: Dict[str, Any]):
+    if response.get('type') == 'ValueError':
+        raise ValueError(response['error'])
+    if response.get('type') == 'ProfilerBusyError':
+        raise ProfilerBusyError(response['error'])
+    raise EngineRPCError(response['error'])
+
+
+class EngineRPCServer:
+    """Serves engine services to workers over a Unix socket"""
+
+    def __init__(self, services: Dict[str, Any], path: str):
+        """Initialize the server for a name -> service mapping"""
+        self.services = services
+        self.path = path
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.environ.get('ENGINE_RPC_THREADS', '64')),
+            thread_name_prefix='engine-rpc'
+        )
+        self.calls = 0
+        self.errors = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def _resolve(self, path: str, op: str):
+        allowed = path in RPC_METHODS if op == 'call' else path in RPC_METHODS or path in RPC_ATTRIBUTES
+        parts = path.split('.')
+        if not allowed or parts[0] not in self.services:
+            raise AttributeError(f"Not an engine RPC target: {path}")
+        target = self.services[parts[0]]
+        for part in parts[1:]:
+            target = getattr(target, part)
+        return target
+
+    async def _dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self.calls += 1
+        path = request.get('path', '')
+        try:
+            op = request.get('op')
+            target = self._resolve(path, op)
+            if op == 'resolve':
+                if isinstance(target, PLAIN_TYPES):
+                    return {'value': target}
+                return {'object': True, 'callable': callable(target)}
+
+            args = request.get('args') or []
+            kwargs = request.get('kwargs') or {}
+            if inspect.iscoroutinefunction(target):
+                result = await target(*args, **kwargs)
+            elif path in LOOP_METHODS:
+                result = target(*args, **kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self.executor, lambda: target(*args, **kwargs))
+            return {'value': result}
+
+        except Exception as e:
+            self.errors += 1
+            return {'error': str(e), 'type': type(e).__name__}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+                (length,) = HEADER.unpack(header)
+                if length > MAX_FRAME_BYTES:
+                    break
+                request = msgspec.json.decode(await reader.readexactly(length))
+                writer.write(_encode(await self._dispatch(request)))
+                await writer.drain()
+        except Exception as e:
+            logger.warning(f"Engine RPC connection error: {e}")
+        finally:
+            writer.close()
+
+    async def start(self):
+        """Listen on the socket path (replacing a stale socket file)"""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        os.chmod(self.path, 0o600)
+        logger.info(f"Engine RPC listening on {self.path}")
+
+    async def close(self):
+        """Stop listening"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class EngineRPCClient:
+    """Worker-side connections to the engine: one socket per thread, plus an async pool"""
+
+    def __init__(self, path: str):
+        """Initialize the client for the engine's socket path"""
+        self.path = path
+        self.timeout = float(os.environ.get('ENGINE_RPC_TIMEOUT', '120'))
+        self._local = threading.local()
+        self._async_idle: list = []
+        self.objects: set = set()  # Paths known to resolve to objects (methods, services)
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            raise EngineRPCError(f"Engine not reachable at {self.path}: {e}")
+        return sock
+
+    @staticmethod
+    def _read_exactly(sock: socket.socket, size: int) -> bytes:
+        buffer = bytearray()
+        while len(buffer) < size:
+            chunk = sock.recv(size - len(buffer))
+            if not chunk:
+                raise ConnectionError("engine closed the connection")
+            buffer += chunk
+        return bytes(buffer)
+
+    def request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one request and wait for its response"""
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = self._local.sock = self._connect()
+        try:
+            sock.sendall(_encode(message))
+            (length,) = HEADER.unpack(self._read_exactly(sock, HEADER.size))
+            return msgspec.json.decode(self._read_exactly(sock, length))
+        except (OSError, ConnectionError) as e:
+            # The call may have run; drop the socket but never resend it
+            sock.close()
+            self._local.sock = None
+            raise EngineRPCError(f"Engine RPC failed: {e}")
+
+    async def request_async(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one request from an event loop"""
+        if self._async_idle:
+            reader, writer = self._async_idle.pop()
+        else:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except OSError as e:
+                raise EngineRPCError(f"Engine not reachable at {self.path}: {e}")
+        try:
+            writer.write(_encode(message))
+            await writer.drain()
+            (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+            response = msgspec.json.decode(await reader.readexactly(length))
+        except (OSError, asyncio.IncompleteReadError) as e:
+            writer.close()
+            raise EngineRPCError(f"Engine RPC failed: {e}")
+        self._async_idle.append((reader, writer))
+        return response
+
+
+class EngineProxy:
+    """Stands in for an engine-process object inside a worker
+
+    Attribute access resolves remotely: plain values (str, numbers, dicts)
+    come back as values, objects as nested proxies. Calling a proxy runs
+    the method in the engine; methods named *_async return coroutines.
+    """
+
+    def __init__(self, client: EngineRPCClient, path: str):
+        self._client = client
+        self._path = path
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        path = f"{self._path}.{name}"
+        if name.endswith('_async') or path in self._client.objects:
+            return EngineProxy(self._client, path)
+        response = self._client.request({'op': 'resolve', 'path': path})
+        if 'error' in response:
+            raise AttributeError(response['error'])
+        if response.get('object'):
+            self._client.objects.add(path)
+            return EngineProxy(self._client, path)
+        return response['value']
+
+    def __call__(self, *args, **kwargs):
+        message = {'op': 'call', 'path': self._path, 'args': args, 'kwargs': kwargs}
+        if self._path.endswith('_async'):
+            return self._call_async(message)
+        response = self._client.request(message)
+        if 'error' in response:
+            _raise_remote(response)
+        return response['value']
+
+    async def _call_async(self, message: Dict[str, Any]):
+        response = await self._client.request_async(message)
+        if 'error' in response:
+            _raise_remote(response)
+        return response['value']
+
+    def __repr__(self) -> str:
+        return f"EngineProxy({self._path})"
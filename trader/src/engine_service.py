@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Engine Service - The single process that owns trading state
+Initializes the wallet, trading engine and whale monitor once and serves
+them to the HTTP workers over the ENGINE_SOCKET Unix socket. Signing, nonce
+tracking, risk counters and monitoring only ever happen here, so the HTTP
+tier can run as many workers as there are cores.
+
+Run:  ENGINE_SOCKET=/tmp/trader-engine.sock python engine_service.py
+"""
+
+import os
+import sys
+import signal
+import asyncio
+import logging
+
+import app as services  # Service initialization shared with the HTTP app
+from engine_rpc import EngineRPCServer
+
+logger = logging.getLogger(__name__)
+
+
+async def serve(path: str):
+    """Initialize services and serve them until SIGTERM/SIGINT"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, services.initialize_services, False)
+
+    targets = {
+        name: value for name, value in (
+            ('wallet_manager', services.wallet_manager),
+            ('web3_client', services.web3_client),
+            ('trading_engine', services.trading_engine),
+            ('risk_manager', services.risk_manager)
+        ) if value is not None
+    }
+    server = EngineRPCServer(targets, path)
+    await server.start()
+
+    # Monitoring runs on this loop, next to the RPC server
+    if os.environ.get('WHALE_MONITORING_AUTOSTART', 'false').lower() == 'true' and services.trading_engine:
+        services.trading_engine.start_whale_monitoring()
+
+    stop = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    logger.info("Engine shutting down")
+    if services.trading_engine and services.trading_engine.whale_monitor:
+        services.trading_engine.stop_whale_monitoring()
+    await server.close()
+
+
+def main():
+    """Engine process entry point"""
+    path = os.environ.get('ENGINE_SOCKET')
+    if not path:
+        logger.error("ENGINE_SOCKET must be set")
+        sys.exit(1)
+    asyncio.run(serve(path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Event Bus - In-process pub/sub for bot activity
+The whale monitor, trading engine and risk manager publish whale trades,
+fills and rejections here; the /events stream pushes them to the UI as they
+happen instead of the UI polling REST endpoints. Publishing never blocks:
+each subscriber has a bounded buffer that drops its oldest events when the
+client falls behind, and drops are counted and reported to the client.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def format_sse(event: Dict[str, Any]) -> bytes:
+    """One server-sent event frame"""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n".encode()
+
+
+def format_sse_drops(count: int) -> bytes:
+    """Tells the client it missed events and should resync over REST"""
+    return f"event: dropped\ndata: {json.dumps({'count': count})}\n\n".encode()
+
+
+class Subscription:
+    """One subscriber's bounded event buffer"""
+
+    def __init__(self, bus: 'EventBus', types: Optional[Iterable[str]], buffer_size: int):
+        self.bus = bus
+        self.types = frozenset(types) if types else None
+        self.queue: deque = deque()
+        self.buffer_size = buffer_size
+        self.dropped = 0
+        self._unreported_drops = 0
+        self._ready = threading.Condition(bus._lock)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def wants(self, event_type: str) -> bool:
+        return self.types is None or event_type in self.types
+
+    def _push(self, event: Dict[str, Any]):
+        """Buffer an event (caller holds the bus lock)"""
+        if len(self.queue) >= self.buffer_size:
+            self.queue.popleft()
+            self.dropped += 1
+            self._unreported_drops += 1
+            self.bus.dropped += 1
+        self.queue.append(event)
+        self._ready.notify()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _drain(self) -> Tuple[List[Dict[str, Any]], int]:
+        events = list(self.queue)
+        self.queue.clear()
+        dropped, self._unreported_drops = self._unreported_drops, 0
+        return events, dropped
+
+    def get(self, timeout: float) -> Tuple[List[Dict[str, Any]], int]:
+        """Wait up to timeout for events; returns (events, drops since last call)"""
+        with self._ready:
+            if not self.queue:
+                self._ready.wait(timeout)
+            return self._drain()
+
+    async def get_async(self, timeout: float) -> Tuple[List[Dict[str, Any]], int]:
+        """Event-loop version of get"""
+        if self._loop is None:
+            self._wakeup = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+        with self._ready:
+            if self.queue:
+                return self._drain()
+            self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._ready:
+            return self._drain()
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """Fan-out of bot events to subscribers, safe to publish from any thread"""
+
+    def __init__(self):
+        """Initialize the bus"""
+        self.history_size = int(os.environ.get('EVENT_BUS_HISTORY', '1000'))
+        self.buffer_size = int(os.environ.get('EVENT_SUBSCRIBER_BUFFER', '256'))
+        self.history: deque = deque(maxlen=self.history_size)  # For Last-Event-ID resumes
+        self.subscribers: List[Subscription] = []
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> int:
+        """Publish an event to every matching subscriber; returns its id"""
+        with self._lock:
+            event = {
+                'id': self._next_id,
+                'type': event_type,
+                'time': time.time(),
+                'data': data
+            }
+            self._next_id += 1
+            self.published += 1
+            self.history.append(event)
+            for subscription in self.subscribers:
+                if subscription.wants(event_type):
+                    subscription._push(event)
+        return event['id']
+
+    def _history_since(self, last_id: int, types: Optional[frozenset]) -> Tuple[List[Dict[str, Any]], int]:
+        """Events after last_id still in history, and how many already rolled off (caller holds the lock)"""
+        if not self.history or last_id >= self.history[-1]['id']:
+            return [], 0
+        missed = max(0, self.history[0]['id'] - last_id - 1)
+        events = [event for event in self.history
+                  if event['id'] > last_id and (types is None or event['type'] in types)]
+        return events, missed
+
+    def subscribe(self, types: Optional[Iterable[str]] = None, last_id: Optional[int] = None) -> Subscription:
+        """Subscribe to events (all types by default), replaying history after last_id"""
+        subscription = Subscription(self, types, self.buffer_size)
+        with self._lock:
+            if last_id is not None:
+                events, missed = self._history_since(last_id, subscription.types)
+                subscription._unreported_drops += missed
+                for event in events:
+                    subscription._push(event)
+            self.subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscriber"""
+        with self._lock:
+            if subscription in self.subscribers:
+                self.subscribers.remove(subscription)
+
+    def wait_since(self, last_id: int, timeout: float, types: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Long-poll for events after last_id (for subscribers in another process)"""
+        subscription = self.subscribe(types, last_id)
+        try:
+            events, dropped = subscription.get(timeout)
+        finally:
+            subscription.close()
+        return {'events': events, 'dropped': dropped}
+
+    async def wait_since_async(self, last_id: int, timeout: float, types: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Event-loop version of wait_since"""
+        subscription = self.subscribe(types, last_id)
+        try:
+            events, dropped = await subscription.get_async(timeout)
+        finally:
+            subscription.close()
+        return {'events': events, 'dropped': dropped}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Bus counters"""
+        with self._lock:
+            return {
+                'subscribers': len(self.subscribers),
+                'published': self.published,
+                'dropped': self.dropped,
+                'last_id': self._next_id - 1,
+                'buffer_size': self.buffer_size,
+                'history_size': self.history_size
+            }
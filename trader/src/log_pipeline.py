@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Log Pipeline - Structured logging off the trading threads
+Records are put on an in-process queue as-is; formatting (JSON or text)
+and writing happen on a listener thread, so a log call on the trading path
+costs a record allocation and a queue put. High-frequency DEBUG call sites
+are sampled before they are queued (every Nth record per call site).
+Caller and process lookups are switched off at setup (the logging HOWTO's
+optimization flags) since records never print them.
+"""
+
+import os
+import sys
+import queue
+import atexit
+import logging
+import logging.handlers
+from typing import Any, Dict, Optional, Tuple
+import msgspec
+
+# LogRecord attributes that are not user-supplied `extra` fields
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record, with `extra` fields as top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'ts': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName
+        }
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return msgspec.json.encode(entry, enc_hook=str).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps every Nth DEBUG record per call site; other levels always pass"""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self.seen: Dict[Tuple[str, Any], int] = {}
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        # Lazy %-style templates identify the call site
+        site = (record.name, record.msg if isinstance(record.msg, str) else type(record.msg).__name__)
+        count = self.seen.get(site, 0)
+        self.seen[site] = count + 1
+        if count % self.every == 0:
+            return True
+        self.dropped += 1
+        return False
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread
+
+    The stock handler formats the message before enqueuing; the queue here
+    never leaves the process, so the record (args included) is passed as is.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None):
+    """Route the root logger through the queue; safe to call more than once"""
+    global _listener
+    if _listener is not None:
+        return
+
+    level = (level or os.environ.get('LOG_LEVEL', 'INFO')).upper()
+    fmt = (fmt or os.environ.get('LOG_FORMAT', 'json')).lower()
+
+    output = logging.StreamHandler(sys.stdout)
+    if fmt == 'json':
+        output.setFormatter(JSONFormatter())
+    else:
+        output.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(records)
+    handler.addFilter(SamplingFilter(int(os.environ.get('LOG_DEBUG_SAMPLE_EVERY', '100'))))
+
+    # Skip the stack walk and process lookups for every record
+    if os.environ.get('LOG_CALLER_INFO', 'false').lower() != 'true':
+        logging._srcfile = None
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
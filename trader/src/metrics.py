@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Metrics - Low-overhead counters and histograms for the copy-trading hot path
+Recording is a lock, a bisect over fixed buckets and two additions, so it
+stays on in production. The registry renders the Prometheus text format for
+GET /metrics. Label sets per metric are capped (METRICS_MAX_SERIES); extra
+ones are folded into an "other" series so per-whale labels cannot grow
+without bound.
+"""
+
+import os
+import time
+import bisect
+import logging
+import threading
+from typing import Any, Dict, List, Sequence, Tuple
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+MAX_SERIES = int(os.environ.get('METRICS_MAX_SERIES', '500'))
+
+# Bucket upper bounds in seconds
+RPC_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIGN_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05)
+LAG_BUCKETS = (1.0, 2.0, 5.0, 10.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Shared label handling"""
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._other = tuple('other' for _ in self.label_names)
+
+    def _key(self, series: Dict, values: Tuple[str, ...]) -> Tuple[str, ...]:
+        """Label values to store under (caller holds the lock)"""
+        if values in series or len(series) < MAX_SERIES:
+            return values
+        return self._other
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic counter"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self._lock:
+            key = self._key(self.values, label_values)
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            for values, total in self.values.items():
+                lines.append(f"{self.name}{_format_labels(self.label_names, values)} {_format_value(total)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = RPC_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.bounds = tuple(sorted(buckets))
+        self.series: Dict[Tuple[str, ...], List[float]] = {}  # per bucket counts, then sum, then count
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            key = self._key(self.series, label_values)
+            counts = self.series.get(key)
+            if counts is None:
+                counts = self.series[key] = [0] * (len(self.bounds) + 1) + [0.0, 0]
+            counts[index] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            snapshot = [(values, list(counts)) for values, counts in self.series.items()]
+        for values, counts in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, values, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(counts[-2])}")
+            lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+    def summary(self, quantiles: Sequence[float] = (0.5, 0.95, 0.99)) -> Dict[str, Dict[str, float]]:
+        """count, mean and quantiles (interpolated within buckets, as histogram_quantile does) per label set"""
+        with self._lock:
+            snapshot = [(values, list(counts)) for values, counts in self.series.items()]
+        result = {}
+        for values, counts in snapshot:
+            total = counts[-1]
+            entry = {'count': total, 'mean': counts[-2] / total if total else 0.0}
+            for quantile in quantiles:
+                rank = quantile * total
+                cumulative = 0
+                estimate = self.bounds[-1]
+                for index, count in enumerate(counts[:len(self.bounds)]):
+                    if count and cumulative + count >= rank:
+                        lower = self.bounds[index - 1] if index else 0.0
+                        estimate = lower + (self.bounds[index] - lower) * (rank - cumulative) / count
+                        break
+                    cumulative += count
+                entry[f"p{round(quantile * 100):g}"] = estimate
+            result[','.join(values)] = entry
+        return result
+
+
+class Registry:
+    """Metrics rendered together on /metrics"""
+
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = RPC_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class InclusionTimer:
+    """Send times of our transactions, observed once their logs are seen
+
+    A transaction sent inside a trace also gets a receipt span in it.
+    """
+
+    def __init__(self, histogram: Histogram, max_pending: int = 10000):
+        self.histogram = histogram
+        self.max_pending = max_pending
+        self.pending: Dict[str, Tuple[float, str, Any, int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(tx_hash) -> str:
+        if isinstance(tx_hash, str):
+            return tx_hash.lower().removeprefix('0x')
+        return bytes(tx_hash).hex()
+
+    def sent(self, tx_hash, kind: str):
+        with self._lock:
+            if len(self.pending) >= self.max_pending:
+                self.pending.pop(next(iter(self.pending)))
+            self.pending[self._key(tx_hash)] = (time.monotonic(), kind, tracer.current(), time.time_ns())
+
+    def included(self, tx_hash):
+        with self._lock:
+            entry = self.pending.pop(self._key(tx_hash), None)
+        if entry is not None:
+            sent_at, kind, span, sent_ns = entry
+            self.histogram.observe(time.monotonic() - sent_at, kind)
+            if span is not None:
+                tracer.record('receipt', sent_ns, parent=span, kind=kind)
+
+
+REGISTRY = Registry()
+
+RPC_LATENCY = REGISTRY.histogram(
+    'trader_rpc_latency_seconds', 'JSON-RPC request latency by method', ['method'])
+RPC_ERRORS = REGISTRY.counter(
+    'trader_rpc_errors_total', 'JSON-RPC requests that raised or returned an error', ['method'])
+DATA_API_LATENCY = REGISTRY.histogram(
+    'trader_data_api_latency_seconds', 'Data-api trade fetch latency per whale', ['whale'])
+DETECTION_LAG = REGISTRY.histogram(
+    'trader_detection_lag_seconds', 'Whale trade time to our detection of it', buckets=LAG_BUCKETS)
+QUEUE_WAIT = REGISTRY.histogram(
+    'trader_account_queue_wait_seconds', 'Time a copy trade waits for its account lane', ['account'])
+PRETRADE_READ = REGISTRY.histogram(
+    'trader_pretrade_read_seconds', 'Balance and book reads before a copy trade is placed')
+SIGN_TIME = REGISTRY.histogram(
+    'trader_sign_seconds', 'Local signing time', ['kind'], buckets=SIGN_BUCKETS)
+SUBMIT_TO_INCLUSION = REGISTRY.histogram(
+    'trader_submit_to_inclusion_seconds', 'Transaction send to its transfer log seen by the position tracker',
+    ['kind'], buckets=LAG_BUCKETS)
+COPY_TRADES = REGISTRY.counter(
+    'trader_copy_trades_total', 'Copy trades by outcome', ['status'])
+
+inclusion = InclusionTimer(SUBMIT_TO_INCLUSION)
+
+
+def render_metrics() -> str:
+    """This process's metrics in the Prometheus text format"""
+    return REGISTRY.render()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Order Book Mirror - Local copies of CLOB order books
+Each book starts from a snapshot and is kept current by the market channel's
+incremental messages. Price levels live in sorted arrays (bisect updates,
+best bid/ask read from the ends), so pricing and sizing decisions read
+prices locally instead of making a network call. Each book has a lock: the
+feed applies updates on the event loop while account lanes read from their
+threads, and a reader never sees a half-applied message. A quiet market's
+book is still current while the feed is alive, so a book is fresh when it was
+snapshotted on the current connection and the feed (messages or PONG
+heartbeats) was heard from within ORDER_BOOK_MAX_AGE_SECONDS. The feed can be
+recorded to JSONL and replayed through the same message handler.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Prices are stored as integer ticks of 1/10000 to keep keys exact
+PRICE_SCALE = 10_000
+
+
+def to_ticks(price: Union[str, float]) -> int:
+    return int(round(float(price) * PRICE_SCALE))
+
+
+class BookSide:
+    """Price levels of one side: sorted tick array plus tick -> size"""
+
+    __slots__ = ('ticks', 'sizes')
+
+    def __init__(self):
+        self.ticks: List[int] = []
+        self.sizes: Dict[int, float] = {}
+
+    def clear(self):
+        self.ticks.clear()
+        self.sizes.clear()
+
+    def set(self, tick: int, size: float):
+        """Set a level's size; size 0 removes the level"""
+        if size <= 0:
+            if self.sizes.pop(tick, None) is not None:
+                del self.ticks[bisect_left(self.ticks, tick)]
+            return
+        if tick not in self.sizes:
+            self.ticks.insert(bisect_left(self.ticks, tick), tick)
+        self.sizes[tick] = size
+
+    def __len__(self) -> int:
+        return len(self.ticks)
+
+
+class OrderBook:
+    """Mirror of one outcome token's book"""
+
+    def __init__(self, asset_id: str):
+        self.asset_id = asset_id
+        self.bids = BookSide()  # ascending, best bid last
+        self.asks = BookSide()  # ascending, best ask first
+        self.last_trade_price: Optional[float] = None
+        self.updated_at = 0.0
+        self.snapshot_hash: Optional[str] = None
+        self.connection: Optional[int] = None  # Feed connection of the last snapshot
+        self.updates = 0
+        self._lock = threading.RLock()
+
+    def apply_snapshot(self, bids: Iterable[Dict[str, Any]], asks: Iterable[Dict[str, Any]], book_hash: Optional[str] = None):
+        """Replace the book with a full snapshot"""
+        with self._lock:
+            self.bids.clear()
+            self.asks.clear()
+            for level in bids:
+                self.bids.set(to_ticks(level['price']), float(level['size']))
+            for level in asks:
+                self.asks.set(to_ticks(level['price']), float(level['size']))
+            self.snapshot_hash = book_hash
+            self.updated_at = time.monotonic()
+
+    def apply_change(self, side: str, price: Union[str, float], size: Union[str, float]):
+        """Apply one level update; side is BUY (bids) or SELL (asks)"""
+        with self._lock:
+            book_side = self.bids if side.upper() in ('BUY', 'BID') else self.asks
+            book_side.set(to_ticks(price), float(size))
+            self.updates += 1
+            self.updated_at = time.monotonic()
+
+    def apply_changes(self, changes: Iterable[Dict[str, Any]]):
+        """Apply the level updates of one message together"""
+        with self._lock:
+            for change in changes:
+                self.apply_change(change['side'], change['price'], change['size'])
+
+    def best_bid(self) -> Optional[float]:
+        with self._lock:
+            return self.bids.ticks[-1] / PRICE_SCALE if self.bids.ticks else None
+
+    def best_ask(self) -> Optional[float]:
+        with self._lock:
+            return self.asks.ticks[0] / PRICE_SCALE if self.asks.ticks else None
+
+    def mid(self) -> Optional[float]:
+        with self._lock:
+            bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return ask if bid is None else bid
+        return (bid + ask) / 2
+
+    def spread(self) -> Optional[float]:
+        with self._lock:
+            bid, ask = self.best_bid(), self.best_ask()
+        return None if bid is None or ask is None else round(ask - bid, 6)
+
+    def buy_depth(self, max_price: float) -> Tuple[float, float]:
+        """USDC cost and tokens available buying up to max_price"""
+        limit = to_ticks(max_price)
+        cost = tokens = 0.0
+        with self._lock:
+            for tick in self.asks.ticks:
+                if tick > limit:
+                    break
+                size = self.asks.sizes[tick]
+                cost += size * tick / PRICE_SCALE
+                tokens += size
+        return cost, tokens
+
+    def get_summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'asset_id': self.asset_id,
+                'best_bid': self.best_bid(),
+                'best_ask': self.best_ask(),
+                'spread': self.spread(),
+                'bid_levels': len(self.bids),
+                'ask_levels': len(self.asks),
+                'last_trade_price': self.last_trade_price,
+                'updates': self.updates,
+                'age_seconds': round(time.monotonic() - self.updated_at, 3) if self.updated_at else None
+            }
+
+
+class OrderBookMirror:
+    """Books for the tokens our whales trade, fed by the CLOB market websocket"""
+
+    def __init__(self):
+        """Initialize an empty mirror"""
+        self.ws_url = os.environ.get('CLOB_WS_URL', 'wss://ws-subscriptions-clob.polymarket.com/ws/market')
+        self.max_age = float(os.environ.get('ORDER_BOOK_MAX_AGE_SECONDS', '30'))
+        self.record_path = os.environ.get('ORDER_BOOK_RECORD_PATH') or None
+
+        self.books: Dict[str, OrderBook] = {}
+        self.tracked: Set[str] = set()
+        self.messages = 0
+        self.reconnects = 0
+        self.connection = 0
+        self.last_message_at = 0.0
+        self.clock = time.monotonic
+        self.running = False
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._record_file = None
+
+    def is_live(self) -> bool:
+        """Whether the feed delivered a message or heartbeat within max_age"""
+        return self.last_message_at > 0 and self.clock() - self.last_message_at <= self.max_age
+
+    def is_fresh(self, book: OrderBook) -> bool:
+        """Snapshotted on the current connection of a live feed, however quiet its market"""
+        return book.connection == self.connection and self.is_live()
+
+    def get(self, asset_id: str, fresh_only: bool = True) -> Optional[OrderBook]:
+        """Book for a token (None when unknown or, with fresh_only, stale)"""
+        book = self.books.get(asset_id)
+        if book is None or (fresh_only and not self.is_fresh(book)):
+            return None
+        return book
+
+    def _book(self, asset_id: str) -> OrderBook:
+        book = self.books.get(asset_id)
+        if book is None:
+            book = self.books[asset_id] = OrderBook(asset_id)
+        return book
+
+    def handle_message(self, message: Union[str, bytes, Dict[str, Any], List[Any]]):
+        """Apply one feed message (raw JSON or decoded; single event or list of events)"""
+        self.last_message_at = self.clock()
+        if isinstance(message, (str, bytes)):
+            if message in ('PONG', b'PONG'):
+                return
+            message = json.loads(message)
+        events = message if isinstance(message, list) else [message]
+
+        for event in events:
+            self.messages += 1
+            event_type = event.get('event_type')
+            if event_type == 'book':
+                book = self._book(event['asset_id'])
+                book.apply_snapshot(
+                    event.get('bids') or event.get('buys') or [],
+                    event.get('asks') or event.get('sells') or [],
+                    event.get('hash')
+                )
+                book.connection = self.connection
+            elif event_type == 'price_change':
+                if 'price_changes' in event:
+                    # Current format: one entry per asset and level
+                    by_asset: Dict[str, List[Dict[str, Any]]] = {}
+                    for change in event['price_changes']:
+                        by_asset.setdefault(change['asset_id'], []).append(change)
+                    for asset_id, changes in by_asset.items():
+                        self._book(asset_id).apply_changes(changes)
+                else:
+                    self._book(event['asset_id']).apply_changes(event.get('changes', []))
+            elif event_type == 'last_trade_price':
+                self._book(event['asset_id']).last_trade_price = float(event['price'])
+
+    def replay(self, path: str) -> int:
+        """Apply a recorded JSONL feed; returns the number of messages applied"""
+        count = 0
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    self.handle_message(line)
+                    count += 1
+        return count
+
+    def _record(self, raw: str):
+        if self.record_path:
+            if self._record_file is None:
+                self._record_file = open(self.record_path, 'a')
+            self._record_file.write(raw + '\n')
+
+    def track(self, asset_ids: Iterable[str]):
+        """Mirror these tokens' books, subscribing on the live connection if there is one"""
+        new_ids = [asset_id for asset_id in asset_ids if asset_id and asset_id not in self.tracked]
+        if not new_ids:
+            return
+        self.tracked.update(new_ids)
+        if self._ws is not None and not self._ws.closed:
+            asyncio.ensure_future(self._ws.send_json({'assets_ids': new_ids, 'operation': 'subscribe'}))
+
+    async def _ping(self, ws: aiohttp.ClientWebSocketResponse):
+        # PONGs keep a quiet feed live, so ping well within max_age
+        while not ws.closed:
+            await asyncio.sleep(min(10.0, self.max_age / 3))
+            await ws.send_str('PING')
+
+    async def run(self):
+        """Keep the websocket connected and apply its messages until stopped"""
+        self.running = True
+        backoff = 1.0
+        async with aiohttp.ClientSession() as session:
+            while self.running:
+                if not self.tracked:
+                    await asyncio.sleep(1)
+                    continue
+                try:
+                    async with session.ws_connect(self.ws_url, heartbeat=None) as ws:
+                        self._ws = ws
+                        # Books are stale until re-snapshotted on this connection
+                        self.connection += 1
+                        await ws.send_json({'assets_ids': sorted(self.tracked), 'type': 'market'})
+                        logger.info(f"Order book feed connected ({len(self.tracked)} tokens)")
+                        backoff = 1.0
+                        pinger = asyncio.create_task(self._ping(ws))
+                        try:
+                            async for message in ws:
+                                if not self.running:
+                                    break
+                                if message.type == aiohttp.WSMsgType.TEXT:
+                                    self._record(message.data)
+                                    self.handle_message(message.data)
+                                elif message.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                    break
+                        finally:
+                            pinger.cancel()
+                except Exception as e:
+                    logger.warning(f"Order book feed error: {e}")
+                finally:
+                    self._ws = None
+                    self.last_message_at = 0.0
+
+                if self.running:
+                    # Books are re-snapshotted on reconnect
+                    self.reconnects += 1
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 30.0)
+
+        if self._record_file is not None:
+            self._record_file.close()
+            self._record_file = None
+
+    def stop(self):
+        """Stop the feed loop"""
+        self.running = False
+        if self._ws is not None and not self._ws.closed:
+            asyncio.ensure_future(self._ws.close())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Feed and book counters"""
+        return {
+            'tracked_tokens': len(self.tracked),
+            'books': len(self.books),
+            'fresh_books': sum(1 for book in self.books.values() if self.is_fresh(book)),
+            'messages': self.messages,
+            'feed_age_seconds': round(self.clock() - self.last_message_at, 3) if self.last_message_at else None,
+            'reconnects': self.reconnects,
+            'connected': self._ws is not None and not self._ws.closed
+        }
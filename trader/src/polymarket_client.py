@@ -4,21 +4,32 @@ Polymarket Client - Handles Polymarket-specific trading operations
 Integrates with Polymarket's smart contracts for prediction market trading
 """
 
+import time
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from web3 import Web3
-from eth_utils import to_checksum_address, to_hex
+from web3.exceptions import TimeExhausted, TransactionNotFound
+from eth_utils import to_hex
+from addresses import to_address
+import os
 import json
+from tx_templates import TransactionTemplateCache, NonceReconciler, encode_address
+from trade_simulator import TradeSimulator, SimulationError
+from clob_client import ClobClient
+from metrics import inclusion
+from tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+BALANCE_OF_SELECTOR = bytes.fromhex('70a08231')  # balanceOf(address)
+
 class PolymarketClient:
     """Client for interacting with Polymarket smart contracts"""
     
     # Polymarket contract addresses (Polygon mainnet)
-    USDC_CONTRACT = "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174"  # USDC on Polygon
-    CONDITIONAL_TOKENS_CONTRACT = "0x4D97DCd97eC945f40cF65F87097ACe5EA0476045"
-    COLLATERAL_TOKEN_CONTRACT = "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174"  # USDC
+    USDC_CONTRACT = to_address("0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174")  # USDC on Polygon
+    CONDITIONAL_TOKENS_CONTRACT = to_address("0x4D97DCd97eC945f40cF65F87097ACe5EA0476045")
+    COLLATERAL_TOKEN_CONTRACT = to_address("0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174")  # USDC
     FIXED_PRODUCT_MARKET_MAKER_CONTRACT = "0x89Cb14B8E8cF0d5C3e7E6B9B0c0c0c0c0c0c0c0c"  # Example address
     
     # ERC20 ABI for USDC
@@ -79,6 +90,33 @@ class PolymarketClient:
             "name": "mergePositions",
             "outputs": [],
             "type": "function"
+        },
+        {
+            "constant": True,
+            "inputs": [
+                {"name": "owners", "type": "address[]"},
+                {"name": "ids", "type": "uint256[]"}
+            ],
+            "name": "balanceOfBatch",
+            "outputs": [{"name": "", "type": "uint256[]"}],
+            "type": "function"
+        },
+        {
+            "constant": True,
+            "inputs": [{"name": "", "type": "bytes32"}],
+            "name": "payoutDenominator",
+            "outputs": [{"name": "", "type": "uint256"}],
+            "type": "function"
+        },
+        {
+            "constant": True,
+            "inputs": [
+                {"name": "", "type": "bytes32"},
+                {"name": "", "type": "uint256"}
+            ],
+            "name": "payoutNumerators",
+            "outputs": [{"name": "", "type": "uint256"}],
+            "type": "function"
         }
     ]
     
@@ -138,13 +176,47 @@ class PolymarketClient:
         # Market maker contract (will be set per market)
         self.market_maker_contract = None
         
+        # eth_call simulation of every bet before it is signed
+        self.simulate_bets = os.environ.get('PRE_TRADE_SIMULATION', 'true').lower() == 'true'
+        self.simulator = TradeSimulator(web3_client, self.USDC_CONTRACT)
+        
+        # (account_index, spender) -> (tx_hash, amount, sent_at) for approvals not yet mined
+        self._pending_approvals: Dict[Tuple[int, str], Tuple[str, int, float]] = {}
+        
+        # Off-chain order book (EIP-712 signed limit orders)
+        self.clob = ClobClient(wallet_manager)
+        
+        # Pre-built bet/approve transactions for the fast signing path,
+        # one nonce sequence per derived account
+        self.account_templates = [
+            TransactionTemplateCache(web3_client, wallet_manager, account_index)
+            for account_index in range(wallet_manager.account_count)
+        ]
+        self.tx_templates = self.account_templates[0]
+        for templates in self.account_templates:
+            try:
+                templates.prepare()
+            except Exception as e:
+                logger.warning(f"Could not prepare transaction templates for {templates.address}: {e}")
+        self.nonce_reconciler = NonceReconciler(self.account_templates)
+        self.receipt_timeout = float(os.environ.get('TX_RECEIPT_TIMEOUT', '120'))
+        
         logger.info("Polymarket client initialized")
     
+    def wait_for_receipt(self, tx_hash: str, account_index: int = 0, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Wait for one of our transactions to be mined; re-syncs the account's nonce if it never is"""
+        try:
+            return self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout or self.receipt_timeout)
+        except TimeExhausted:
+            logger.warning(f"No receipt for {tx_hash} (account {account_index}); reconciling its nonce")
+            self.account_templates[account_index].reconcile_nonce(force=True)
+            raise
+    
     def set_market_maker_contract(self, market_maker_address: str):
         """Set the market maker contract for a specific market"""
         try:
             self.market_maker_contract = self.w3.eth.contract(
-                address=to_checksum_address(market_maker_address),
+                address=to_address(market_maker_address),
                 abi=self.MARKET_MAKER_ABI
             )
             logger.info(f"Market maker contract set: {market_maker_address}")
@@ -152,75 +224,103 @@ class PolymarketClient:
             logger.error(f"Failed to set market maker contract: {e}")
             raise
     
-    def get_usdc_balance(self) -> int:
+    def get_usdc_balance(self, account_index: int = 0) -> int:
         """Get USDC balance of the wallet"""
         try:
             balance = self.usdc_contract.functions.balanceOf(
-                self.wallet_manager.get_address()
+                self.wallet_manager.get_address(account_index)
             ).call()
-            logger.info(f"USDC balance: {balance / 1e6} USDC")
+            logger.debug("USDC balance: %s units (account %s)", balance, account_index)
             return balance
         except Exception as e:
             logger.error(f"Failed to get USDC balance: {e}")
             raise
     
-    def get_usdc_allowance(self, spender: str) -> int:
+    async def get_usdc_balance_async(self, account_index: int = 0) -> int:
+        """Get USDC balance of the wallet without blocking the event loop"""
+        try:
+            result = await self.web3_client.call_async({
+                'to': self.USDC_CONTRACT,
+                'data': '0x' + (BALANCE_OF_SELECTOR + encode_address(self.wallet_manager.get_address(account_index))).hex()
+            })
+            return int.from_bytes(result, 'big')
+        except Exception as e:
+            logger.error(f"Failed to get USDC balance: {e}")
+            raise
+    
+    def get_usdc_allowance(self, spender: str, account_index: int = 0) -> int:
         """Get USDC allowance for a spender contract"""
         try:
             allowance = self.usdc_contract.functions.allowance(
-                self.wallet_manager.get_address(),
-                to_checksum_address(spender)
+                self.wallet_manager.get_address(account_index),
+                to_address(spender)
             ).call()
             return allowance
         except Exception as e:
             logger.error(f"Failed to get USDC allowance: {e}")
             raise
     
-    def approve_usdc(self, spender: str, amount: int) -> str:
+    def approve_usdc(self, spender: str, amount: int, account_index: int = 0) -> str:
         """Approve USDC spending for a contract"""
         try:
             logger.info(f"Approving {amount / 1e6} USDC for {spender}")
             
-            # Build approval transaction
-            transaction = self.usdc_contract.functions.approve(
-                to_checksum_address(spender),
-                amount
-            ).build_transaction({
-                'from': self.wallet_manager.get_address(),
-                'gas': 100000,  # Standard approval gas
-                'gasPrice': self.web3_client.get_gas_price(),
-                'nonce': self.web3_client.w3.eth.get_transaction_count(
-                    self.wallet_manager.get_address()
-                )
-            })
+            # Sign from the pre-built approve template and send
+            templates = self.account_templates[account_index]
+            signed_txn = templates.sign_approve(self.USDC_CONTRACT, spender, amount)
+            try:
+                tx_hash = self.w3.eth.send_raw_transaction(signed_txn['raw_transaction'])
+            except Exception:
+                templates.reset_nonce()
+                raise
             
-            # Send transaction
-            result = self.web3_client.send_transaction(transaction)
-            logger.info(f"USDC approval transaction: {result['tx_hash']}")
-            return result['tx_hash']
+            tx_hash_hex = tx_hash.hex()
+            self._pending_approvals[(account_index, to_address(spender))] = (tx_hash_hex, amount, time.monotonic())
+            logger.info(f"USDC approval transaction: {tx_hash_hex}")
+            return tx_hash_hex
             
         except Exception as e:
             logger.error(f"Failed to approve USDC: {e}")
             raise
     
-    def place_bet(self, market_id: str, outcome: int, amount_usdc: float, price: float) -> Dict[str, Any]:
+    def pending_approval(self, spender: str, account_index: int = 0) -> Optional[Tuple[str, int]]:
+        """(spender, amount) of an approval we sent that is not mined yet, else None"""
+        key = (account_index, to_address(spender))
+        entry = self._pending_approvals.get(key)
+        if entry is None:
+            return None
+        tx_hash, amount, sent_at = entry
+        try:
+            receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            receipt = None
+        if receipt is None and time.monotonic() - sent_at < self.receipt_timeout:
+            return key[1], amount
+        # Mined (the allowance is chain state now) or given up on
+        del self._pending_approvals[key]
+        return None
+    
+    def place_bet(self, market_id: str, outcome: int, amount_usdc: float, price: float, account_index: int = 0) -> Dict[str, Any]:
         """Place a bet on a Polymarket prediction market"""
         try:
-            logger.info(f"Placing bet: {amount_usdc} USDC on outcome {outcome} at price {price}")
+            logger.debug("Placing bet: %s USDC on outcome %s at price %s (account %s)", amount_usdc, outcome, price, account_index)
+            templates = self.account_templates[account_index]
             
             # Convert amount to USDC units (6 decimals)
             amount_units = int(amount_usdc * 1e6)
             
             # Check USDC balance
-            balance = self.get_usdc_balance()
+            balance = self.get_usdc_balance(account_index)
             if balance < amount_units:
                 raise ValueError(f"Insufficient USDC balance: {balance / 1e6} USDC available, {amount_usdc} USDC required")
             
             # Check allowance for conditional tokens contract
-            allowance = self.get_usdc_allowance(self.CONDITIONAL_TOKENS_CONTRACT)
-            if allowance < amount_units:
+            allowance = self.get_usdc_allowance(self.CONDITIONAL_TOKENS_CONTRACT, account_index)
+            pending_approval = self.pending_approval(self.CONDITIONAL_TOKENS_CONTRACT, account_index) if allowance < amount_units else None
+            if allowance < amount_units and (pending_approval is None or pending_approval[1] < amount_units):
                 logger.info("Insufficient allowance, approving USDC...")
-                self.approve_usdc(self.CONDITIONAL_TOKENS_CONTRACT, amount_units)
+                self.approve_usdc(self.CONDITIONAL_TOKENS_CONTRACT, amount_units, account_index)
+                pending_approval = (self.CONDITIONAL_TOKENS_CONTRACT, amount_units)
             
             
             # Implement actual bet placement logic
@@ -233,34 +333,46 @@ class PolymarketClient:
             # Convert price to wei (price is typically between 0-1, scaled by 1e18)
             max_price_wei = int(price * 1e18)
             
-            # Calculate expected tokens to buy (optional - for slippage protection)
-            try:
-                expected_tokens = self.market_maker_contract.functions.calcBuyAmount(
-                    outcome, amount_units
-                ).call()
-                logger.info(f"Expected tokens to receive: {expected_tokens / 1e18}")
-            except Exception as e:
-                logger.warning(f"Could not calculate expected tokens: {e}")
-                expected_tokens = 0
+            # Simulate the exact buy before signing so failing bets never reach the chain
+            expected_tokens = 0
+            simulation = None
+            if self.simulate_bets:
+                try:
+                    with tracer.span('simulate'):
+                        simulation = self.simulator.simulate_bet(
+                            templates.address, self.market_maker_contract.address, outcome, amount_units, max_price_wei,
+                            pending_approval
+                        )
+                except SimulationError as e:
+                    logger.warning(f"Bet simulation unavailable, sending unsimulated: {e}")
+                if simulation is not None:
+                    if not simulation['success']:
+                        raise ValueError(f"Bet simulation reverted: {simulation['revert_reason']}")
+                    expected_tokens = simulation['tokens_bought']
+                    logger.debug("Expected tokens to receive: %s", expected_tokens)
             
-            # Build the buy transaction
-            transaction = self.market_maker_contract.functions.buy(
-                outcome,           # outcomeIndex
-                amount_units,      # amount in USDC units
-                max_price_wei      # maxPrice in wei
-            ).build_transaction({
-                'from': self.wallet_manager.get_address(),
-                'gas': 500000,     # Estimated gas limit
-                'gasPrice': self.web3_client.get_gas_price(),
-                'nonce': self.w3.eth.get_transaction_count(self.wallet_manager.get_address())
-            })
+            # Sign from the pre-built buy template (fixed gas per market, local nonce)
+            with tracer.span('sign'):
+                signed_txn = templates.sign_bet(
+                    self.market_maker_contract.address,
+                    outcome,           # outcomeIndex
+                    amount_units,      # amount in USDC units
+                    max_price_wei      # maxPrice in wei
+                )
             
-            # Sign and send the transaction
-            signed_txn = self.wallet_manager.sign_transaction(transaction)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn['raw_transaction'])
+            # Send the transaction
+            try:
+                with tracer.span('send_raw_transaction'):
+                    tx_hash = self.w3.eth.send_raw_transaction(signed_txn['raw_transaction'])
+            except Exception:
+                templates.reset_nonce()
+                raise
             tx_hash_hex = tx_hash.hex()
+            inclusion.sent(tx_hash_hex, 'bet')
             
-            logger.info(f"Bet placed successfully: {tx_hash_hex}")
+            logger.info("Bet placed successfully: %s", tx_hash_hex, extra={
+                'tx_hash': tx_hash_hex, 'market_id': market_id, 'amount_usdc': amount_usdc, 'account': account_index
+            })
             
             return {
                 'status': 'success',
@@ -269,7 +381,9 @@ class PolymarketClient:
                 'outcome': outcome,
                 'amount_usdc': amount_usdc,
                 'price': price,
+                'account_index': account_index,
                 'expected_tokens': expected_tokens / 1e18 if expected_tokens > 0 else 0,
+                'simulated': simulation is not None,
                 'message': 'Bet placed successfully'
             }
             
@@ -277,6 +391,135 @@ class PolymarketClient:
             logger.error(f"Failed to place bet: {e}")
             raise
     
+    def place_limit_orders(self, specs: List[Dict[str, Any]], order_type: str = 'GTC', account_index: int = 0) -> List[Dict[str, Any]]:
+        """Sign and submit CLOB limit orders ({token_id, side, price, size}) in batches"""
+        try:
+            logger.info("Placing %d CLOB orders (account %s)", len(specs), account_index)
+            return self.clob.place_orders(specs, order_type, account_index)
+        except Exception as e:
+            logger.error(f"Failed to place CLOB orders: {e}")
+            raise
+    
+    def cancel_orders(self, order_ids: Optional[List[str]] = None, account_index: int = 0) -> Dict[str, Any]:
+        """Cancel CLOB orders in bulk (all open orders of the account when no ids are given)"""
+        try:
+            if order_ids is None:
+                return self.clob.cancel_all(account_index)
+            return self.clob.cancel_orders(order_ids, account_index)
+        except Exception as e:
+            logger.error(f"Failed to cancel CLOB orders: {e}")
+            raise
+    
+    def replace_orders(self, order_ids: List[str], specs: List[Dict[str, Any]], order_type: str = 'GTC', account_index: int = 0) -> Dict[str, Any]:
+        """Cancel CLOB orders and submit replacements"""
+        try:
+            return self.clob.replace_orders(order_ids, specs, order_type, account_index)
+        except Exception as e:
+            logger.error(f"Failed to replace CLOB orders: {e}")
+            raise
+    
+    def get_open_orders(self, token_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Locally tracked open CLOB orders"""
+        return self.clob.get_open_orders(token_id)
+    
+    def calc_buy_amount(self, outcome: int, amount_units: int) -> int:
+        """Outcome tokens the market maker would return for amount_units of USDC"""
+        if not self.market_maker_contract:
+            default_market_maker = "0x89Cb14B8E8cF0d5C3e7E6B9B0c0c0c0c0c0c0c0c"
+            self.set_market_maker_contract(default_market_maker)
+        return self.market_maker_contract.functions.calcBuyAmount(outcome, amount_units).call()
+    
+    def simulate_bet(self, market_id: str, outcome: int, amount_usdc: float, price: float, account_index: int = 0) -> Dict[str, Any]:
+        """Simulate a bet with eth_call state overrides without signing it"""
+        try:
+            if not self.market_maker_contract:
+                default_market_maker = "0x89Cb14B8E8cF0d5C3e7E6B9B0c0c0c0c0c0c0c0c"
+                self.set_market_maker_contract(default_market_maker)
+            
+            simulation = self.simulator.simulate_bet(
+                self.wallet_manager.get_address(account_index),
+                self.market_maker_contract.address,
+                outcome,
+                int(amount_usdc * 1e6),
+                int(price * 1e18),
+                self.pending_approval(self.CONDITIONAL_TOKENS_CONTRACT, account_index)
+            )
+            return dict(simulation, market_id=market_id, outcome=outcome, amount_usdc=amount_usdc, price=price,
+                        expected_tokens=simulation['tokens_bought'] / 1e18)
+            
+        except Exception as e:
+            logger.error(f"Failed to simulate bet: {e}")
+            raise
+    
+    def get_position_balances(self, owners: List[str], token_ids: List[str], block_identifier='latest') -> List[int]:
+        """Outcome-token balances for (owner, token) pairs in one balanceOfBatch call"""
+        try:
+            return self.conditional_tokens_contract.functions.balanceOfBatch(
+                [to_address(owner) for owner in owners],
+                [int(token_id) for token_id in token_ids]
+            ).call(block_identifier=block_identifier)
+        except Exception as e:
+            logger.error(f"Failed to get position balances: {e}")
+            raise
+    
+    def get_payouts(self, condition_id: str, outcome_count: int = 2) -> Optional[List[float]]:
+        """Payout per outcome token of a resolved condition (None while unresolved)"""
+        try:
+            condition = bytes.fromhex(condition_id[2:] if condition_id.startswith('0x') else condition_id)
+            functions = self.conditional_tokens_contract.functions
+            denominator = functions.payoutDenominator(condition).call()
+            if not denominator:
+                return None
+            return [functions.payoutNumerators(condition, index).call() / denominator for index in range(outcome_count)]
+        except Exception as e:
+            logger.error(f"Failed to get payouts for {condition_id}: {e}")
+            raise
+    
+    def redeem_positions(self, condition_id: str, index_sets: List[int], account_index: int = 0) -> Dict[str, Any]:
+        """Redeem resolved outcome tokens of a condition for USDC"""
+        try:
+            templates = self.account_templates[account_index]
+            signed_txn = templates.sign_redeem(self.CONDITIONAL_TOKENS_CONTRACT, self.COLLATERAL_TOKEN_CONTRACT, condition_id, index_sets)
+            try:
+                tx_hash = self.w3.eth.send_raw_transaction(signed_txn['raw_transaction'])
+            except Exception:
+                templates.reset_nonce()
+                raise
+            
+            tx_hash_hex = tx_hash.hex()
+            inclusion.sent(tx_hash_hex, 'redeem')
+            logger.info(f"Redeem transaction for {condition_id} (account {account_index}): {tx_hash_hex}")
+            return {
+                'tx_hash': tx_hash_hex,
+                'nonce': signed_txn['nonce'],
+                'gas_price': signed_txn['gas_price']
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to redeem positions: {e}")
+            raise
+    
+    def transfer_usdc(self, to_address: str, amount: int, account_index: int = 0) -> str:
+        """Transfer USDC from one of our accounts (used to rebalance the account pool)"""
+        try:
+            logger.info(f"Transferring {amount / 1e6} USDC from account {account_index} to {to_address}")
+            
+            templates = self.account_templates[account_index]
+            signed_txn = templates.sign_transfer(self.USDC_CONTRACT, to_address, amount)
+            try:
+                tx_hash = self.w3.eth.send_raw_transaction(signed_txn['raw_transaction'])
+            except Exception:
+                templates.reset_nonce()
+                raise
+            
+            tx_hash_hex = tx_hash.hex()
+            logger.info(f"USDC transfer transaction: {tx_hash_hex}")
+            return tx_hash_hex
+            
+        except Exception as e:
+            logger.error(f"Failed to transfer USDC: {e}")
+            raise
+    
     def get_market_info(self, market_id: str, market_maker_address: str = None) -> Dict[str, Any]:
         """Get information about a specific market"""
         try:
@@ -310,21 +553,3 @@ class PolymarketClient:
         except Exception as e:
             logger.error(f"Failed to get market info: {e}")
             raise
-    
-    def check_position(self, market_id: str, outcome: int) -> Dict[str, Any]:
-        """Check current position in a market"""
-        try:
-            # TODO: Implement position checking
-            # This would query the conditional tokens contract for
-            # the user's current position in the specific outcome
-            
-            return {
-                'market_id': market_id,
-                'outcome': outcome,
-                'position': 0,
-                'message': 'Position checking not yet implemented'
-            }
-            
-        except Exception as e:
-            logger.error(f"Failed to check position: {e}")
-            raise
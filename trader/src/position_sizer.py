@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Position Sizer - Slippage-aware sizing of copy trades
+Samples the market maker's calcBuyAmount curve to measure how far an order
+would move the price, shrinks orders to a maximum price impact and splits
+what remains into tranches. Depth samples are cached per market, outcome and
+block, so repeated sizing within a block costs no extra RPC calls.
+"""
+
+import os
+import math
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+USDC_UNITS = 1_000_000
+
+
+class DepthSnapshot:
+    """calcBuyAmount samples (USDC units -> outcome tokens) for one outcome at one block"""
+
+    def __init__(self, block_number: int):
+        self.block_number = block_number
+        self.samples: Dict[int, int] = {}
+
+    def price(self, amount_units: int) -> float:
+        """Average price paid per token (in curve units) for an order of amount_units"""
+        tokens = self.samples.get(amount_units)
+        return amount_units / tokens if tokens else math.inf
+
+    def impact(self, amount_units: int, reference_units: int) -> float:
+        """Average price of the order relative to the marginal (reference-size) price"""
+        reference_price = self.price(reference_units)
+        if not math.isfinite(reference_price):
+            return math.inf
+        return self.price(amount_units) / reference_price - 1
+
+
+class PositionSizer:
+    """Caps copy-trade sizes by price impact and splits them into tranches"""
+
+    def __init__(self, polymarket_client, block_provider: Callable[[], int]):
+        """Initialize sizer over the client's market maker; block_provider returns the current block"""
+        self.polymarket_client = polymarket_client
+        self.block_provider = block_provider
+
+        # Configuration
+        self.max_price_impact = float(os.environ.get('MAX_PRICE_IMPACT', '0.02'))
+        self.reference_units = int(float(os.environ.get('SIZER_REFERENCE_USDC', '1')) * USDC_UNITS)
+        self.tranche_max_usdc = float(os.environ.get('TRANCHE_MAX_USDC', '250'))
+        self.tranche_interval = float(os.environ.get('TRANCHE_INTERVAL_SECONDS', '2'))
+        self.min_order_usdc = 1.0
+        self.max_snapshots = 256
+
+        # Fractions of the requested size sampled on the curve
+        self.sample_fractions = (0.0625, 0.125, 0.25, 0.5, 1.0)
+
+        self._snapshots: "OrderedDict[Tuple[str, int, int], DepthSnapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.depth_calls = 0
+
+    def get_depth(self, outcome: int) -> DepthSnapshot:
+        """Depth snapshot of the current market maker for this block"""
+        block_number = self.block_provider()
+        contract = self.polymarket_client.market_maker_contract
+        key = (contract.address if contract else None, outcome, block_number)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is None:
+                snapshot = DepthSnapshot(block_number)
+                self._snapshots[key] = snapshot
+                while len(self._snapshots) > self.max_snapshots:
+                    self._snapshots.popitem(last=False)
+        return snapshot
+
+    def _sample(self, snapshot: DepthSnapshot, outcome: int, amounts: List[int]):
+        for amount_units in amounts:
+            if amount_units not in snapshot.samples:
+                snapshot.samples[amount_units] = self.polymarket_client.calc_buy_amount(outcome, amount_units)
+                self.depth_calls += 1
+
+    def split_tranches(self, amount_usdc: float) -> List[float]:
+        """Split an order into equal tranches of at most tranche_max_usdc"""
+        count = max(1, math.ceil(amount_usdc / self.tranche_max_usdc))
+        tranche = round(amount_usdc / count, 6)
+        return [tranche] * count
+
+    def max_amount(self, outcome: int, requested_usdc: float) -> Tuple[float, float, DepthSnapshot]:
+        """Largest size up to requested_usdc within the impact cap; returns (usdc, impact, snapshot)"""
+        requested_units = int(requested_usdc * USDC_UNITS)
+        snapshot = self.get_depth(outcome)
+        amounts = sorted({max(self.reference_units, int(requested_units * fraction)) for fraction in self.sample_fractions})
+        self._sample(snapshot, outcome, [self.reference_units] + amounts)
+
+        # Impact grows with size: walk the samples, interpolate inside the crossing interval
+        previous_units, previous_impact = self.reference_units, 0.0
+        for amount_units in amounts:
+            impact = snapshot.impact(amount_units, self.reference_units)
+            if impact > self.max_price_impact:
+                if amount_units == previous_units or impact <= previous_impact:
+                    return previous_units / USDC_UNITS, previous_impact, snapshot
+                fraction = (self.max_price_impact - previous_impact) / (impact - previous_impact)
+                capped_units = previous_units + fraction * (amount_units - previous_units)
+                return capped_units / USDC_UNITS, self.max_price_impact, snapshot
+            previous_units, previous_impact = amount_units, impact
+
+        return requested_units / USDC_UNITS, previous_impact, snapshot
+
+    def plan(self, outcome: int, requested_usdc: float) -> Dict[str, Any]:
+        """Size an order against current depth and split it into tranches"""
+        plan = {
+            'requested_usdc': requested_usdc,
+            'amount_usdc': requested_usdc,
+            'price_impact': None,
+            'depth_limited': False,
+            'depth_available': False,
+            'block_number': None,
+            'max_price_impact': self.max_price_impact
+        }
+        try:
+            amount_usdc, impact, snapshot = self.max_amount(outcome, requested_usdc)
+            plan.update({
+                'amount_usdc': round(amount_usdc, 6),
+                'price_impact': round(impact, 6),
+                'depth_limited': amount_usdc < requested_usdc,
+                'depth_available': True,
+                'block_number': snapshot.block_number
+            })
+            if plan['depth_limited']:
+                logger.info("Order capped by depth: %s -> %s USDC (%.1f%% max impact)", requested_usdc, plan['amount_usdc'], self.max_price_impact * 100)
+        except Exception as e:
+            logger.warning(f"Could not sample market depth, sizing without it: {e}")
+
+        plan['tranches'] = self.split_tranches(plan['amount_usdc']) if plan['amount_usdc'] >= self.min_order_usdc else []
+        return plan
+
+    def max_price(self, reference_price: float) -> float:
+        """Worst acceptable price for a copy of a trade filled at reference_price"""
+        return min(1.0, reference_price * (1 + self.max_price_impact))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Sizer configuration and depth sampling counters"""
+        return {
+            'max_price_impact': self.max_price_impact,
+            'tranche_max_usdc': self.tranche_max_usdc,
+            'depth_calls': self.depth_calls,
+            'cached_snapshots': len(self._snapshots)
+        }
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Position Tracker - Conditional-token holdings and PnL kept in memory
+Balances are seeded with one balanceOfBatch call for every (account, token)
+pair, then moved by the Conditional Tokens TransferSingle/TransferBatch logs
+that touch our accounts. Copy-trade fills register their cost and the whale
+they copied under the bet's tx hash, so incoming tokens pick up a cost basis
+and an attribution whichever of the two is seen first; realized and
+unrealized PnL are read without any RPC.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, defaultdict, deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+from eth_abi import decode
+from eth_utils import keccak
+from addresses import Address, to_address
+from metrics import inclusion
+
+logger = logging.getLogger(__name__)
+
+TRANSFER_SINGLE_TOPIC = keccak(text='TransferSingle(address,address,address,uint256,uint256)')
+TRANSFER_BATCH_TOPIC = keccak(text='TransferBatch(address,address,address,uint256[],uint256[])')
+
+# Outcome tokens share USDC's 6 decimals
+TOKEN_UNIT = 10 ** 6
+
+
+def _to_bytes(value) -> bytes:
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith('0x') else value)
+    return bytes(value)
+
+
+def _tx_key(tx_hash) -> str:
+    return _to_bytes(tx_hash).hex()
+
+
+@dataclass(slots=True)
+class Position:
+    """Holding of one outcome token by one of our accounts"""
+    account: Address
+    token_id: str
+    balance: int = 0  # Token units (6 decimals)
+    cost_usdc: float = 0.0  # Cost basis of the current balance
+    realized_pnl: float = 0.0
+    whale: Optional[str] = None  # Whale whose trade opened the position
+    last_price: Optional[float] = None  # Price of the latest fill
+
+    @property
+    def tokens(self) -> float:
+        return self.balance / TOKEN_UNIT
+
+    @property
+    def avg_price(self) -> Optional[float]:
+        return self.cost_usdc / self.tokens if self.balance else None
+
+
+class _PendingFill:
+    """USDC committed to a token that has not arrived yet"""
+
+    __slots__ = ('usdc', 'price', 'whale', 'partial')
+
+    def __init__(self, usdc: float, price: float, whale: Optional[str], partial: bool):
+        self.usdc = usdc
+        self.price = price
+        self.whale = whale
+        self.partial = partial  # CLOB orders can fill across several transfers
+
+
+class PositionTracker:
+    """Positions of our accounts in the Conditional Tokens contract"""
+
+    def __init__(self, polymarket_client, accounts: Iterable[str], mark_price: Optional[Callable[[str], Optional[float]]] = None):
+        """Initialize the tracker for a set of our account addresses"""
+        self.polymarket_client = polymarket_client
+        self.w3 = polymarket_client.w3
+        self.accounts = [to_address(account) for account in accounts]
+        self._account_raw = {account.raw: account for account in self.accounts}
+        self.mark_price = mark_price or (lambda token_id: None)
+
+        self.sync_interval = float(os.environ.get('POSITION_SYNC_SECONDS', '5'))
+        self.log_chunk_blocks = int(os.environ.get('POSITION_LOG_CHUNK_BLOCKS', '2000'))
+
+        self.positions: Dict[Tuple[Address, str], Position] = {}
+        self.by_whale: Dict[Optional[str], set] = defaultdict(set)
+        self.token_ids: set = set()
+        self._unseeded: set = set()
+        self.max_unmatched = int(os.environ.get('POSITION_MAX_UNMATCHED_FILLS', '10000'))
+
+        # Fills by bet tx hash, and transfers credited at the mark whose fill
+        # was not registered yet (bounded: reverted bets never transfer)
+        self._pending_tx: Dict[str, Tuple[Address, str, _PendingFill]] = OrderedDict()
+        self._unmatched: Dict[str, Tuple[Address, str, int, float]] = OrderedDict()
+        # CLOB fills, settled in operator transactions we do not know the hash of
+        self._pending: Dict[Tuple[Address, str], Deque[_PendingFill]] = defaultdict(deque)
+        self._exit_prices: Dict[Tuple[Address, str], float] = {}
+        self._lock = threading.RLock()
+
+        self.last_block: Optional[int] = None
+        self.logs_applied = 0
+        self.running = False
+
+    def _position(self, account: Address, token_id: str) -> Position:
+        key = (account, token_id)
+        position = self.positions.get(key)
+        if position is None:
+            position = self.positions[key] = Position(account, token_id)
+            self.by_whale[None].add(key)
+            self.token_ids.add(token_id)
+        return position
+
+    def _attribute(self, position: Position, whale: Optional[str]):
+        if whale and position.whale is None:
+            key = (position.account, position.token_id)
+            self.by_whale[None].discard(key)
+            self.by_whale[whale].add(key)
+            position.whale = whale
+
+    def _mark(self, position: Position) -> Optional[float]:
+        price = self.mark_price(position.token_id)
+        return price if price is not None else position.last_price
+
+    def track(self, token_ids: Iterable[str]):
+        """Follow more tokens; their balances are seeded on the next sync"""
+        with self._lock:
+            new_ids = {token_id for token_id in token_ids if token_id} - self.token_ids
+            self.token_ids.update(new_ids)
+            self._unseeded.update(new_ids)
+
+    def seed(self, token_ids: Optional[Iterable[str]] = None, block_number: Optional[int] = None):
+        """Load balances for every (account, token) pair with one balanceOfBatch call
+
+        Seeds the given tokens, or every tracked token when none are given.
+        """
+        if token_ids is not None:
+            token_ids = list(token_ids)
+            self.track(token_ids)
+        if block_number is None:
+            block_number = self.w3.eth.block_number
+        with self._lock:
+            tokens = sorted(token_ids if token_ids is not None else self.token_ids)
+            self._unseeded.difference_update(tokens)
+        if tokens:
+            owners = [account for account in self.accounts for _ in tokens]
+            ids = tokens * len(self.accounts)
+            balances = self.polymarket_client.get_position_balances(owners, ids, block_number)
+            with self._lock:
+                for owner, token_id, balance in zip(owners, ids, balances):
+                    if not balance and (owner, token_id) not in self.positions:
+                        continue
+                    position = self._position(owner, token_id)
+                    if position.balance != balance:
+                        # Holdings from before tracking are valued at the mark
+                        mark = self._mark(position)
+                        position.cost_usdc = balance / TOKEN_UNIT * mark if mark is not None else 0.0
+                        position.balance = balance
+        if self.last_block is None or block_number > self.last_block:
+            self.last_block = block_number
+        logger.info(f"Seeded {len(tokens)} tokens x {len(self.accounts)} accounts at block {block_number}")
+
+    def expect_fill(self, account: str, token_id: str, amount_usdc: float, price: float, whale: Optional[str] = None,
+                    partial: bool = False, tx_hash=None):
+        """Register the cost of a bet whose tokens arrive by transfer
+
+        With tx_hash the cost goes to that transaction's transfer, even one
+        already applied at the mark; without it (CLOB orders) it is queued for
+        the next transfers of the token to the account.
+        """
+        if not token_id or amount_usdc <= 0:
+            return
+        account = to_address(account)
+        fill = _PendingFill(amount_usdc, price, whale, partial)
+        with self._lock:
+            position = self._position(account, token_id)
+            self._attribute(position, whale)
+            if tx_hash is None:
+                self._pending[(account, token_id)].append(fill)
+                return
+            key = _tx_key(tx_hash)
+            credited = self._unmatched.pop(key, None)
+            if credited is not None and credited[:2] == (account, token_id):
+                # The transfer was applied first: swap its mark value for the cost
+                _, _, amount, mark_cost = credited
+                position.cost_usdc += amount_usdc - mark_cost
+                position.last_price = amount_usdc / (amount / TOKEN_UNIT) if amount else price
+                return
+            if len(self._pending_tx) >= self.max_unmatched:
+                self._pending_tx.popitem(last=False)
+            self._pending_tx[key] = (account, token_id, fill)
+
+    def expect_exit(self, account: str, token_id: str, price: float):
+        """Price the next outgoing transfers of a token (sale price or redemption payout)"""
+        with self._lock:
+            self._exit_prices[(to_address(account), token_id)] = price
+
+    def _credit(self, account: Address, token_id: str, amount: int, tx_hash=None):
+        """Add tokens at the cost of their transaction's fill, the oldest CLOB fill, or the mark"""
+        position = self._position(account, token_id)
+        tokens = amount / TOKEN_UNIT
+        key = _tx_key(tx_hash) if tx_hash is not None else None
+        registered = self._pending_tx.get(key) if key else None
+        pending = self._pending.get((account, token_id))
+        if registered is not None and registered[:2] == (account, token_id):
+            del self._pending_tx[key]
+            fill = registered[2]
+            cost = fill.usdc
+            self._attribute(position, fill.whale)
+            position.last_price = cost / tokens if tokens else fill.price
+        elif pending:
+            fill = pending[0]
+            if fill.partial:
+                cost = min(fill.usdc, tokens * fill.price)
+                fill.usdc -= cost
+                if fill.usdc <= 1e-9:
+                    pending.popleft()
+            else:
+                cost = fill.usdc
+                pending.popleft()
+            self._attribute(position, fill.whale)
+            position.last_price = cost / tokens if tokens else fill.price
+        else:
+            mark = self._mark(position)
+            cost = tokens * mark if mark is not None else 0.0
+            if key:
+                if len(self._unmatched) >= self.max_unmatched:
+                    self._unmatched.popitem(last=False)
+                self._unmatched[key] = (account, token_id, amount, cost)
+        position.balance += amount
+        position.cost_usdc += cost
+
+    def _debit(self, account: Address, token_id: str, amount: int, realize: bool = True) -> float:
+        """Remove tokens at their share of the cost basis; returns that cost"""
+        position = self._position(account, token_id)
+        amount = min(amount, position.balance)
+        if not amount:
+            return 0.0
+        tokens = amount / TOKEN_UNIT
+        cost = position.cost_usdc * amount / position.balance
+        if realize:
+            price = self._exit_prices.get((account, token_id))
+            if price is None:
+                price = self._mark(position)
+            proceeds = tokens * price if price is not None else cost
+            position.realized_pnl += proceeds - cost
+        position.cost_usdc -= cost
+        position.balance -= amount
+        if not position.balance:
+            self._exit_prices.pop((account, token_id), None)
+        return cost
+
+    def _move(self, sender: Address, receiver: Address, token_id: str, amount: int):
+        """Transfer between two of our accounts: cost basis and attribution move along"""
+        source = self._position(sender, token_id)
+        amount = min(amount, source.balance)
+        cost = self._debit(sender, token_id, amount, realize=False)
+        target = self._position(receiver, token_id)
+        self._attribute(target, source.whale)
+        target.last_price = target.last_price or source.last_price
+        target.balance += amount
+        target.cost_usdc += cost
+
+    def apply_log(self, log: Dict[str, Any]) -> int:
+        """Apply one TransferSingle/TransferBatch log; returns the transfers that touched our accounts"""
+        topics = [_to_bytes(topic) for topic in log.get('topics') or ()]
+        if len(topics) < 4:
+            return 0
+        if topics[0] == TRANSFER_SINGLE_TOPIC:
+            token_ids, values = decode(['uint256', 'uint256'], _to_bytes(log['data']))
+            token_ids, values = [token_ids], [values]
+        elif topics[0] == TRANSFER_BATCH_TOPIC:
+            token_ids, values = decode(['uint256[]', 'uint256[]'], _to_bytes(log['data']))
+        else:
+            return 0
+
+        sender = self._account_raw.get(topics[2][12:])
+        receiver = self._account_raw.get(topics[3][12:])
+        if sender is None and receiver is None:
+            return 0
+        if 'transactionHash' in log:
+            inclusion.included(log['transactionHash'])
+
+        applied = 0
+        with self._lock:
+            for token_id, value in zip(token_ids, values):
+                token_id = str(token_id)
+                if sender is not None and receiver is not None:
+                    self._move(sender, receiver, token_id, value)
+                elif sender is not None:
+                    self._debit(sender, token_id, value)
+                else:
+                    self._credit(receiver, token_id, value, log.get('transactionHash'))
+                applied += 1
+            self.logs_applied += 1
+        return applied
+
+    def sync(self) -> int:
+        """Apply transfer logs up to the latest block, then seed newly tracked tokens"""
+        latest = self.w3.eth.block_number
+        if self.last_block is None:
+            self.seed(block_number=latest)
+            return 0
+
+        padded = [b'\x00' * 12 + account.raw for account in self.accounts]
+        topic0 = [TRANSFER_SINGLE_TOPIC, TRANSFER_BATCH_TOPIC]
+        applied = 0
+        while self.last_block < latest:
+            from_block = self.last_block + 1
+            to_block = min(latest, self.last_block + self.log_chunk_blocks)
+            logs = []
+            for topics in ([topic0, None, padded], [topic0, None, None, padded]):
+                logs.extend(self.w3.eth.get_logs({
+                    'address': self.polymarket_client.CONDITIONAL_TOKENS_CONTRACT,
+                    'fromBlock': from_block,
+                    'toBlock': to_block,
+                    'topics': topics
+                }))
+            # Transfers between two of our accounts match both filters
+            unique = {(_to_bytes(log['transactionHash']), log['logIndex']): log for log in logs}
+            for key in sorted(unique, key=lambda k: (unique[k]['blockNumber'], k[1])):
+                applied += self.apply_log(unique[key])
+            self.last_block = to_block
+
+        # Balances read at the block the logs reached, so nothing is counted twice
+        if self._unseeded:
+            self.seed(list(self._unseeded), latest)
+        return applied
+
+    async def run(self):
+        """Follow transfer logs until stopped"""
+        self.running = True
+        while self.running:
+            started = time.monotonic()
+            try:
+                await asyncio.to_thread(self.sync)
+            except Exception as e:
+                logger.warning(f"Position sync failed: {e}")
+            await asyncio.sleep(max(0, self.sync_interval - (time.monotonic() - started)))
+
+    def stop(self):
+        """Stop following transfer logs"""
+        self.running = False
+
+    def _describe(self, position: Position) -> Dict[str, Any]:
+        mark = self._mark(position)
+        value = position.tokens * mark if mark is not None else None
+        return {
+            'account': position.account,
+            'token_id': position.token_id,
+            'tokens': position.tokens,
+            'avg_price': position.avg_price,
+            'cost_usdc': round(position.cost_usdc, 6),
+            'mark_price': mark,
+            'value_usdc': round(value, 6) if value is not None else None,
+            'unrealized_pnl': round(value - position.cost_usdc, 6) if value is not None else None,
+            'realized_pnl': round(position.realized_pnl, 6),
+            'whale': position.whale
+        }
+
+    def get_position(self, account: str, token_id: str) -> Optional[Dict[str, Any]]:
+        """One position, from memory"""
+        position = self.positions.get((to_address(account), token_id))
+        return self._describe(position) if position else None
+
+    def get_positions(self, whale: Optional[str] = None, include_closed: bool = False) -> List[Dict[str, Any]]:
+        """All positions (optionally only those copied from one whale)"""
+        with self._lock:
+            keys = self.by_whale.get(whale, ()) if whale else self.positions.keys()
+            positions = [self.positions[key] for key in keys]
+        return [self._describe(p) for p in positions if include_closed or p.balance]
+
+    def get_pnl(self) -> Dict[str, Any]:
+        """Realized and unrealized PnL, in total and per whale"""
+        by_whale = {}
+        total = {'cost_usdc': 0.0, 'value_usdc': 0.0, 'realized_pnl': 0.0, 'unrealized_pnl': 0.0, 'positions': 0}
+        with self._lock:
+            groups = [(whale, [self.positions[key] for key in keys]) for whale, keys in self.by_whale.items() if keys]
+        for whale, positions in groups:
+            row = dict.fromkeys(total, 0)
+            for position in positions:
+                mark = self._mark(position)
+                value = position.tokens * mark if mark is not None else position.cost_usdc
+                row['cost_usdc'] += position.cost_usdc
+                row['value_usdc'] += value
+                row['realized_pnl'] += position.realized_pnl
+                row['unrealized_pnl'] += value - position.cost_usdc
+                row['positions'] += 1 if position.balance else 0
+            for field in total:
+                total[field] += row[field]
+            by_whale[whale or 'unattributed'] = {field: round(value, 6) for field, value in row.items()}
+        return {
+            'total': {field: round(value, 6) for field, value in total.items()},
+            'by_whale': by_whale,
+            'last_block': self.last_block
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Tracker counters"""
+        return {
+            'positions': len(self.positions),
+            'tokens': len(self.token_ids),
+            'pending_fills': len(self._pending_tx) + sum(len(queue) for queue in self._pending.values()),
+            'unmatched_transfers': len(self._unmatched),
+            'logs_applied': self.logs_applied,
+            'last_block': self.last_block
+        }
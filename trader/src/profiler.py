@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Profiler - In-process sampling profiler and allocation diffs
+For when py-spy cannot be attached (inside the TEE). A sampler thread
+reads the stack of every other thread (event loop, account lanes, RPC and
+API pools) at a fixed interval for a bounded number of seconds and folds
+them into collapsed stacks or a speedscope document. The memory mode takes
+two tracemalloc snapshots some seconds apart and reports what grew.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+MAX_SECONDS = float(os.environ.get('PROFILER_MAX_SECONDS', '60'))
+
+# One profile or memory diff at a time per process
+_busy = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """A profile is already running"""
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Dict[str, Any]:
+    """Sample every thread's stack; returns {stack tuple: count} per thread name"""
+    seconds = min(max(seconds, 0.1), MAX_SECONDS)
+    interval = max(interval, 0.001)
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running")
+
+    try:
+        own = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        while time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                stacks[(names.get(ident, str(ident)),) + tuple(stack)] += 1
+            samples += 1
+            time.sleep(interval)
+
+        return {
+            'stacks': stacks,
+            'samples': samples,
+            'interval': interval,
+            'duration': time.perf_counter() - started
+        }
+    finally:
+        _busy.release()
+
+
+def to_collapsed(profile: Dict[str, Any]) -> str:
+    """Brendan Gregg's folded format: 'thread;outer;...;inner count' per line"""
+    lines = [';'.join(stack) + f" {count}" for stack, count in profile['stacks'].most_common()]
+    return '\n'.join(lines) + '\n'
+
+
+def to_speedscope(profile: Dict[str, Any], name: str = 'trader') -> Dict[str, Any]:
+    """speedscope file format: one sampled profile per thread"""
+    frames: List[Dict[str, Any]] = []
+    frame_index: Dict[str, int] = {}
+    by_thread: Dict[str, List] = {}
+
+    for stack, count in profile['stacks'].items():
+        thread, calls = stack[0], stack[1:]
+        indexes = []
+        for label in calls:
+            if label not in frame_index:
+                frame_index[label] = len(frames)
+                function, _, location = label.partition(' (')
+                file, _, line = location.rstrip(')').rpartition(':')
+                frames.append({'name': function, 'file': file, 'line': int(line) if line.isdigit() else None})
+            indexes.append(frame_index[label])
+        by_thread.setdefault(thread, []).append((indexes, count))
+
+    interval_ms = profile['interval'] * 1000
+    profiles = []
+    for thread, entries in sorted(by_thread.items()):
+        total = sum(count for _, count in entries)
+        profiles.append({
+            'type': 'sampled',
+            'name': thread,
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': total * interval_ms,
+            'samples': [indexes for indexes, _ in entries],
+            'weights': [count * interval_ms for _, count in entries]
+        })
+
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'trader.profiler',
+        'activeProfileIndex': 0,
+        'shared': {'frames': frames},
+        'profiles': profiles
+    }
+
+
+def memory_diff(seconds: float, top: int = 25, frames: int = 1) -> Dict[str, Any]:
+    """Allocation growth between two tracemalloc snapshots taken seconds apart"""
+    seconds = min(max(seconds, 0.1), MAX_SECONDS)
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running")
+
+    started_tracing = not tracemalloc.is_tracing()
+    try:
+        if started_tracing:
+            tracemalloc.start(frames)
+        before = tracemalloc.take_snapshot()
+        time.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+
+        key = 'traceback' if frames > 1 else 'lineno'
+        stats = after.compare_to(before, key)
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            'seconds': seconds,
+            'traced_bytes': current,
+            'peak_bytes': peak,
+            'growth': [
+                {
+                    'location': [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                    'size_diff_bytes': stat.size_diff,
+                    'size_bytes': stat.size,
+                    'count_diff': stat.count_diff,
+                    'count': stat.count
+                }
+                for stat in stats[:top]
+            ],
+            # Allocations made before tracing started are invisible to the diff
+            'tracing_started_for_diff': started_tracing
+        }
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        _busy.release()
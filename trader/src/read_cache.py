@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Read Cache - Short-TTL, single-flight cache for polled read endpoints
+Concurrent identical requests share one upstream fetch, the rendered body
+is reused for READ_CACHE_TTL_SECONDS, and every body carries an ETag so
+pollers with If-None-Match get 304s. Works from threads (Flask) and from an
+event loop (the aiohttp server).
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches the ETag"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class CachedBody:
+    """Rendered response body of a read endpoint"""
+
+    __slots__ = ('body', 'status', 'etag', 'expires')
+
+    def __init__(self, body: bytes, status: int, ttl: float):
+        self.body = body
+        self.status = status
+        self.etag = etag_for(body)
+        # Errors are shared with requests already waiting, never reused after
+        self.expires = time.monotonic() + (ttl if 200 <= status < 300 else 0)
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.expires
+
+
+class ReadCache:
+    """Per-key cache of rendered bodies with request coalescing"""
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 1024):
+        """Initialize the cache"""
+        self.ttl = float(os.environ.get('READ_CACHE_TTL_SECONDS', '2')) if ttl is None else ttl
+        self.max_entries = max_entries
+        self.entries: Dict[str, CachedBody] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self._inflight_async: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.not_modified = 0
+
+    def _store(self, key: str, entry: CachedBody):
+        if len(self.entries) >= self.max_entries:
+            self.entries = {k: v for k, v in self.entries.items() if v.is_fresh()}
+        self.entries[key] = entry
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Tuple[bytes, int]]) -> CachedBody:
+        """Cached body for key, or run fetch once for every concurrent caller"""
+        while True:
+            with self._lock:
+                entry = self.entries.get(key)
+                if entry is not None and entry.is_fresh():
+                    self.hits += 1
+                    return entry
+                event = self._inflight.get(key)
+                if event is None:
+                    event = self._inflight[key] = threading.Event()
+                    self.misses += 1
+                    leader = True
+                else:
+                    self.coalesced += 1
+                    leader = False
+
+            if not leader:
+                event.wait()
+                with self._lock:
+                    entry = self.entries.get(key)
+                if entry is not None:
+                    return entry
+                continue  # Leader failed without a body; try again
+
+            try:
+                body, status = fetch()
+                entry = CachedBody(body, status, self.ttl)
+                with self._lock:
+                    self._store(key, entry)
+                return entry
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                event.set()
+
+    async def get_or_fetch_async(self, key: str, fetch: Callable[[], Awaitable[Tuple[bytes, int]]]) -> CachedBody:
+        """Event-loop version of get_or_fetch"""
+        entry = self.entries.get(key)
+        if entry is not None and entry.is_fresh():
+            self.hits += 1
+            return entry
+
+        future = self._inflight_async.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        future = self._inflight_async[key] = asyncio.get_running_loop().create_future()
+        try:
+            body, status = await fetch()
+            entry = CachedBody(body, status, self.ttl)
+            with self._lock:
+                self._store(key, entry)
+            future.set_result(entry)
+            return entry
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            self._inflight_async.pop(key, None)
+
+    def record_not_modified(self):
+        self.not_modified += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache counters"""
+        return {
+            'ttl_seconds': self.ttl,
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'not_modified': self.not_modified
+        }
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Redemption Scheduler - Redeems winning positions of resolved markets
+Watches ConditionResolution logs for the conditions we hold and redeems
+them in batches: one redeemPositions call per (account, condition) covers
+every outcome, and a batch is signed back-to-back on local nonces and sent
+only while gas is below a ceiling (or once the oldest payout has waited too
+long). Conditions cannot share a transaction: redeemPositions pays out to
+msg.sender, so a multicall contract would redeem its own (empty) positions
+rather than the account's. Checks are serialized, so the API route and the
+background loop never send the same redemption twice. Sent redemptions are checked for receipts on later cycles; only a
+successful one credits the freed USDC to the account scheduler's cached
+balances, which steer account assignment. Bet sizing reads the live USDC
+balance, so it sees the payout once the transaction is included.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from eth_abi import decode
+from eth_utils import keccak
+from web3.exceptions import TransactionNotFound
+
+logger = logging.getLogger(__name__)
+
+CONDITION_RESOLUTION_TOPIC = keccak(text='ConditionResolution(bytes32,address,bytes32,uint256,uint256[])')
+
+# Binary markets: index sets 0b01 and 0b10 redeem both outcomes in one call
+BINARY_INDEX_SETS = [1, 2]
+
+
+def _condition_key(condition_id: str) -> str:
+    condition_id = condition_id.lower()
+    return condition_id if condition_id.startswith('0x') else '0x' + condition_id
+
+
+class RedemptionScheduler:
+    """Batches redeemPositions calls for resolved conditions we hold"""
+
+    def __init__(self, polymarket_client, position_tracker, account_scheduler=None):
+        """Initialize the scheduler"""
+        self.polymarket_client = polymarket_client
+        self.position_tracker = position_tracker
+        self.account_scheduler = account_scheduler
+        self.w3 = polymarket_client.w3
+        self.account_indexes = {address: index for index, address in enumerate(position_tracker.accounts)}
+
+        # Configuration
+        self.check_interval = float(os.environ.get('REDEEM_CHECK_SECONDS', '60'))
+        self.max_gas_price = int(float(os.environ.get('REDEEM_MAX_GAS_GWEI', '150')) * 1e9)
+        self.max_delay = float(os.environ.get('REDEEM_MAX_DELAY_SECONDS', '3600'))
+        self.retry_after = float(os.environ.get('REDEEM_RETRY_SECONDS', '600'))
+
+        self.markets: Dict[str, Tuple[str, int]] = {}  # token_id -> (condition_id, outcome_index)
+        self.payouts: Dict[str, List[float]] = {}  # condition_id -> payout per outcome token
+        self.resolved_at: Dict[str, float] = {}
+        self.submitted: Dict[Tuple[Any, str], float] = {}  # (account, condition_id) -> monotonic time
+        self.inflight: Dict[str, Dict[str, Any]] = {}  # tx_hash -> sent redemption awaiting its receipt
+        self._checked: set = set()  # Conditions whose payouts were read once from the contract
+        self.last_block: Optional[int] = None
+        self._lock = threading.Lock()  # One check (and batch) at a time
+
+        self.redemptions = 0
+        self.batches = 0
+        self.deferred_for_gas = 0
+        self.reverted = 0
+        self.dropped = 0
+        self.freed_usdc = 0.0
+        self.running = False
+
+    def register_market(self, token_id: str, condition_id: str, outcome_index: int):
+        """Remember which condition and outcome a token belongs to"""
+        if token_id and condition_id and token_id not in self.markets:
+            self.markets[token_id] = (_condition_key(condition_id), int(outcome_index))
+
+    def held_conditions(self) -> Dict[str, Dict[Any, List[Tuple[str, int, int]]]]:
+        """condition_id -> account -> [(token_id, outcome_index, balance)] for tokens we hold"""
+        held = defaultdict(lambda: defaultdict(list))
+        for (account, token_id), position in list(self.position_tracker.positions.items()):
+            market = self.markets.get(token_id)
+            if market and position.balance:
+                held[market[0]][account].append((token_id, market[1], position.balance))
+        return held
+
+    def _mark_resolved(self, condition_id: str, payouts: List[float]):
+        if condition_id not in self.payouts:
+            self.payouts[condition_id] = payouts
+            self.resolved_at[condition_id] = time.monotonic()
+            logger.info(f"Condition {condition_id} resolved with payouts {payouts}")
+
+    def check_resolutions(self, held: Dict[str, Any]) -> int:
+        """Pick up resolutions of held conditions; returns how many were new"""
+        before = len(self.payouts)
+        pending = [condition_id for condition_id in held if condition_id not in self.payouts]
+
+        # Conditions seen for the first time may have resolved before we watched
+        for condition_id in pending:
+            if condition_id not in self._checked:
+                self._checked.add(condition_id)
+                payouts = self.polymarket_client.get_payouts(condition_id)
+                if payouts:
+                    self._mark_resolved(condition_id, payouts)
+
+        latest = self.w3.eth.block_number
+        pending = [condition_id for condition_id in pending if condition_id not in self.payouts]
+        if pending and self.last_block is not None and latest > self.last_block:
+            logs = self.w3.eth.get_logs({
+                'address': self.polymarket_client.CONDITIONAL_TOKENS_CONTRACT,
+                'fromBlock': self.last_block + 1,
+                'toBlock': latest,
+                'topics': [CONDITION_RESOLUTION_TOPIC, [bytes.fromhex(c[2:]) for c in pending]]
+            })
+            for log in logs:
+                topic = log['topics'][1]
+                condition_id = '0x' + (bytes(topic).hex() if not isinstance(topic, str) else topic[2:].lower())
+                data = log['data']
+                _, numerators = decode(['uint256', 'uint256[]'], bytes.fromhex(data[2:]) if isinstance(data, str) else bytes(data))
+                total = sum(numerators)
+                if total:
+                    self._mark_resolved(condition_id, [numerator / total for numerator in numerators])
+        self.last_block = latest
+        return len(self.payouts) - before
+
+    def plan(self, held: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Redemptions ready to send: one per (account, resolved condition)"""
+        held = self.held_conditions() if held is None else held
+        now = time.monotonic()
+        items = []
+        for condition_id, accounts in held.items():
+            payouts = self.payouts.get(condition_id)
+            if payouts is None:
+                continue
+            for account, tokens in accounts.items():
+                sent_at = self.submitted.get((account, condition_id))
+                if sent_at is not None and now - sent_at < self.retry_after:
+                    continue
+                payout_usdc = sum(balance / 1e6 * payouts[outcome] for _, outcome, balance in tokens if outcome < len(payouts))
+                items.append({
+                    'account': account,
+                    'account_index': self.account_indexes[account],
+                    'condition_id': condition_id,
+                    'tokens': [{'token_id': token_id, 'outcome': outcome, 'balance': balance} for token_id, outcome, balance in tokens],
+                    'payout_usdc': round(payout_usdc, 6),
+                    'waiting_seconds': round(now - self.resolved_at[condition_id], 1)
+                })
+        return items
+
+    def check_receipts(self) -> float:
+        """Settle sent redemptions that have a receipt; returns the USDC freed by them"""
+        freed = 0.0
+        now = time.monotonic()
+        for tx_hash, item in list(self.inflight.items()):
+            try:
+                receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                receipt = None
+            except Exception as e:
+                logger.warning(f"Receipt check for redemption {tx_hash} failed: {e}")
+                continue
+
+            if receipt is None:
+                # Never mined: plan() sends it again once retry_after has passed
+                if now - item['sent_at'] >= self.retry_after:
+                    self.inflight.pop(tx_hash)
+                    self.dropped += 1
+                    logger.warning(f"Redemption {tx_hash} of {item['condition_id']} was dropped")
+                    self.polymarket_client.account_templates[item['account_index']].reconcile_nonce(force=True)
+                continue
+
+            self.inflight.pop(tx_hash)
+            if receipt['status'] != 1:
+                self.reverted += 1
+                logger.error(f"Redemption {tx_hash} of {item['condition_id']} on account {item['account_index']} reverted")
+                continue
+            if self.account_scheduler:
+                self.account_scheduler.record_credit(item['account_index'], int(item['payout_usdc'] * 1e6))
+            self.freed_usdc += item['payout_usdc']
+            self.redemptions += 1
+            freed += item['payout_usdc']
+        return freed
+
+    def run_once(self, force: bool = False) -> Dict[str, Any]:
+        """Settle sent redemptions, check resolutions and send a batch if gas allows"""
+        with self._lock:
+            return self._run_once(force)
+
+    def _run_once(self, force: bool) -> Dict[str, Any]:
+        self.check_receipts()
+        held = self.held_conditions()
+        self.check_resolutions(held)
+        items = self.plan(held)
+        if not items:
+            return {'status': 'idle', 'redemptions': []}
+
+        gas_price = self.polymarket_client.web3_client.get_gas_price()
+        oldest_wait = max(item['waiting_seconds'] for item in items)
+        if not force and gas_price > self.max_gas_price and oldest_wait < self.max_delay:
+            self.deferred_for_gas += 1
+            logger.info(f"Deferring {len(items)} redemptions: gas {gas_price / 1e9:.1f} gwei above ceiling")
+            return {'status': 'deferred', 'gas_price_gwei': gas_price / 1e9, 'redemptions': items}
+
+        # Sign and send the whole batch before waiting on any receipt
+        sent = []
+        for item in items:
+            try:
+                payouts = self.payouts[item['condition_id']]
+                for token in item['tokens']:
+                    self.position_tracker.expect_exit(item['account'], token['token_id'], payouts[token['outcome']])
+                result = self.polymarket_client.redeem_positions(item['condition_id'], BINARY_INDEX_SETS, item['account_index'])
+                sent_at = time.monotonic()
+                self.submitted[(item['account'], item['condition_id'])] = sent_at
+                self.inflight[result['tx_hash']] = dict(item, sent_at=sent_at)
+                sent.append(dict(item, tx_hash=result['tx_hash']))
+            except Exception as e:
+                logger.error(f"Redemption of {item['condition_id']} on account {item['account_index']} failed: {e}")
+        self.batches += 1
+
+        pending = sum(item['payout_usdc'] for item in sent)
+        logger.info(f"Sent {len(sent)}/{len(items)} redemptions for {pending:.2f} USDC")
+        return {
+            'status': 'success',
+            'gas_price_gwei': gas_price / 1e9,
+            'pending_usdc': round(pending, 6),
+            'redemptions': sent
+        }
+
+    async def run(self):
+        """Check and redeem periodically until stopped"""
+        self.running = True
+        while self.running:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                logger.warning(f"Redemption check failed: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    def stop(self):
+        """Stop the redemption loop"""
+        self.running = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Redemption counters"""
+        return {
+            'markets': len(self.markets),
+            'resolved_conditions': len(self.payouts),
+            'redemptions': self.redemptions,
+            'batches': self.batches,
+            'deferred_for_gas': self.deferred_for_gas,
+            'awaiting_receipt': len(self.inflight),
+            'reverted': self.reverted,
+            'dropped': self.dropped,
+            'freed_usdc': round(self.freed_usdc, 6),
+            'max_gas_price_gwei': self.max_gas_price / 1e9
+        }
@@ -5,11 +5,12 @@ Implements comprehensive risk management and trade validation
 """
 
 import os
+import time
 import logging
 from typing import Dict, Any, List, Set
 from datetime import datetime, timedelta
 from collections import defaultdict
-from eth_utils import to_checksum_address
+from addresses import Address, to_address as normalize_address
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,12 @@ class RiskManager:
         self.daily_trade_count = defaultdict(int)
         self.trade_history = []
         
+        # Rejections are published here when the trading engine attaches its bus
+        self.event_bus = None
+        
+        # Limit windows follow this clock; replays swap in a virtual one
+        self.clock = time.time
+        
         logger.info(f"Risk Manager initialized with limits:")
         logger.info(f"  Max trade amount: {self.max_trade_amount_eth} ETH")
         logger.info(f"  Max daily volume: {self.max_daily_volume_eth} ETH")
@@ -40,7 +47,7 @@ class RiskManager:
         logger.info(f"  Max daily trades: {self.max_daily_trades}")
         logger.info(f"  Allowed contracts: {len(self.allowed_contracts)}")
     
-    def _load_allowed_contracts(self) -> Set[str]:
+    def _load_allowed_contracts(self) -> Set[Address]:
         """Load list of allowed contract addresses"""
         # Default Polymarket contract addresses (these should be updated with actual addresses)
         default_contracts = {
@@ -58,14 +65,22 @@ class RiskManager:
             except Exception as e:
                 logger.warning(f"Failed to parse ALLOWED_CONTRACTS: {e}")
         
-        # Convert to checksum addresses
-        return {to_checksum_address(addr) for addr in default_contracts if addr}
+        # Convert to interned checksum addresses
+        allowed = set()
+        for addr in default_contracts:
+            if not addr:
+                continue
+            try:
+                allowed.add(normalize_address(addr))
+            except ValueError as e:
+                logger.warning(f"Ignoring invalid allowed contract {addr}: {e}")
+        return allowed
     
     def assess_trade(self, to_address: str, value_eth: float, data: str = '0x') -> Dict[str, Any]:
         """Assess risk for a trade"""
         try:
-            # Normalize address
-            to_address = to_checksum_address(to_address)
+            # Normalize address (interned, so repeat lookups skip the checksum)
+            to_address = normalize_address(to_address)
             value_eth = float(value_eth)
             
             # Initialize assessment result
@@ -82,32 +97,33 @@ class RiskManager:
                 assessment['approved'] = False
                 assessment['reason'] = f"Trade amount {value_eth} ETH exceeds limit {self.max_trade_amount_eth} ETH"
                 assessment['risk_score'] += 50
-                return assessment
+                return self._rejected(assessment, to_address, value_eth)
             
             # Check 2: Contract whitelist
             if to_address not in self.allowed_contracts:
                 assessment['approved'] = False
                 assessment['reason'] = f"Contract {to_address} not in allowed contracts list"
                 assessment['risk_score'] += 100
-                return assessment
+                return self._rejected(assessment, to_address, value_eth)
             
             # Check 3: Daily volume limit
-            today = datetime.utcnow().date()
+            now = datetime.utcfromtimestamp(self.clock())
+            today = now.date()
             current_daily_volume = self.daily_volume.get(today, 0)
             if current_daily_volume + value_eth > self.max_daily_volume_eth:
                 assessment['approved'] = False
                 assessment['reason'] = f"Daily volume would exceed limit: {current_daily_volume + value_eth} > {self.max_daily_volume_eth} ETH"
                 assessment['risk_score'] += 40
-                return assessment
+                return self._rejected(assessment, to_address, value_eth)
             
             # Check 4: Hourly trade count limit
-            current_hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+            current_hour = now.replace(minute=0, second=0, microsecond=0)
             current_hourly_trades = self.hourly_trade_count.get(current_hour, 0)
             if current_hourly_trades >= self.max_hourly_trades:
                 assessment['approved'] = False
                 assessment['reason'] = f"Hourly trade count limit reached: {current_hourly_trades} >= {self.max_hourly_trades}"
                 assessment['risk_score'] += 30
-                return assessment
+                return self._rejected(assessment, to_address, value_eth)
             
             # Check 5: Daily trade count limit
             current_daily_trades = self.daily_trade_count.get(today, 0)
@@ -115,7 +131,7 @@ class RiskManager:
                 assessment['approved'] = False
                 assessment['reason'] = f"Daily trade count limit reached: {current_daily_trades} >= {self.max_daily_trades}"
                 assessment['risk_score'] += 25
-                return assessment
+                return self._rejected(assessment, to_address, value_eth)
             
             # Check 6: Data validation (basic)
             if data and data != '0x' and len(data) > 10000:  # Arbitrary large data limit
@@ -127,7 +143,7 @@ class RiskManager:
                 assessment['approved'] = False
                 assessment['reason'] = "Trade amount must be positive"
                 assessment['risk_score'] += 100
-                return assessment
+                return self._rejected(assessment, to_address, value_eth)
             
             # Add warnings for high-value trades
             if value_eth > self.max_trade_amount_eth * 0.8:
@@ -143,26 +159,37 @@ class RiskManager:
                 assessment['warnings'].append("Approaching daily trade limit")
                 assessment['risk_score'] += 5
             
-            logger.info(f"Trade assessment completed: approved={assessment['approved']}, risk_score={assessment['risk_score']}")
+            logger.debug("Trade assessment completed: approved=%s, risk_score=%s", assessment['approved'], assessment['risk_score'])
             return assessment
             
         except Exception as e:
             logger.error(f"Error in trade assessment: {e}")
-            return {
+            return self._rejected({
                 'approved': False,
                 'reason': f"Assessment error: {str(e)}",
                 'risk_score': 100,
                 'warnings': [],
                 'timestamp': datetime.utcnow().isoformat()
-            }
+            }, to_address, value_eth)
+    
+    def _rejected(self, assessment: Dict[str, Any], to_address: str, value_eth: float) -> Dict[str, Any]:
+        """Publish a rejected assessment to the event bus and return it"""
+        if self.event_bus:
+            self.event_bus.publish('risk_rejected', {
+                'to_address': str(to_address),
+                'value_eth': value_eth,
+                'reason': assessment['reason'],
+                'risk_score': assessment['risk_score']
+            })
+        return assessment
     
     def record_trade(self, to_address: str, value_eth: float, tx_hash: str):
         """Record a completed trade"""
         try:
-            to_address = to_checksum_address(to_address)
+            to_address = normalize_address(to_address)
             value_eth = float(value_eth)
             
-            now = datetime.utcnow()
+            now = datetime.utcfromtimestamp(self.clock())
             today = now.date()
             current_hour = now.replace(minute=0, second=0, microsecond=0)
             
@@ -187,14 +214,14 @@ class RiskManager:
             if len(self.trade_history) > 1000:
                 self.trade_history = self.trade_history[-1000:]
             
-            logger.info(f"Trade recorded: {value_eth} ETH to {to_address}, tx: {tx_hash}")
+            logger.debug("Trade recorded: %s ETH to %s, tx: %s", value_eth, to_address, tx_hash)
             
         except Exception as e:
             logger.error(f"Error recording trade: {e}")
     
     def get_trading_stats(self) -> Dict[str, Any]:
         """Get current trading statistics"""
-        now = datetime.utcnow()
+        now = datetime.utcfromtimestamp(self.clock())
         today = now.date()
         current_hour = now.replace(minute=0, second=0, microsecond=0)
         
@@ -215,7 +242,7 @@ class RiskManager:
     def add_allowed_contract(self, contract_address: str):
         """Add a contract to the allowed list"""
         try:
-            contract_address = to_checksum_address(contract_address)
+            contract_address = normalize_address(contract_address)
             self.allowed_contracts.add(contract_address)
             logger.info(f"Added allowed contract: {contract_address}")
         except Exception as e:
@@ -225,7 +252,7 @@ class RiskManager:
     def remove_allowed_contract(self, contract_address: str):
         """Remove a contract from the allowed list"""
         try:
-            contract_address = to_checksum_address(contract_address)
+            contract_address = normalize_address(contract_address)
             self.allowed_contracts.discard(contract_address)
             logger.info(f"Removed allowed contract: {contract_address}")
         except Exception as e:
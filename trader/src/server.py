@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Trader API Server - Event-loop serving mode for the trader API
+An aiohttp application whose async handlers serve the hot endpoints (health,
+balances, bets, whale monitoring) and that shares its event loop with the
+whale monitor and its background tasks. Every other route is served by the
+Flask app through a WSGI bridge on a thread pool, so no request holds the
+loop and one process can keep hundreds of requests in flight.
+
+Run:  python server.py
+  or  gunicorn --chdir src --worker-class aiohttp.GunicornWebWorker server:create_app
+
+With ENGINE_SOCKET set the server is a stateless worker (see engine_service.py)
+and gunicorn can run several of them.
+"""
+
+import io
+import os
+import sys
+import json
+import asyncio
+import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict
+from aiohttp import web
+
+import app as flask_api  # Flask routes and the shared service instances
+from engine_rpc import EngineProxy
+from read_cache import etag_matches
+from event_bus import format_sse, format_sse_drops
+from metrics import render_metrics
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KEY = web.AppKey('executor', ThreadPoolExecutor)
+
+
+def json_response(data: Dict[str, Any], status: int = 200) -> web.Response:
+    return web.json_response(data, status=status, dumps=functools.partial(json.dumps, default=str))
+
+
+def error_response(message: str, status: int) -> web.Response:
+    return json_response({'error': message, 'status': 'error'}, status)
+
+
+def cached_read(handler: Callable) -> Callable:
+    """Serve a read endpoint from the shared read cache, coalescing concurrent requests, with ETag/304"""
+    @functools.wraps(handler)
+    async def wrapper(request: web.Request) -> web.Response:
+        async def fetch():
+            response = await handler(request)
+            return response.body, response.status
+
+        read_cache = flask_api.read_cache
+        entry = await read_cache.get_or_fetch_async(request.path_qs, fetch)
+        headers = {'ETag': entry.etag, 'Cache-Control': f"max-age={int(read_cache.ttl)}"}
+        if entry.status == 200 and etag_matches(request.headers.get('If-None-Match'), entry.etag):
+            read_cache.record_not_modified()
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=entry.body, status=entry.status, content_type='application/json', headers=headers)
+    return wrapper
+
+
+async def run_blocking(request: web.Request, fn: Callable, *args) -> Any:
+    """Run a blocking engine call on the server's thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(request.app[EXECUTOR_KEY], functools.partial(fn, *args))
+
+
+async def engine_call(request: web.Request, fn: Callable[[], Any]) -> Any:
+    """Run fn, which touches the engine services, without blocking the loop
+
+    Every attribute access or call on a worker's EngineProxy is a blocking
+    socket round trip, so fn goes to the thread pool. In-process services
+    are called on the loop (monitoring control schedules tasks on it).
+    """
+    if isinstance(flask_api.trading_engine, EngineProxy):
+        return await run_blocking(request, fn)
+    return fn()
+
+
+@cached_read
+async def health_check(request: web.Request) -> web.Response:
+    """Health check endpoint"""
+    web3_client = flask_api.web3_client
+    wallet_manager = flask_api.wallet_manager
+    return json_response({
+        'status': 'healthy',
+        'timestamp': datetime.utcnow().isoformat(),
+        'wallet_address': await engine_call(request, lambda: wallet_manager.get_address()) if wallet_manager else None,
+        'web3_connected': await web3_client.is_connected_async() if web3_client else False,
+        'trading_engine_ready': flask_api.trading_engine is not None
+    })
+
+
+@cached_read
+async def get_wallet_balance(request: web.Request) -> web.Response:
+    """Get the wallet's ETH balance"""
+    try:
+        web3_client = flask_api.web3_client
+        if not web3_client:
+            return error_response('Web3 client not available', 503)
+
+        balance = await web3_client.get_balance_async()
+        return json_response({
+            'balance_wei': str(balance),
+            'balance_eth': await engine_call(request, lambda: web3_client.wei_to_eth(balance)),
+            'status': 'success'
+        })
+    except Exception as e:
+        logger.error(f"Error getting wallet balance: {e}")
+        return error_response(str(e), 500)
+
+
+@cached_read
+async def get_polymarket_balance(request: web.Request) -> web.Response:
+    """Get Polymarket-related balances (USDC, ETH)"""
+    try:
+        trading_engine = flask_api.trading_engine
+        if not trading_engine:
+            return error_response('Trading engine not available', 503)
+
+        balance_info = await trading_engine.get_polymarket_balance_async()
+        return json_response({
+            'balance': balance_info,
+            'status': 'success'
+        })
+    except Exception as e:
+        logger.error(f"Error getting Polymarket balance: {e}")
+        return error_response(str(e), 500)
+
+
+async def place_polymarket_bet(request: web.Request) -> web.Response:
+    """Place a bet on Polymarket"""
+    try:
+        if request.content_type != 'application/json':
+            return json_response({'error': 'Request must be JSON'}, 400)
+
+        trading_engine = flask_api.trading_engine
+        if not trading_engine:
+            return error_response('Trading engine not available', 503)
+
+        bet_data = await request.json()
+
+        # Validate required fields
+        for field in ('market_id', 'outcome', 'amount_usdc', 'price'):
+            if field not in bet_data:
+                return json_response({'error': f'Missing required field: {field}'}, 400)
+
+        market_id = bet_data['market_id']
+        outcome = int(bet_data['outcome'])
+        amount_usdc = float(bet_data['amount_usdc'])
+        price = float(bet_data['price'])
+
+        if amount_usdc <= 0:
+            return json_response({'error': 'Amount must be positive'}, 400)
+
+        if not 0 <= price <= 1:
+            return json_response({'error': 'Price must be between 0 and 1'}, 400)
+
+        if outcome not in [0, 1]:
+            return json_response({'error': 'Outcome must be 0 or 1'}, 400)
+
+        # Signing and sending stay on the thread pool; the loop keeps serving
+        result = await run_blocking(request, lambda: trading_engine.execute_polymarket_bet(market_id, outcome, amount_usdc, price))
+
+        return json_response({
+            'bet_result': result,
+            'status': 'success'
+        })
+
+    except ValueError as e:
+        logger.warning(f"Invalid bet request: {e}")
+        return error_response(str(e), 400)
+    except Exception as e:
+        logger.error(f"Error placing bet: {e}")
+        return error_response(str(e), 500)
+
+
+async def start_whale_monitoring(request: web.Request) -> web.Response:
+    """Start whale monitoring on this server's event loop"""
+    trading_engine = flask_api.trading_engine
+    if not trading_engine:
+        return error_response('Trading engine not available', 503)
+    return json_response(await engine_call(request, lambda: trading_engine.start_whale_monitoring()))
+
+
+async def stop_whale_monitoring(request: web.Request) -> web.Response:
+    """Stop whale monitoring"""
+    trading_engine = flask_api.trading_engine
+    if not trading_engine:
+        return error_response('Trading engine not available', 503)
+    return json_response(await engine_call(request, lambda: trading_engine.stop_whale_monitoring()))
+
+
+async def start_bot(request: web.Request) -> web.Response:
+    """Start the trading bot (whale monitoring runs on this server's event loop)"""
+    trading_engine = flask_api.trading_engine
+    if not trading_engine:
+        return error_response('Trading engine not available', 503)
+
+    def start():
+        if trading_engine.whale_monitor:
+            return trading_engine.start_whale_monitoring()
+        return {'success': True, 'message': 'Trading bot started', 'bot_status': 'active'}
+
+    try:
+        return json_response(await engine_call(request, start))
+    except Exception as e:
+        logger.error(f"Error starting bot: {e}")
+        return error_response(str(e), 500)
+
+
+async def stop_bot(request: web.Request) -> web.Response:
+    """Stop the trading bot"""
+    trading_engine = flask_api.trading_engine
+    if not trading_engine:
+        return error_response('Trading engine not available', 503)
+
+    def stop():
+        if trading_engine.whale_monitor:
+            return trading_engine.stop_whale_monitoring()
+        return {'success': True, 'message': 'Trading bot stopped', 'bot_status': 'inactive'}
+
+    try:
+        return json_response(await engine_call(request, stop))
+    except Exception as e:
+        logger.error(f"Error stopping bot: {e}")
+        return error_response(str(e), 500)
+
+
+@cached_read
+async def get_whale_monitoring_status(request: web.Request) -> web.Response:
+    """Get whale monitoring status"""
+    trading_engine = flask_api.trading_engine
+    if not trading_engine:
+        return error_response('Trading engine not available', 503)
+    return json_response(await engine_call(request, lambda: trading_engine.get_whale_monitoring_status()))
+
+
+async def get_metrics(request: web.Request) -> web.Response:
+    """Prometheus metrics (the engine's, when serving as a worker)"""
+    try:
+        trading_engine = flask_api.trading_engine
+        text = await run_blocking(request, lambda: trading_engine.render_metrics() if trading_engine else render_metrics())
+        return web.Response(text=text, content_type='text/plain')
+    except Exception as e:
+        logger.error(f"Error rendering metrics: {e}")
+        return error_response(str(e), 500)
+
+
+async def stream_events(request: web.Request) -> web.StreamResponse:
+    """Server-sent events stream of bot activity"""
+    trading_engine = flask_api.trading_engine
+    if not trading_engine:
+        return error_response('Trading engine not available', 503)
+
+    event_bus = await engine_call(request, lambda: trading_engine.event_bus)
+    types = [t for t in request.query.get('types', '').split(',') if t] or None
+    last_event_id = request.headers.get('Last-Event-ID') or request.query.get('last_id')
+    last_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    heartbeat = float(os.environ.get('EVENTS_HEARTBEAT_SECONDS', '15'))
+
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    await response.prepare(request)
+
+    # Workers long-poll the engine's bus; in-process the bus pushes to a subscription
+    subscription = None
+    if isinstance(event_bus, EngineProxy):
+        if last_id is None:
+            last_id = (await run_blocking(request, lambda: event_bus.get_stats()))['last_id']
+    else:
+        subscription = event_bus.subscribe(types, last_id)
+
+    try:
+        while True:
+            if subscription is not None:
+                events, dropped = await subscription.get_async(heartbeat)
+            else:
+                batch = await event_bus.wait_since_async(last_id, heartbeat, types)
+                events, dropped = batch['events'], batch['dropped']
+                if events:
+                    last_id = events[-1]['id']
+
+            if dropped:
+                await response.write(format_sse_drops(dropped))
+            if events:
+                await response.write(b''.join(format_sse(event) for event in events))
+            elif not dropped:
+                await response.write(b': keepalive\n\n')
+    except (ConnectionResetError, asyncio.CancelledError):
+        pass
+    finally:
+        if subscription is not None:
+            subscription.close()
+    return response
+
+
+async def wsgi_bridge(request: web.Request) -> web.Response:
+    """Serve any other route with the Flask app on the thread pool"""
+    body = await request.read()
+    host, _, port = request.host.partition(':')
+    environ = {
+        'REQUEST_METHOD': request.method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': request.path,
+        'QUERY_STRING': request.query_string,
+        'CONTENT_TYPE': request.headers.get('Content-Type', ''),
+        'CONTENT_LENGTH': str(len(body)),
+        'SERVER_NAME': host or 'localhost',
+        'SERVER_PORT': port or ('443' if request.secure else '80'),
+        'SERVER_PROTOCOL': f"HTTP/{request.version.major}.{request.version.minor}",
+        'REMOTE_ADDR': request.remote or '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': request.scheme,
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for name, value in request.headers.items():
+        key = 'HTTP_' + name.upper().replace('-', '_')
+        if key not in ('HTTP_CONTENT_TYPE', 'HTTP_CONTENT_LENGTH'):
+            environ[key] = value
+
+    def call_flask():
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = status
+            started['headers'] = headers
+
+        chunks = flask_api.app.wsgi_app(environ, start_response)
+        try:
+            payload = b''.join(chunks)
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+        return started, payload
+
+    started, payload = await run_blocking(request, call_flask)
+    headers = [(name, value) for name, value in started['headers'] if name.lower() != 'content-length']
+    return web.Response(status=int(started['status'].split()[0]), headers=headers, body=payload)
+
+
+async def on_startup(app: web.Application):
+    """Initialize services off the loop (wallet derivation and RPC checks block)"""
+    await asyncio.get_running_loop().run_in_executor(app[EXECUTOR_KEY], flask_api.initialize_services)
+
+
+async def on_cleanup(app: web.Application):
+    """Stop background tasks and the thread pool"""
+    trading_engine = flask_api.trading_engine
+    # Workers leave the engine process's monitor alone
+    if isinstance(trading_engine, EngineProxy):
+        trading_engine = None
+    if trading_engine and trading_engine.whale_monitor and trading_engine.whale_monitor.running:
+        trading_engine.stop_whale_monitoring()
+    app[EXECUTOR_KEY].shutdown(wait=False)
+
+
+async def create_app() -> web.Application:
+    """Build the aiohttp application (also the gunicorn worker's app factory)"""
+    app = web.Application()
+    app[EXECUTOR_KEY] = ThreadPoolExecutor(
+        max_workers=int(os.environ.get('SERVER_BLOCKING_THREADS', '64')),
+        thread_name_prefix='api'
+    )
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+
+    app.router.add_get('/health', health_check)
+    app.router.add_get('/wallet/balance', get_wallet_balance)
+    app.router.add_get('/polymarket/balance', get_polymarket_balance)
+    app.router.add_post('/polymarket/bet', place_polymarket_bet)
+    app.router.add_post('/bot/start', start_bot)
+    app.router.add_post('/bot/stop', stop_bot)
+    app.router.add_post('/whales/start-monitoring', start_whale_monitoring)
+    app.router.add_post('/whales/stop-monitoring', stop_whale_monitoring)
+    app.router.add_get('/whales/status', get_whale_monitoring_status)
+    app.router.add_get('/events', stream_events)
+    app.router.add_get('/metrics', get_metrics)
+
+    # Everything else goes to the Flask routes
+    app.router.add_route('*', '/{tail:.*}', wsgi_bridge)
+    return app
+
+
+def main():
+    """Main server entry point"""
+    port = int(os.environ.get('PORT', 8080))
+    logger.info(f"Starting Polymarket Trading Bot (event-loop server) on port {port}")
+    web.run_app(create_app(), host='0.0.0.0', port=port, access_log=None)
+
+
+if __name__ == '__main__':
+    main()
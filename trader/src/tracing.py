@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Tracing - Span timings for each copy trade, from detection to receipt
+Every copied WhaleTrade gets a trace (its trace ID is derived from the
+trade hash) and each hop records a timed span into a ring buffer that
+/debug/traces serves. The active span travels in a contextvar, so spans
+outside a trace cost one lookup and nothing is recorded. With
+TRACE_EXPORT_PATH set, finished spans are also appended to that file as
+OTLP/JSON lines by a background thread.
+"""
+
+import os
+import json
+import time
+import queue
+import secrets
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """One timed hop of a trace"""
+
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'start_ns', 'end_ns', 'attributes', 'status', 'message')
+
+    def __init__(self, trace_id: str, name: str, parent_id: Optional[str] = None,
+                 start_ns: Optional[int] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns() if start_ns is None else start_ns
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.status = STATUS_UNSET
+        self.message = ''
+
+    def set_error(self, error: BaseException):
+        self.status = STATUS_ERROR
+        self.message = str(error)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3) if self.end_ns else None,
+            'attributes': self.attributes,
+            'status': 'error' if self.status == STATUS_ERROR else 'ok',
+            'message': self.message
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 1,  # SPAN_KIND_INTERNAL
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in self.attributes.items()],
+            'status': {'code': self.status, 'message': self.message} if self.status == STATUS_ERROR else {'code': self.status}
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class OTLPFileExporter:
+    """Appends finished spans to a file as OTLP/JSON ExportTraceServiceRequest lines"""
+
+    def __init__(self, path: str, service_name: str = 'trader', batch_size: int = 256):
+        self.path = path
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.exported = 0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        threading.Thread(target=self._run, name='trace-export', daemon=True).start()
+
+    def export(self, span: Span):
+        self._queue.put(span)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + 1.0
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+                self.exported += len(batch)
+            except Exception as e:
+                logger.warning(f"Failed to export {len(batch)} spans to {self.path}: {e}")
+
+    def _write(self, spans: List[Span]):
+        request = {
+            'resourceSpans': [{
+                'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service_name}}]},
+                'scopeSpans': [{
+                    'scope': {'name': 'trader.tracing'},
+                    'spans': [span.to_otlp() for span in spans]
+                }]
+            }]
+        }
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(request) + '\n')
+
+
+class Tracer:
+    """Records finished spans into a bounded ring buffer"""
+
+    def __init__(self):
+        """Initialize the tracer"""
+        self.enabled = os.environ.get('TRACING_ENABLED', 'true').lower() == 'true'
+        self.spans: deque = deque(maxlen=int(os.environ.get('TRACE_BUFFER_SPANS', '20000')))
+        export_path = os.environ.get('TRACE_EXPORT_PATH')
+        self.exporter = OTLPFileExporter(export_path) if export_path and self.enabled else None
+        self.recorded = 0
+
+    def start_trace(self, trace_id: str, name: str, start_ns: Optional[int] = None, **attributes) -> Optional[Span]:
+        """Root span of a new trace; it is finished with end()"""
+        if not self.enabled:
+            return None
+        return Span(trace_id, name, start_ns=start_ns, attributes=attributes)
+
+    def end(self, span: Optional[Span], end_ns: Optional[int] = None):
+        """Finish a span and record it"""
+        if span is None or span.end_ns is not None:
+            return
+        span.end_ns = time.time_ns() if end_ns is None else end_ns
+        if span.status == STATUS_UNSET:
+            span.status = STATUS_OK
+        self.spans.append(span)
+        self.recorded += 1
+        if self.exporter:
+            self.exporter.export(span)
+
+    @contextmanager
+    def activate(self, span: Optional[Span]) -> Iterator[Optional[Span]]:
+        """Make span the parent of spans opened in this context (and tasks created in it)"""
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Optional[Span]]:
+        """Timed child of the current span; a no-op outside a trace"""
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+        span = Span(parent.trace_id, name, parent.span_id, attributes=attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end(span)
+
+    def record(self, name: str, start_ns: int, end_ns: Optional[int] = None,
+               parent: Optional[Span] = None, **attributes) -> Optional[Span]:
+        """Record an already-timed child span of parent (default: the current span)"""
+        parent = parent or _current_span.get()
+        if parent is None:
+            return None
+        span = Span(parent.trace_id, name, parent.span_id, start_ns=start_ns, attributes=attributes)
+        self.end(span, end_ns)
+        return span
+
+    def current(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def get_traces(self, trace_id: Optional[str] = None, whale: Optional[str] = None,
+                   min_duration_ms: float = 0, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent traces with their spans, optionally filtered"""
+        by_trace: Dict[str, List[Span]] = {}
+        for span in reversed(list(self.spans)):
+            if trace_id is None or span.trace_id == trace_id:
+                by_trace.setdefault(span.trace_id, []).append(span)
+
+        traces = []
+        for spans in by_trace.values():
+            spans.sort(key=lambda span: span.start_ns)
+            root = next((span for span in spans if span.parent_id is None), None)
+            if whale and (root is None or str(root.attributes.get('whale', '')).lower() != whale.lower()):
+                continue
+            started = min(span.start_ns for span in spans)
+            ended = max(span.end_ns for span in spans)
+            duration_ms = (ended - started) / 1e6
+            if duration_ms < min_duration_ms:
+                continue
+            slowest = max((span for span in spans if span.parent_id), key=lambda span: span.end_ns - span.start_ns, default=None)
+            traces.append({
+                'trace_id': spans[0].trace_id,
+                'name': root.name if root else None,
+                'attributes': root.attributes if root else {},
+                'duration_ms': round(duration_ms, 3),
+                'slowest_span': slowest.name if slowest else None,
+                'errors': sum(1 for span in spans if span.status == STATUS_ERROR),
+                'spans': [span.to_dict() for span in spans]
+            })
+            if len(traces) >= limit:
+                break
+        return traces
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Tracer counters"""
+        return {
+            'enabled': self.enabled,
+            'buffered_spans': len(self.spans),
+            'buffer_size': self.spans.maxlen,
+            'recorded': self.recorded,
+            'exported': self.exporter.exported if self.exporter else 0,
+            'export_path': self.exporter.path if self.exporter else None
+        }
+
+
+tracer = Tracer()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Trade History - Compact storage for whale trade records
+WhaleTrade is a frozen, slotted record with an epoch timestamp. Bulk history
+(dedup windows, backtests) is kept column-wise in typed arrays with whale
+addresses and market IDs stored once in lookup tables, so a million trades
+take tens of megabytes instead of one Python object graph per trade.
+"""
+
+import sys
+import hashlib
+import logging
+from array import array
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Union, overload
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 32
+
+
+@dataclass(frozen=True, slots=True)
+class WhaleTrade:
+    """Represents a whale trade that should be copied"""
+    whale_address: str
+    market_id: str  # Interned, shared by every trade on the market
+    outcome: int
+    amount_usdc: float
+    price: float
+    timestamp: int  # Epoch seconds (UTC)
+    trade_hash: str
+    asset: str = ''  # CLOB token id of the outcome, when known
+
+    @property
+    def trace_id(self) -> str:
+        """Trace ID of this trade's copy, stable across restarts and processes"""
+        # Rows without a transactionHash are told apart by their trade fields
+        key = self.trade_hash or f"{self.whale_address}:{self.market_id}:{self.outcome}:{self.timestamp}:{self.amount_usdc}"
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+class _StringTable:
+    """Interned strings addressed by a small integer id"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def get_id(self, value: str) -> int:
+        index = self.ids.get(value)
+        if index is None:
+            value = sys.intern(value) if type(value) is str else value
+            index = len(self.values)
+            self.values.append(value)
+            self.ids[value] = index
+        return index
+
+
+class TradeHistory:
+    """Struct-of-arrays sequence of WhaleTrade records
+
+    Indexing and iteration rebuild WhaleTrade objects on demand; columns can
+    be read directly for vectorised scans. When max_trades is set, the
+    oldest trades are dropped in chunks once the history outgrows it.
+    """
+
+    def __init__(self, trades: Iterable[WhaleTrade] = (), max_trades: int = 0):
+        self.max_trades = max_trades
+        self.whales = _StringTable()
+        self.markets = _StringTable()
+        self.assets = _StringTable()
+
+        # Columns
+        self.whale_ids = array('I')
+        self.market_ids = array('I')
+        self.asset_ids = array('I')
+        self.outcomes = array('b')
+        self.amounts = array('d')
+        self.prices = array('d')
+        self.timestamps = array('q')
+        self.hashes = bytearray()  # HASH_SIZE bytes per trade
+
+        # Hashes that are not 32-byte hex strings, by row
+        self._odd_hashes: Dict[int, str] = {}
+        self._offset = 0  # Rows dropped from the front (keeps _odd_hashes keys stable)
+
+        self.extend(trades)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def append(self, trade: WhaleTrade):
+        """Add one trade"""
+        row = self._offset + len(self.timestamps)
+        self.whale_ids.append(self.whales.get_id(trade.whale_address))
+        self.market_ids.append(self.markets.get_id(trade.market_id))
+        self.asset_ids.append(self.assets.get_id(trade.asset))
+        self.outcomes.append(trade.outcome)
+        self.amounts.append(trade.amount_usdc)
+        self.prices.append(trade.price)
+        self.timestamps.append(trade.timestamp)
+
+        raw = None
+        trade_hash = trade.trade_hash
+        if len(trade_hash) == 2 + HASH_SIZE * 2 and trade_hash.startswith('0x'):
+            try:
+                raw = bytes.fromhex(trade_hash[2:])
+            except ValueError:
+                pass
+        if raw is None:
+            raw = bytes(HASH_SIZE)
+            self._odd_hashes[row] = trade_hash
+        self.hashes += raw
+
+        if self.max_trades and len(self.timestamps) > self.max_trades * 1.1:
+            self.trim(self.max_trades)
+
+    def extend(self, trades: Iterable[WhaleTrade]):
+        """Add many trades"""
+        for trade in trades:
+            self.append(trade)
+
+    def trim(self, keep: int):
+        """Drop the oldest trades, keeping the newest `keep`"""
+        drop = len(self.timestamps) - keep
+        if drop <= 0:
+            return
+        for column in (self.whale_ids, self.market_ids, self.asset_ids, self.outcomes, self.amounts, self.prices, self.timestamps):
+            del column[:drop]
+        del self.hashes[:drop * HASH_SIZE]
+
+        self._offset += drop
+        if self._odd_hashes:
+            self._odd_hashes = {row: value for row, value in self._odd_hashes.items() if row >= self._offset}
+        logger.debug(f"Trimmed {drop} trades from history")
+
+    def _trade_hash(self, index: int) -> str:
+        odd = self._odd_hashes.get(self._offset + index)
+        if odd is not None:
+            return odd
+        return '0x' + self.hashes[index * HASH_SIZE:(index + 1) * HASH_SIZE].hex()
+
+    def _get(self, index: int) -> WhaleTrade:
+        return WhaleTrade(
+            whale_address=self.whales.values[self.whale_ids[index]],
+            market_id=self.markets.values[self.market_ids[index]],
+            outcome=self.outcomes[index],
+            amount_usdc=self.amounts[index],
+            price=self.prices[index],
+            timestamp=self.timestamps[index],
+            trade_hash=self._trade_hash(index),
+            asset=self.assets.values[self.asset_ids[index]]
+        )
+
+    @overload
+    def __getitem__(self, index: int) -> WhaleTrade: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[WhaleTrade]: ...
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("trade history index out of range")
+        return self._get(index)
+
+    def __iter__(self) -> Iterator[WhaleTrade]:
+        for index in range(len(self)):
+            yield self._get(index)
+
+    def for_whale(self, whale_address: str) -> List[WhaleTrade]:
+        """All trades of one whale, oldest first"""
+        whale_id = self.whales.ids.get(whale_address)
+        if whale_id is None:
+            return []
+        return [self._get(index) for index, value in enumerate(self.whale_ids) if value == whale_id]
+
+    def since(self, timestamp: int) -> List[WhaleTrade]:
+        """Trades at or after an epoch timestamp, oldest first"""
+        return [self._get(index) for index, value in enumerate(self.timestamps) if value >= timestamp]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns"""
+        columns = (self.whale_ids, self.market_ids, self.asset_ids, self.outcomes, self.amounts, self.prices, self.timestamps)
+        return sum(column.itemsize * len(column) for column in columns) + len(self.hashes)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Size of the history and its lookup tables"""
+        return {
+            'trades': len(self),
+            'whales': len(self.whales),
+            'markets': len(self.markets),
+            'column_bytes': self.nbytes(),
+            'max_trades': self.max_trades
+        }
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Trade Simulator - Pre-trade eth_call simulation of bets
+Runs the exact buy calldata that is about to be signed through eth_call
+against the pending block, with the sender's USDC balance overridden (it is
+checked separately just before). Allowances come from chain state, as they
+will for the real transaction, so a missing approval fails the simulation
+too; only an approval we have sent but that is not yet mined is overridden,
+as nodes that serve 'pending' from the latest block would not see it.
+Reverts are decoded. Successful results are cached per (sender, market,
+outcome, size bucket, price, block), so a burst of copy trades costs at most
+one RPC hop per market and block; reverts are never cached, so a retry after
+an approval lands is simulated again.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from eth_utils import keccak
+from addresses import to_address
+from tx_templates import build_bet_data, encode_address, encode_uint256
+
+logger = logging.getLogger(__name__)
+
+# Solidity revert payloads
+ERROR_SELECTOR = keccak(text="Error(string)")[:4]
+PANIC_SELECTOR = keccak(text="Panic(uint256)")[:4]
+
+PANIC_CODES = {
+    0x01: 'assertion failed',
+    0x11: 'arithmetic overflow or underflow',
+    0x12: 'division by zero',
+    0x21: 'invalid enum value',
+    0x31: 'pop on empty array',
+    0x32: 'array index out of bounds',
+    0x41: 'out of memory',
+    0x51: 'call to invalid function'
+}
+
+
+def decode_revert_reason(data: bytes) -> str:
+    """Decode Error(string) / Panic(uint256) revert data into a readable reason"""
+    if not data:
+        return 'execution reverted'
+    selector, payload = data[:4], data[4:]
+    try:
+        if selector == ERROR_SELECTOR:
+            length = int.from_bytes(payload[32:64], 'big')
+            return payload[64:64 + length].decode('utf-8', errors='replace')
+        if selector == PANIC_SELECTOR:
+            code = int.from_bytes(payload[:32], 'big')
+            return f"panic 0x{code:02x}: {PANIC_CODES.get(code, 'unknown')}"
+    except (IndexError, ValueError):
+        pass
+    return f"execution reverted (0x{data.hex()})"
+
+
+def mapping_slot(key: bytes, slot: int) -> bytes:
+    """Storage slot of mapping[key] for a mapping declared at `slot`"""
+    return keccak(key + encode_uint256(slot))
+
+
+class SimulationError(Exception):
+    """The simulation itself could not be run (RPC failure, overrides unsupported)"""
+
+
+class TradeSimulator:
+    """Simulates market maker buys with eth_call state overrides"""
+
+    def __init__(self, web3_client, usdc_address: str):
+        """Initialize simulator for bets paid in the given USDC token"""
+        self.web3_client = web3_client
+        self.w3 = web3_client.w3
+        self.usdc_address = to_address(usdc_address)
+
+        # Configuration
+        # Storage layout of the collateral token (bridged USDC: balances at 0, allowances at 1)
+        self.balance_slot = int(os.environ.get('SIM_USDC_BALANCE_SLOT', '0'))
+        self.allowance_slot = int(os.environ.get('SIM_USDC_ALLOWANCE_SLOT', '1'))
+        self.block_refresh_seconds = float(os.environ.get('SIM_BLOCK_REFRESH_SECONDS', '2'))
+        self.size_bucket_ratio = float(os.environ.get('SIM_SIZE_BUCKET_RATIO', '1.05'))
+        self.max_cache_entries = int(os.environ.get('SIM_CACHE_MAX_ENTRIES', '4096'))
+
+        self._block_number: Optional[int] = None
+        self._block_updated_at = 0.0
+        self._cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.simulations = 0
+        self.cache_hits = 0
+        self.reverts = 0
+
+    def current_block(self) -> int:
+        """Latest block number, re-read at most once per block interval (used as a cache key)"""
+        now = time.monotonic()
+        if self._block_number is None or now - self._block_updated_at >= self.block_refresh_seconds:
+            self._block_number = self.w3.eth.block_number
+            self._block_updated_at = now
+        return self._block_number
+
+    def size_bucket(self, amount_units: int) -> int:
+        """Geometric size bucket so near-identical sizes share a simulation"""
+        if amount_units <= 0:
+            return 0
+        return int(math.log(amount_units) / math.log(self.size_bucket_ratio))
+
+    def build_state_override(self, sender: str, amount_units: int,
+                             pending_approval: Optional[Tuple[str, int]] = None) -> Dict[str, Any]:
+        """Override the sender's USDC balance, plus the allowance of an approval (spender, amount) still in flight"""
+        owner_word = encode_address(sender)
+        balance_key = mapping_slot(owner_word, self.balance_slot)
+        state_diff = {'0x' + balance_key.hex(): '0x' + encode_uint256(amount_units).hex()}
+        if pending_approval is not None:
+            spender, allowance = pending_approval
+            allowance_key = keccak(encode_address(spender) + mapping_slot(owner_word, self.allowance_slot))
+            state_diff['0x' + allowance_key.hex()] = '0x' + encode_uint256(allowance).hex()
+        return {self.usdc_address: {'stateDiff': state_diff}}
+
+    def _eth_call(self, transaction: Dict[str, Any], state_override: Dict[str, Any]) -> Tuple[bool, bytes, str]:
+        """Run eth_call on the pending block; returns (success, return data, revert reason)"""
+        response = self.w3.provider.make_request('eth_call', [transaction, 'pending', state_override])
+        error = response.get('error')
+        if error is None:
+            return True, bytes.fromhex(response.get('result', '0x')[2:]), ''
+
+        data = error.get('data')
+        if isinstance(data, dict):
+            data = data.get('data')
+        if isinstance(data, str) and data.startswith('0x'):
+            return False, b'', decode_revert_reason(bytes.fromhex(data[2:]))
+
+        message = error.get('message', '')
+        if 'revert' in message.lower():
+            return False, b'', message
+        raise SimulationError(message or str(error))
+
+    def simulate_bet(self, sender: str, market_maker_address: str, outcome: int, amount_units: int, max_price_wei: int,
+                     pending_approval: Optional[Tuple[str, int]] = None) -> Dict[str, Any]:
+        """Simulate a buy; returns success, revert reason and expected fills"""
+        sender = to_address(sender)
+        market_maker_address = to_address(market_maker_address)
+        bucket = self.size_bucket(amount_units)
+        block_number = self.current_block()
+        # Allowances are the sender's own chain state, so results are per sender
+        key = (sender, market_maker_address, outcome, bucket, max_price_wei, block_number)
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+        if cached is not None:
+            return self._scale(cached, amount_units)
+
+        data = build_bet_data(outcome, amount_units, max_price_wei)
+        transaction = {
+            'from': sender,
+            'to': market_maker_address,
+            'data': '0x' + data.hex()
+        }
+        state_override = self.build_state_override(sender, amount_units, pending_approval)
+
+        started = time.perf_counter()
+        try:
+            success, output, reason = self._eth_call(transaction, state_override)
+        except SimulationError:
+            raise
+        except Exception as e:
+            raise SimulationError(str(e)) from e
+        self.simulations += 1
+
+        result = {
+            'success': success,
+            'revert_reason': reason or None,
+            'amount_units': amount_units,
+            'tokens_bought': 0,
+            'shares_bought': 0,
+            'fees_paid': 0,
+            'block_number': block_number,
+            'latency_ms': round((time.perf_counter() - started) * 1000, 2),
+            'cached': False
+        }
+        if not success:
+            self.reverts += 1
+            logger.warning(f"Bet simulation on {market_maker_address} reverted: {reason}")
+            return result
+
+        if len(output) >= 96:
+            # buy returns (tokensBought, sharesBought, feesPaid)
+            result['tokens_bought'] = int.from_bytes(output[0:32], 'big')
+            result['shares_bought'] = int.from_bytes(output[32:64], 'big')
+            result['fees_paid'] = int.from_bytes(output[64:96], 'big')
+
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.max_cache_entries:
+                self._cache.popitem(last=False)
+
+        return result
+
+    def _scale(self, cached: Dict[str, Any], amount_units: int) -> Dict[str, Any]:
+        """Reuse a bucket's simulation for a nearby size, scaling the fills linearly"""
+        result = dict(cached, cached=True, latency_ms=0.0)
+        simulated_units = cached['amount_units']
+        if amount_units != simulated_units and simulated_units:
+            ratio = amount_units / simulated_units
+            for field in ('tokens_bought', 'shares_bought', 'fees_paid'):
+                result[field] = int(cached[field] * ratio)
+            result['amount_units'] = amount_units
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Simulation counters"""
+        return {
+            'simulations': self.simulations,
+            'cache_hits': self.cache_hits,
+            'reverts': self.reverts,
+            'cached_entries': len(self._cache),
+            'block_number': self._block_number
+        }
@@ -4,12 +4,24 @@ Trading Engine - Core Trading Logic
 Orchestrates wallet, Web3, and risk management for trade execution
 """
 
+import time
+import asyncio
 import logging
 from typing import Dict, Any, Optional
 from datetime import datetime
-from eth_utils import to_checksum_address
+from web3.exceptions import TimeExhausted
+from addresses import to_address as normalize_address
 from polymarket_client import PolymarketClient
 from whale_monitor import WhaleMonitor, WhaleConfig
+from account_pool import AccountScheduler
+from position_sizer import PositionSizer
+from order_book import OrderBookMirror
+from position_tracker import PositionTracker
+from redemption import RedemptionScheduler
+from event_bus import EventBus
+from metrics import render_metrics
+from tracing import tracer
+import profiler
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +34,11 @@ class TradingEngine:
         self.web3_client = web3_client
         self.risk_manager = risk_manager
         
+        # Activity stream for the UI (fills, whale trades, risk rejections)
+        self.event_bus = EventBus()
+        if risk_manager:
+            risk_manager.event_bus = self.event_bus
+        
         # Initialize Polymarket client
         try:
             self.polymarket_client = PolymarketClient(web3_client, wallet_manager)
@@ -30,6 +47,29 @@ class TradingEngine:
             logger.warning(f"Failed to initialize Polymarket client: {e}")
             self.polymarket_client = None
         
+        # Shard bets across the derived wallet accounts
+        self.account_scheduler = None
+        if self.polymarket_client:
+            self.account_scheduler = AccountScheduler(wallet_manager, self.polymarket_client)
+        
+        # Size copy trades against market depth
+        self.position_sizer = None
+        if self.polymarket_client:
+            self.position_sizer = PositionSizer(self.polymarket_client, self.polymarket_client.simulator.current_block)
+        
+        # Local order books for the tokens whales trade
+        self.order_books = OrderBookMirror()
+        
+        # Conditional-token positions and PnL, kept from transfer logs
+        self.position_tracker = None
+        if self.polymarket_client:
+            self.position_tracker = PositionTracker(self.polymarket_client, wallet_manager.get_addresses(), self._mark_price)
+        
+        # Redeem resolved markets in gas-aware batches
+        self.redemption_scheduler = None
+        if self.position_tracker:
+            self.redemption_scheduler = RedemptionScheduler(self.polymarket_client, self.position_tracker, self.account_scheduler)
+        
         # Initialize whale monitor
         try:
             self.whale_monitor = WhaleMonitor(self, web3_client)
@@ -44,7 +84,7 @@ class TradingEngine:
         """Execute a trading transaction"""
         try:
             # Normalize inputs
-            to_address = to_checksum_address(to_address)
+            to_address = normalize_address(to_address)
             value_eth = float(value_eth)
             
             logger.info(f"Executing trade: {value_eth} ETH to {to_address}")
@@ -146,6 +186,11 @@ class TradingEngine:
             logger.info(f"Trade confirmed: {tx_hash}")
             return result
             
+        except TimeExhausted:
+            # A dropped transaction leaves a nonce gap behind it
+            if self.polymarket_client:
+                self.polymarket_client.nonce_reconciler.reconcile_all(force=True)
+            raise
         except Exception as e:
             logger.error(f"Failed to wait for trade confirmation: {e}")
             raise
@@ -188,7 +233,7 @@ class TradingEngine:
     def simulate_trade(self, to_address: str, value_eth: float, data: str = '0x') -> Dict[str, Any]:
         """Simulate a trade without executing it"""
         try:
-            to_address = to_checksum_address(to_address)
+            to_address = normalize_address(to_address)
             value_eth = float(value_eth)
             
             logger.info(f"Simulating trade: {value_eth} ETH to {to_address}")
@@ -241,13 +286,18 @@ class TradingEngine:
             logger.error(f"Trade simulation failed: {e}")
             raise
     
-    def execute_polymarket_bet(self, market_id: str, outcome: int, amount_usdc: float, price: float) -> Dict[str, Any]:
+    def execute_polymarket_bet(self, market_id: str, outcome: int, amount_usdc: float, price: float, account_index: Optional[int] = None) -> Dict[str, Any]:
         """Execute a bet on Polymarket"""
         try:
             if not self.polymarket_client:
                 raise ValueError("Polymarket client not available")
             
-            logger.info(f"Executing Polymarket bet: {amount_usdc} USDC on outcome {outcome}")
+            # Bets on the same market stick to one account
+            if account_index is None:
+                account_index = self.account_scheduler.assign(market_id) if self.account_scheduler else 0
+            
+            logger.info("Executing Polymarket bet: %s USDC on outcome %s (account %s)", amount_usdc, outcome, account_index,
+                        extra={'market_id': market_id, 'amount_usdc': amount_usdc, 'account': account_index})
             
             # Risk assessment for Polymarket bet
             # Convert to equivalent ETH value for risk assessment (rough approximation)
@@ -260,14 +310,18 @@ class TradingEngine:
                 raise ValueError(f"Bet rejected by risk manager: {risk_assessment['reason']}")
             
             # Check USDC balance
-            usdc_balance = self.polymarket_client.get_usdc_balance()
+            with tracer.span('usdc_balance', account=account_index):
+                usdc_balance = self.polymarket_client.get_usdc_balance(account_index)
             required_usdc = int(amount_usdc * 1e6)  # Convert to USDC units
             
             if usdc_balance < required_usdc:
                 raise ValueError(f"Insufficient USDC balance: {usdc_balance / 1e6} USDC available, {amount_usdc} USDC required")
             
             # Place the bet
-            result = self.polymarket_client.place_bet(market_id, outcome, amount_usdc, price)
+            with tracer.span('place_bet', amount_usdc=amount_usdc, account=account_index):
+                result = self.polymarket_client.place_bet(market_id, outcome, amount_usdc, price, account_index)
+            if self.account_scheduler:
+                self.account_scheduler.record_spend(account_index, required_usdc)
             
             # Record trade in risk manager (using ETH equivalent)
             self.risk_manager.record_trade(
@@ -276,12 +330,22 @@ class TradingEngine:
                 result.get('tx_hash', 'pending')
             )
             
+            self.event_bus.publish('bet_placed', {
+                'market_id': market_id,
+                'outcome': outcome,
+                'amount_usdc': amount_usdc,
+                'price': price,
+                'account_index': account_index,
+                'tx_hash': result.get('tx_hash')
+            })
+            
             return {
                 'status': 'success',
                 'market_id': market_id,
                 'outcome': outcome,
                 'amount_usdc': amount_usdc,
                 'price': price,
+                'account_index': account_index,
                 'result': result,
                 'risk_assessment': risk_assessment,
                 'timestamp': datetime.utcnow().isoformat()
@@ -289,21 +353,232 @@ class TradingEngine:
             
         except Exception as e:
             logger.error(f"Polymarket bet execution failed: {e}")
+            self.event_bus.publish('bet_failed', {
+                'market_id': market_id,
+                'outcome': outcome,
+                'amount_usdc': amount_usdc,
+                'error': str(e)
+            })
+            raise
+    
+    def execute_sized_polymarket_bet(self, market_id: str, outcome: int, amount_usdc: float, reference_price: float, account_index: Optional[int] = None) -> Dict[str, Any]:
+        """Execute a bet capped by price impact, in tranches, with a max price near reference_price
+
+        If a tranche fails after others were sent, no more are placed and the
+        result has status 'partial' with the tranches that went through and
+        the error, so what was actually spent is still accounted for.
+        """
+        try:
+            if not self.position_sizer:
+                raise ValueError("Polymarket client not available")
+            
+            sizer = self.position_sizer
+            plan = sizer.plan(outcome, amount_usdc)
+            max_price = sizer.max_price(reference_price)
+            
+            results = []
+            filled_usdc = 0.0
+            error = None
+            for index, tranche in enumerate(plan['tranches']):
+                if index:
+                    # Let the price settle, then re-check depth before the next tranche
+                    time.sleep(sizer.tranche_interval)
+                    remaining = plan['amount_usdc'] - filled_usdc
+                    tranche = min(tranche, remaining, sizer.plan(outcome, tranche)['amount_usdc'])
+                    if tranche < sizer.min_order_usdc:
+                        logger.info("Stopping after %d tranches: depth exhausted", index)
+                        break
+                
+                try:
+                    result = self.execute_polymarket_bet(market_id, outcome, tranche, max_price, account_index)
+                except Exception as e:
+                    if not results:
+                        raise
+                    logger.error("Stopping after %d tranches: %s", index, e)
+                    error = str(e)
+                    break
+                # Later tranches stay on the account that took the first one
+                account_index = result['account_index']
+                results.append(result)
+                filled_usdc += tranche
+            
+            status = 'partial' if error else 'success' if results else 'skipped'
+            return {
+                'status': status,
+                'venue': 'amm',
+                'market_id': market_id,
+                'outcome': outcome,
+                'amount_usdc': round(filled_usdc, 6),
+                'max_price': max_price,
+                'account_index': account_index,
+                'sizing': plan,
+                'tranches': results,
+                'error': error,
+                'timestamp': datetime.utcnow().isoformat()
+            }
+            
+        except Exception as e:
+            logger.error(f"Sized Polymarket bet failed: {e}")
+            raise
+    
+    def execute_clob_bet(self, token_id: str, amount_usdc: float, reference_price: float, account_index: Optional[int] = None) -> Dict[str, Any]:
+        """Buy an outcome token with a CLOB limit order priced near reference_price"""
+        try:
+            if not self.polymarket_client:
+                raise ValueError("Polymarket client not available")
+            
+            if account_index is None:
+                account_index = self.account_scheduler.assign(token_id) if self.account_scheduler else 0
+            
+            # Same risk accounting as on-chain bets
+            risk_assessment = self.risk_manager.assess_trade(
+                self.polymarket_client.CONDITIONAL_TOKENS_CONTRACT,
+                amount_usdc / 2000  # Rough USDC to ETH conversion for risk assessment
+            )
+            if not risk_assessment['approved']:
+                raise ValueError(f"Bet rejected by risk manager: {risk_assessment['reason']}")
+            
+            price = round(min(0.99, reference_price * (1 + self.position_sizer.max_price_impact)), 2)
+            
+            # Cap the order at the liquidity resting within the price limit
+            depth_usdc = None
+            book = self.order_books.get(token_id)
+            if book:
+                depth_usdc, _ = book.buy_depth(price)
+                if self.position_sizer.min_order_usdc <= depth_usdc < amount_usdc:
+                    logger.info("Capping CLOB bet at book depth: %.2f of %.2f USDC", depth_usdc, amount_usdc)
+                    amount_usdc = depth_usdc
+            size = round(amount_usdc / price, 2)
+            with tracer.span('place_limit_order', amount_usdc=amount_usdc, account=account_index):
+                results = self.polymarket_client.place_limit_orders(
+                    [{'token_id': token_id, 'side': 'BUY', 'price': price, 'size': size}],
+                    account_index=account_index
+                )
+            # post_orders returns exactly one result per order, matched by order hash
+            result = results[0]
+            if not result.get('success'):
+                raise ValueError(f"CLOB order rejected: {result.get('errorMsg', 'unknown error')}")
+            
+            if self.account_scheduler:
+                self.account_scheduler.record_spend(account_index, int(amount_usdc * 1e6))
+            self.risk_manager.record_trade(
+                self.polymarket_client.CONDITIONAL_TOKENS_CONTRACT,
+                amount_usdc / 2000,
+                result.get('orderID', 'pending')
+            )
+            
+            return {
+                'status': 'success',
+                'venue': 'clob',
+                'token_id': token_id,
+                'amount_usdc': amount_usdc,
+                'price': price,
+                'size': size,
+                'book_depth_usdc': depth_usdc,
+                'account_index': account_index,
+                'result': result,
+                'risk_assessment': risk_assessment,
+                'timestamp': datetime.utcnow().isoformat()
+            }
+            
+        except Exception as e:
+            logger.error(f"CLOB bet execution failed: {e}")
+            raise
+    
+    def place_limit_orders(self, orders: list, order_type: str = 'GTC', account_index: int = 0) -> Dict[str, Any]:
+        """Submit CLOB limit orders in batches"""
+        if not self.polymarket_client:
+            raise ValueError("Polymarket client not available")
+        
+        results = self.polymarket_client.place_limit_orders(orders, order_type, account_index)
+        return {
+            'placed': sum(1 for result in results if result.get('success')),
+            'results': results,
+            'open_orders': len(self.polymarket_client.get_open_orders())
+        }
+    
+    def cancel_orders(self, order_ids: Optional[list] = None, account_index: int = 0) -> Dict[str, Any]:
+        """Cancel CLOB orders in bulk (all when order_ids is None)"""
+        if not self.polymarket_client:
+            raise ValueError("Polymarket client not available")
+        
+        return self.polymarket_client.cancel_orders(order_ids, account_index)
+    
+    def replace_orders(self, order_ids: list, orders: list, order_type: str = 'GTC', account_index: int = 0) -> Dict[str, Any]:
+        """Cancel CLOB orders and submit their replacements"""
+        if not self.polymarket_client:
+            raise ValueError("Polymarket client not available")
+        
+        return self.polymarket_client.replace_orders(order_ids, orders, order_type, account_index)
+    
+    def get_open_orders(self, token_id: Optional[str] = None) -> list:
+        """Locally tracked open CLOB orders"""
+        if not self.polymarket_client:
+            raise ValueError("Polymarket client not available")
+        
+        return self.polymarket_client.get_open_orders(token_id)
+    
+    def get_order_book(self, token_id: str) -> Optional[Dict[str, Any]]:
+        """Top of the locally mirrored book for a token (None if not mirrored)"""
+        book = self.order_books.get(token_id, fresh_only=False)
+        return book.get_summary() if book else None
+    
+    def simulate_polymarket_bet(self, market_id: str, outcome: int, amount_usdc: float, price: float, account_index: int = 0) -> Dict[str, Any]:
+        """Simulate a Polymarket bet (eth_call with state overrides) without placing it"""
+        try:
+            if not self.polymarket_client:
+                raise ValueError("Polymarket client not available")
+            
+            simulation = self.polymarket_client.simulate_bet(market_id, outcome, amount_usdc, price, account_index)
+            simulation['timestamp'] = datetime.utcnow().isoformat()
+            return simulation
+            
+        except Exception as e:
+            logger.error(f"Polymarket bet simulation failed: {e}")
             raise
     
-    def get_polymarket_balance(self) -> Dict[str, Any]:
+    def get_polymarket_balance(self, account_index: int = 0) -> Dict[str, Any]:
         """Get Polymarket-related balances"""
         try:
             if not self.polymarket_client:
                 return {'error': 'Polymarket client not available'}
             
-            usdc_balance = self.polymarket_client.get_usdc_balance()
+            usdc_balance = self.polymarket_client.get_usdc_balance(account_index)
+            address = self.wallet_manager.get_address(account_index)
+            
+            return {
+                'account_index': account_index,
+                'address': address,
+                'usdc_balance': usdc_balance,
+                'usdc_balance_formatted': usdc_balance / 1e6,
+                'eth_balance': self.web3_client.get_balance(address),
+                'eth_balance_formatted': self.web3_client.wei_to_eth(self.web3_client.get_balance(address)),
+                'timestamp': datetime.utcnow().isoformat()
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to get Polymarket balance: {e}")
+            raise
+    
+    async def get_polymarket_balance_async(self, account_index: int = 0) -> Dict[str, Any]:
+        """Get Polymarket-related balances with concurrent async RPC calls"""
+        try:
+            if not self.polymarket_client:
+                return {'error': 'Polymarket client not available'}
+            
+            address = self.wallet_manager.get_address(account_index)
+            usdc_balance, eth_balance = await asyncio.gather(
+                self.polymarket_client.get_usdc_balance_async(account_index),
+                self.web3_client.get_balance_async(address)
+            )
             
             return {
+                'account_index': account_index,
+                'address': address,
                 'usdc_balance': usdc_balance,
                 'usdc_balance_formatted': usdc_balance / 1e6,
-                'eth_balance': self.web3_client.get_balance(),
-                'eth_balance_formatted': self.web3_client.wei_to_eth(self.web3_client.get_balance()),
+                'eth_balance': eth_balance,
+                'eth_balance_formatted': self.web3_client.wei_to_eth(eth_balance),
                 'timestamp': datetime.utcnow().isoformat()
             }
             
@@ -311,6 +586,39 @@ class TradingEngine:
             logger.error(f"Failed to get Polymarket balance: {e}")
             raise
     
+    def get_account_pool_status(self) -> Dict[str, Any]:
+        """Get per-account balances and load of the account pool"""
+        try:
+            if not self.account_scheduler:
+                return {'error': 'Account scheduler not available'}
+            
+            self.account_scheduler.refresh_balances()
+            return self.account_scheduler.get_status()
+            
+        except Exception as e:
+            logger.error(f"Failed to get account pool status: {e}")
+            raise
+    
+    def rebalance_accounts(self) -> Dict[str, Any]:
+        """Rebalance USDC across the account pool"""
+        try:
+            if not self.account_scheduler:
+                raise ValueError("Account scheduler not available")
+            
+            transfers = self.account_scheduler.rebalance()
+            return {
+                'success': True,
+                'transfers': transfers,
+                'timestamp': datetime.utcnow().isoformat()
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to rebalance accounts: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
     def get_polymarket_market_info(self, market_id: str) -> Dict[str, Any]:
         """Get information about a Polymarket"""
         try:
@@ -323,6 +631,46 @@ class TradingEngine:
             logger.error(f"Failed to get market info: {e}")
             raise
     
+    def _mark_price(self, token_id: str) -> Optional[float]:
+        """Mid of the local order book, if it is live"""
+        book = self.order_books.get(token_id)
+        return book.mid() if book else None
+    
+    def record_copy_fill(self, result: Dict[str, Any], token_id: str, whale_address: str):
+        """Queue a successful copy trade's cost so its tokens are attributed to the whale"""
+        if not self.position_tracker or not token_id or result.get('status') not in ('success', 'partial'):
+            return
+        
+        account = self.wallet_manager.get_address(result['account_index'])
+        self.position_tracker.track([token_id])
+        if result.get('venue') == 'clob':
+            self.position_tracker.expect_fill(account, token_id, result['amount_usdc'], result['price'], whale_address, partial=True)
+        else:
+            # Matched to each tranche's own transfer, which may already have been applied
+            for tranche in result.get('tranches', []):
+                self.position_tracker.expect_fill(account, token_id, tranche['amount_usdc'], tranche['price'], whale_address,
+                                                  tx_hash=tranche['result'].get('tx_hash'))
+    
+    def get_positions(self, whale: Optional[str] = None) -> Dict[str, Any]:
+        """Open positions and PnL from the in-memory tracker"""
+        if not self.position_tracker:
+            raise ValueError("Polymarket client not available")
+        
+        return {
+            'positions': self.position_tracker.get_positions(whale),
+            'pnl': self.position_tracker.get_pnl(),
+            'tracker': self.position_tracker.get_stats()
+        }
+    
+    def redeem_resolved(self, force: bool = False) -> Dict[str, Any]:
+        """Redeem held positions of resolved markets (force ignores the gas ceiling)"""
+        if not self.redemption_scheduler:
+            raise ValueError("Polymarket client not available")
+        
+        result = self.redemption_scheduler.run_once(force)
+        result['stats'] = self.redemption_scheduler.get_stats()
+        return result
+    
     # Whale Management Methods
     
     def add_whale_to_monitor(self, address: str, name: str, category: str, position_percentage: float = 0.02):
@@ -338,7 +686,7 @@ class TradingEngine:
                 position_percentage=position_percentage
             )
             
-            self.whale_monitor.add_whale(whale_config)
+            self.whale_monitor.call_on_loop(self.whale_monitor.add_whale, whale_config)
             logger.info(f"Added whale to monitor: {name} ({address})")
             
             return {
@@ -359,13 +707,35 @@ class TradingEngine:
                 'error': str(e)
             }
     
+    def follow_leaderboard(self, entries: list, category: str = 'leaderboard', position_percentage: float = 0.02):
+        """Follow every whale on a leaderboard with tiered polling"""
+        try:
+            if not self.whale_monitor:
+                raise ValueError("Whale monitor not available")
+            
+            added = self.whale_monitor.call_on_loop(self.whale_monitor.add_leaderboard, entries, category, position_percentage)
+            
+            return {
+                'success': True,
+                'message': f'Following {added} new leaderboard whales',
+                'added': added,
+                'monitored_whales': len(self.whale_monitor.monitored_whales)
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to follow leaderboard: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
     def remove_whale_from_monitor(self, address: str):
         """Remove a whale from monitoring"""
         try:
             if not self.whale_monitor:
                 raise ValueError("Whale monitor not available")
             
-            self.whale_monitor.remove_whale(address)
+            self.whale_monitor.call_on_loop(self.whale_monitor.remove_whale, address)
             
             return {
                 'success': True,
@@ -419,6 +789,41 @@ class TradingEngine:
                 'error': str(e)
             }
     
+    def get_traces(self, trace_id: Optional[str] = None, whale: Optional[str] = None,
+                   min_duration_ms: float = 0, limit: int = 20) -> Dict[str, Any]:
+        """Recent copy-trade traces from the tracer's ring buffer"""
+        return {
+            'traces': tracer.get_traces(trace_id, whale, min_duration_ms, limit),
+            'tracer': tracer.get_stats()
+        }
+    
+    def profile_cpu(self, seconds: float, output: str = 'collapsed', interval_ms: float = 5) -> Any:
+        """Sample every thread of this (engine) process for a few seconds"""
+        profile = profiler.sample_stacks(seconds, interval_ms / 1000)
+        if output == 'speedscope':
+            return profiler.to_speedscope(profile)
+        return profiler.to_collapsed(profile)
+    
+    def profile_memory(self, seconds: float, top: int = 25, frames: int = 1) -> Dict[str, Any]:
+        """tracemalloc growth over a few seconds, with the sizes of the long-lived containers"""
+        report = profiler.memory_diff(seconds, top, frames)
+        containers = {}
+        if self.whale_monitor:
+            containers['recent_trades_whales'] = len(self.whale_monitor.recent_trades)
+            containers['recent_trades_hashes'] = sum(len(hashes) for hashes in list(self.whale_monitor.recent_trades.values()))
+            containers['trade_history'] = len(self.whale_monitor.trade_history)
+        if self.risk_manager:
+            containers['risk_daily_volume'] = len(self.risk_manager.daily_volume)
+            containers['risk_hourly_trade_count'] = len(self.risk_manager.hourly_trade_count)
+            containers['risk_daily_trade_count'] = len(self.risk_manager.daily_trade_count)
+            containers['risk_trade_history'] = len(self.risk_manager.trade_history)
+        report['containers'] = containers
+        return report
+    
+    def render_metrics(self) -> str:
+        """Hot-path metrics of this (engine) process in the Prometheus text format"""
+        return render_metrics()
+    
     def get_whale_monitoring_status(self) -> Dict[str, Any]:
         """Get whale monitoring status"""
         try:
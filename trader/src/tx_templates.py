@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Transaction Templates - Fast signing path for hot trading calls
+Keeps pre-built templates for the bet and approve calls so placing a bet only
+has to fill in arguments, attach a locally tracked nonce and sign. The
+local nonce is re-synced with the node's pending count periodically and
+after a receipt wait times out, so a dropped transaction cannot leave a
+permanent gap.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+import rlp
+from eth_abi import encode
+from eth_utils import keccak
+from addresses import to_address
+from metrics import SIGN_TIME
+
+logger = logging.getLogger(__name__)
+
+# Function selectors for the calls we template
+BUY_SELECTOR = keccak(text="buy(uint256,uint256,uint256)")[:4]
+APPROVE_SELECTOR = keccak(text="approve(address,uint256)")[:4]
+TRANSFER_SELECTOR = keccak(text="transfer(address,uint256)")[:4]
+REDEEM_SELECTOR = keccak(text="redeemPositions(address,bytes32,bytes32,uint256[])")[:4]
+
+
+def encode_uint256(value: int) -> bytes:
+    """ABI-encode an unsigned integer as a 32-byte word"""
+    return int(value).to_bytes(32, 'big')
+
+
+def encode_address(address: str) -> bytes:
+    """ABI-encode an address as a left-padded 32-byte word"""
+    return b'\x00' * 12 + to_address(address).raw
+
+
+def build_bet_data(outcome: int, amount_units: int, max_price_wei: int) -> bytes:
+    """Calldata of a market maker buy call"""
+    return BUY_SELECTOR + encode_uint256(outcome) + encode_uint256(amount_units) + encode_uint256(max_price_wei)
+
+
+def build_redeem_data(collateral: str, condition_id: str, index_sets: List[int]) -> bytes:
+    """Calldata of a Conditional Tokens redeemPositions call (top-level collection)"""
+    return REDEEM_SELECTOR + encode(
+        ['address', 'bytes32', 'bytes32', 'uint256[]'],
+        [to_address(collateral), bytes(32), bytes.fromhex(condition_id[2:] if condition_id.startswith('0x') else condition_id), index_sets]
+    )
+
+
+class TransactionTemplate:
+    """Static part of a contract call: target, selector and a fixed gas limit"""
+
+    def __init__(self, address: str, selector: bytes, gas: int):
+        self.to_address = to_address(address)
+        self.to_bytes = self.to_address.raw
+        self.selector = selector
+        self.gas = gas
+
+    def build_data(self, *words: bytes) -> bytes:
+        """Build calldata from pre-encoded 32-byte argument words"""
+        return self.selector + b''.join(words)
+
+
+class TransactionTemplateCache:
+    """Holds call templates plus pre-computed nonce and fee fields for one account"""
+
+    def __init__(self, web3_client, wallet_manager, account_index: int = 0):
+        """Initialize template cache"""
+        self.web3_client = web3_client
+        self.wallet_manager = wallet_manager
+        self.account_index = account_index
+        self.address = wallet_manager.get_address(account_index)
+        self.w3 = web3_client.w3
+
+        # Configuration
+        self.fee_refresh_seconds = float(os.environ.get('TX_FEE_REFRESH_SECONDS', '12'))
+        self.default_bet_gas = int(os.environ.get('BET_GAS_LIMIT', '500000'))
+        self.approve_gas = int(os.environ.get('APPROVE_GAS_LIMIT', '100000'))
+        self.redeem_gas = int(os.environ.get('REDEEM_GAS_LIMIT', '300000'))
+        self.nonce_gap_seconds = float(os.environ.get('TX_NONCE_GAP_SECONDS', '60'))
+        self.gas_buffer = 1.2
+
+        self._templates: Dict[Tuple[str, bytes], TransactionTemplate] = {}
+        self._chain_id: Optional[int] = None
+        self._nonce: Optional[int] = None
+        self._gas_price: Optional[int] = None
+        self._gas_price_updated_at = 0.0
+        self._gap: Optional[Tuple[int, float]] = None  # (node's pending count, first seen) while below the local nonce
+        self.nonce_resets = 0
+        self._lock = threading.Lock()
+
+    def prepare(self):
+        """Pre-compute chain id, nonce and fee fields ahead of the first trade"""
+        with self._lock:
+            self._load_chain_id()
+            self._load_nonce()
+            self._load_gas_price()
+        logger.info(f"Transaction templates prepared for {self.address}: nonce={self._nonce}, gas_price={self._gas_price}")
+
+    def _load_chain_id(self) -> int:
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+
+    def _load_nonce(self) -> int:
+        if self._nonce is None:
+            self._nonce = self.w3.eth.get_transaction_count(self.address, 'pending')
+        return self._nonce
+
+    def _load_gas_price(self) -> int:
+        now = time.monotonic()
+        if self._gas_price is None or now - self._gas_price_updated_at > self.fee_refresh_seconds:
+            self._gas_price = self.web3_client.get_gas_price()
+            self._gas_price_updated_at = now
+        return self._gas_price
+
+    def reset_nonce(self):
+        """Drop the local nonce so it is re-read from the chain (after a failed send)"""
+        with self._lock:
+            self._nonce = None
+
+    def reconcile_nonce(self, force: bool = False) -> Optional[int]:
+        """Re-sync the local nonce with the node's pending count; returns the next local nonce
+
+        A sent transaction that is later dropped leaves the local nonce ahead
+        of the chain and every later one queued behind the gap. Once the
+        pending count has stayed below the local nonce for nonce_gap_seconds
+        (at once with force, after a receipt timed out) the local nonce falls
+        back to it, so the next transaction fills the gap.
+        """
+        with self._lock:
+            local = self._nonce
+        if local is None:
+            return None
+
+        pending = self.w3.eth.get_transaction_count(self.address, 'pending')
+        now = time.monotonic()
+        with self._lock:
+            if self._nonce != local:
+                # Signed meanwhile; the node may not have seen it yet
+                return self._nonce
+            if pending > local:
+                # Transactions sent from this account elsewhere
+                self._nonce = pending
+                self._gap = None
+            elif pending < local:
+                if force or (self._gap is not None and self._gap[0] == pending and now - self._gap[1] >= self.nonce_gap_seconds):
+                    logger.warning(f"Nonce gap on {self.address}: local {local}, node pending {pending}; resuming at {pending}")
+                    self._nonce = pending
+                    self._gap = None
+                    self.nonce_resets += 1
+                elif self._gap is None or self._gap[0] != pending:
+                    self._gap = (pending, now)
+            else:
+                self._gap = None
+            return self._nonce
+
+    def get_template(self, address: str, selector: bytes, gas: Optional[int] = None) -> Optional[TransactionTemplate]:
+        """Get a cached template, creating it when a gas limit is supplied"""
+        key = (to_address(address), selector)
+        template = self._templates.get(key)
+        if template is None and gas is not None:
+            template = TransactionTemplate(address, selector, gas)
+            self._templates[key] = template
+        return template
+
+    def get_bet_template(self, market_maker_address: str, data: bytes) -> TransactionTemplate:
+        """Get the bet template for a market, estimating its gas limit once"""
+        template = self.get_template(market_maker_address, BUY_SELECTOR)
+        if template is not None:
+            return template
+
+        try:
+            gas_estimate = self.w3.eth.estimate_gas({
+                'from': self.address,
+                'to': to_address(market_maker_address),
+                'data': '0x' + data.hex()
+            })
+            gas = int(gas_estimate * self.gas_buffer)
+            logger.info(f"Bet gas limit for {market_maker_address}: {gas}")
+        except Exception as e:
+            logger.warning(f"Gas estimation failed for {market_maker_address}, using default: {e}")
+            gas = self.default_bet_gas
+
+        return self.get_template(market_maker_address, BUY_SELECTOR, gas)
+
+    def sign(self, template: TransactionTemplate, data: bytes, value: int = 0) -> Dict[str, Any]:
+        """Sign a templated call, consuming the next local nonce"""
+        with self._lock:
+            chain_id = self._load_chain_id()
+            gas_price = self._load_gas_price()
+            nonce = self._load_nonce()
+            self._nonce = nonce + 1
+
+        # EIP-155 legacy transaction signed with the cached key object
+        started = time.perf_counter()
+        unsigned = [nonce, gas_price, template.gas, template.to_bytes, value, data]
+        message_hash = keccak(rlp.encode(unsigned + [chain_id, 0, 0]))
+        signature = self.wallet_manager.get_signing_key(self.account_index).sign_msg_hash(message_hash)
+        v = signature.v + 35 + 2 * chain_id
+        raw_transaction = rlp.encode(unsigned + [v, signature.r, signature.s])
+        SIGN_TIME.observe(time.perf_counter() - started, 'tx')
+
+        return {
+            'raw_transaction': '0x' + raw_transaction.hex(),
+            'transaction_hash': '0x' + keccak(raw_transaction).hex(),
+            'r': signature.r,
+            's': signature.s,
+            'v': v,
+            'nonce': nonce,
+            'gas': template.gas,
+            'gas_price': gas_price
+        }
+
+    def sign_bet(self, market_maker_address: str, outcome: int, amount_units: int, max_price_wei: int) -> Dict[str, Any]:
+        """Sign a market maker buy call"""
+        data = build_bet_data(outcome, amount_units, max_price_wei)
+        template = self.get_bet_template(market_maker_address, data)
+        return self.sign(template, data)
+
+    def sign_approve(self, token_address: str, spender: str, amount: int) -> Dict[str, Any]:
+        """Sign an ERC20 approve call"""
+        template = self.get_template(token_address, APPROVE_SELECTOR, self.approve_gas)
+        data = template.build_data(encode_address(spender), encode_uint256(amount))
+        return self.sign(template, data)
+
+    def sign_transfer(self, token_address: str, recipient: str, amount: int) -> Dict[str, Any]:
+        """Sign an ERC20 transfer call"""
+        template = self.get_template(token_address, TRANSFER_SELECTOR, self.approve_gas)
+        data = template.build_data(encode_address(recipient), encode_uint256(amount))
+        return self.sign(template, data)
+
+    def sign_redeem(self, conditional_tokens_address: str, collateral: str, condition_id: str, index_sets: List[int]) -> Dict[str, Any]:
+        """Sign a Conditional Tokens redeemPositions call"""
+        template = self.get_template(conditional_tokens_address, REDEEM_SELECTOR, self.redeem_gas)
+        return self.sign(template, build_redeem_data(collateral, condition_id, index_sets))
+
+
+class NonceReconciler:
+    """Re-syncs every account's local nonce with the chain periodically"""
+
+    def __init__(self, caches: List[TransactionTemplateCache]):
+        """Initialize the reconciler for the per-account template caches"""
+        self.caches = caches
+        self.interval = float(os.environ.get('TX_NONCE_RECONCILE_SECONDS', '30'))
+        self.running = False
+
+    def reconcile_all(self, force: bool = False):
+        """Reconcile every account's nonce"""
+        for cache in self.caches:
+            try:
+                cache.reconcile_nonce(force)
+            except Exception as e:
+                logger.warning(f"Nonce reconciliation failed for {cache.address}: {e}")
+
+    async def run(self):
+        """Reconcile periodically until stopped"""
+        self.running = True
+        while self.running:
+            await asyncio.to_thread(self.reconcile_all)
+            await asyncio.sleep(self.interval)
+
+    def stop(self):
+        """Stop the reconciliation loop"""
+        self.running = False
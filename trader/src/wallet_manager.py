@@ -6,19 +6,28 @@ Handles secure wallet operations within the Trusted Execution Environment
 
 import os
 import logging
-from typing import Optional
+from typing import Optional, List
 from eth_account import Account
+from eth_account.hdaccount import seed_from_mnemonic, key_from_seed
 from eth_account.signers.local import LocalAccount
-from eth_utils import to_checksum_address
+from eth_keys import keys
+from addresses import Address, to_address
 
 logger = logging.getLogger(__name__)
 
+# Standard Ethereum derivation path, indexed by account number
+DERIVATION_PATH_TEMPLATE = "m/44'/60'/0'/0/{}"
+
 class WalletManager:
     """Manages wallet operations securely within the TEE"""
     
     def __init__(self):
         """Initialize wallet manager with mnemonic from environment"""
+        self.account_count = max(1, int(os.environ.get('WALLET_ACCOUNT_COUNT', '1')))
+        self.accounts: List[LocalAccount] = []
+        self.addresses: List[Address] = []
         self.account: Optional[LocalAccount] = None
+        self._signing_keys: List[keys.PrivateKey] = []
         self._initialize_wallet()
     
     def _initialize_wallet(self):
@@ -33,25 +42,49 @@ class WalletManager:
             # Enable HD wallet features
             Account.enable_unaudited_hdwallet_features()
             
-            # Create account from mnemonic
-            # Using standard Ethereum derivation path: m/44'/60'/0'/0/0
-            self.account = Account.from_mnemonic(
-                mnemonic, 
-                account_path="m/44'/60'/0'/0/0"
-            )
+            # Derive the seed once, then one account per index:
+            # m/44'/60'/0'/0/0, m/44'/60'/0'/0/1, ...
+            seed = seed_from_mnemonic(mnemonic, passphrase="")
+            for index in range(self.account_count):
+                private_key = key_from_seed(seed, DERIVATION_PATH_TEMPLATE.format(index))
+                self.accounts.append(Account.from_key(private_key))
+                self.addresses.append(to_address(self.accounts[-1].address))
+                
+                # Keep the parsed key object around so hot-path signing does not
+                # rebuild it from raw bytes on every transaction
+                self._signing_keys.append(keys.PrivateKey(private_key))
+            
+            # Account 0 stays the primary wallet
+            self.account = self.accounts[0]
             
-            logger.info(f"Wallet initialized successfully: {self.account.address}")
+            logger.info(f"Wallet initialized successfully: {self.account.address} ({self.account_count} accounts)")
             
         except Exception as e:
             logger.error(f"Failed to initialize wallet: {e}")
             raise
     
-    def get_address(self) -> str:
-        """Get the wallet address"""
-        if not self.account:
+    def _get_account(self, account_index: int) -> LocalAccount:
+        if not self.accounts:
             raise RuntimeError("Wallet not initialized")
         
-        return to_checksum_address(self.account.address)
+        if not 0 <= account_index < len(self.accounts):
+            raise ValueError(f"Invalid account index: {account_index}")
+        
+        return self.accounts[account_index]
+    
+    def get_address(self, account_index: int = 0) -> Address:
+        """Get the wallet address (checksummed once at startup)"""
+        self._get_account(account_index)
+        return self.addresses[account_index]
+    
+    def get_addresses(self) -> List[Address]:
+        """Get the addresses of all derived accounts"""
+        return list(self.addresses)
+    
+    def get_signing_key(self, account_index: int = 0) -> keys.PrivateKey:
+        """Get the cached key object used by the fast signing path"""
+        self._get_account(account_index)
+        return self._signing_keys[account_index]
     
     def get_private_key(self) -> str:
         """Get the private key (use with caution)"""
@@ -59,17 +92,16 @@ class WalletManager:
             raise RuntimeError("Wallet not initialized")
         
         return self.account.key.hex()
-    
-    def sign_transaction(self, transaction_dict: dict) -> dict:
+
+    def sign_transaction(self, transaction_dict: dict, account_index: int = 0) -> dict:
         """Sign a transaction"""
-        if not self.account:
-            raise RuntimeError("Wallet not initialized")
+        account = self._get_account(account_index)
         
         try:
             # Sign the transaction
-            signed_txn = self.account.sign_transaction(transaction_dict)
+            signed_txn = account.sign_transaction(transaction_dict)
             
-            logger.info(f"Transaction signed successfully")
+            logger.debug("Transaction signed successfully")
             return {
                 'raw_transaction': signed_txn.rawTransaction.hex(),
                 'transaction_hash': signed_txn.hash.hex(),
@@ -82,6 +114,11 @@ class WalletManager:
             logger.error(f"Failed to sign transaction: {e}")
             raise
     
+    def sign_hash(self, message_hash: bytes, account_index: int = 0) -> bytes:
+        """Sign a 32-byte digest (e.g. an EIP-712 hash); returns r || s || v with v in {27, 28}"""
+        signature = self.get_signing_key(account_index).sign_msg_hash(message_hash)
+        return signature.r.to_bytes(32, 'big') + signature.s.to_bytes(32, 'big') + bytes([signature.v + 27])
+    
     def sign_message(self, message: str) -> dict:
         """Sign a message"""
         if not self.account:
@@ -120,7 +157,7 @@ class WalletManager:
             recovered_address = Account.recover_message(message_bytes, signature=signature)
             
             # Check if the recovered address matches the expected address
-            return to_checksum_address(recovered_address) == to_checksum_address(address)
+            return to_address(recovered_address) == to_address(address)
             
         except Exception as e:
             logger.error(f"Failed to verify signature: {e}")
@@ -138,5 +175,14 @@ class WalletManager:
         return {
             'address': self.get_address(),
             'is_initialized': self.is_wallet_initialized(),
-            'derivation_path': "m/44'/60'/0'/0/0"
+            'derivation_path': DERIVATION_PATH_TEMPLATE.format(0),
+            'account_count': len(self.accounts),
+            'accounts': [
+                {
+                    'index': index,
+                    'address': self.get_address(index),
+                    'derivation_path': DERIVATION_PATH_TEMPLATE.format(index)
+                }
+                for index in range(len(self.accounts))
+            ]
         }
@@ -5,15 +5,50 @@ Handles all blockchain operations including transaction submission and monitorin
 """
 
 import os
+import time
 import logging
 from typing import Dict, Any, Optional
-from web3 import Web3
-from web3.middleware import ExtraDataToPOAMiddleware
+from web3 import Web3, AsyncWeb3
+from web3.middleware import geth_poa_middleware
 from eth_account import Account
-from eth_utils import to_checksum_address, to_hex
+from eth_utils import to_hex
+from addresses import to_address
+from metrics import RPC_LATENCY, RPC_ERRORS
 
 logger = logging.getLogger(__name__)
 
+def rpc_metrics_middleware(make_request, w3):
+    """Records latency and errors of every JSON-RPC request by method"""
+    def middleware(method, params):
+        started = time.perf_counter()
+        try:
+            response = make_request(method, params)
+        except Exception:
+            RPC_ERRORS.inc(method)
+            raise
+        finally:
+            RPC_LATENCY.observe(time.perf_counter() - started, method)
+        if 'error' in response:
+            RPC_ERRORS.inc(method)
+        return response
+    return middleware
+
+async def async_rpc_metrics_middleware(make_request, w3):
+    """rpc_metrics_middleware for the AsyncWeb3 instance"""
+    async def middleware(method, params):
+        started = time.perf_counter()
+        try:
+            response = await make_request(method, params)
+        except Exception:
+            RPC_ERRORS.inc(method)
+            raise
+        finally:
+            RPC_LATENCY.observe(time.perf_counter() - started, method)
+        if 'error' in response:
+            RPC_ERRORS.inc(method)
+        return response
+    return middleware
+
 class Web3Client:
     """Web3 client for blockchain interactions"""
     
@@ -21,6 +56,7 @@ class Web3Client:
         """Initialize Web3 client with wallet manager"""
         self.wallet_manager = wallet_manager
         self.w3: Optional[Web3] = None
+        self.async_w3: Optional[AsyncWeb3] = None
         self.network_name = "mainnet"
         self._initialize_web3()
     
@@ -30,12 +66,17 @@ class Web3Client:
             # Get RPC URL from environment
             rpc_url = os.environ.get('ETHEREUM_RPC_URL', 'https://eth.llamarpc.com')
             
-            # Initialize Web3
+            # Initialize Web3 (async instance for the event-loop server)
             self.w3 = Web3(Web3.HTTPProvider(rpc_url))
+            self.async_w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(rpc_url))
+            
+            # Per-method RPC latency for /metrics
+            self.w3.middleware_onion.add(rpc_metrics_middleware, 'rpc_metrics')
+            self.async_w3.middleware_onion.add(async_rpc_metrics_middleware, 'rpc_metrics')
             
             # Add PoA middleware if needed (for networks like Polygon)
             if 'polygon' in rpc_url.lower() or 'matic' in rpc_url.lower():
-                self.w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
+                self.w3.middleware_onion.inject(geth_poa_middleware, layer=0)
                 self.network_name = "polygon"
             elif 'arbitrum' in rpc_url.lower():
                 self.network_name = "arbitrum"
@@ -58,15 +99,34 @@ class Web3Client:
             address = self.wallet_manager.get_address()
         
         try:
-            address = to_checksum_address(address)
+            address = to_address(address)
             balance = self.w3.eth.get_balance(address)
-            logger.info(f"Balance for {address}: {self.wei_to_eth(balance)} ETH")
+            logger.debug("Balance for %s: %s wei", address, balance)
             return balance
             
         except Exception as e:
             logger.error(f"Failed to get balance for {address}: {e}")
             raise
     
+    async def get_balance_async(self, address: Optional[str] = None) -> int:
+        """Get ETH balance of an address without blocking the event loop"""
+        if address is None:
+            address = self.wallet_manager.get_address()
+        
+        try:
+            return await self.async_w3.eth.get_balance(to_address(address))
+        except Exception as e:
+            logger.error(f"Failed to get balance for {address}: {e}")
+            raise
+    
+    async def call_async(self, transaction: Dict[str, Any]) -> bytes:
+        """eth_call without blocking the event loop"""
+        try:
+            return await self.async_w3.eth.call(transaction)
+        except Exception as e:
+            logger.error(f"eth_call failed: {e}")
+            raise
+    
     def wei_to_eth(self, wei_amount: int) -> float:
         """Convert Wei to ETH"""
         return self.w3.from_wei(wei_amount, 'ether')
@@ -79,7 +139,7 @@ class Web3Client:
         """Get current gas price"""
         try:
             gas_price = self.w3.eth.gas_price
-            logger.info(f"Current gas price: {gas_price} wei")
+            logger.debug("Current gas price: %s wei", gas_price)
             return gas_price
         except Exception as e:
             logger.error(f"Failed to get gas price: {e}")
@@ -93,7 +153,7 @@ class Web3Client:
                 transaction['from'] = self.wallet_manager.get_address()
             
             gas_estimate = self.w3.eth.estimate_gas(transaction)
-            logger.info(f"Gas estimate: {gas_estimate}")
+            logger.debug("Gas estimate: %s", gas_estimate)
             return gas_estimate
             
         except Exception as e:
@@ -129,7 +189,7 @@ class Web3Client:
             )
             
             tx_hash_hex = tx_hash.hex()
-            logger.info(f"Transaction sent: {tx_hash_hex}")
+            logger.info("Transaction sent: %s", tx_hash_hex, extra={'tx_hash': tx_hash_hex})
             
             return {
                 'tx_hash': tx_hash_hex,
@@ -208,6 +268,13 @@ class Web3Client:
         except:
             return False
     
+    async def is_connected_async(self) -> bool:
+        """Check if Web3 is connected without blocking the event loop"""
+        try:
+            return await self.async_w3.is_connected()
+        except Exception:
+            return False
+    
     def get_network_info(self) -> Dict[str, Any]:
         """Get network information"""
         try:
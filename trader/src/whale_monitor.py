@@ -5,29 +5,27 @@ Monitors selected whale wallets for new trades and triggers copy-trading
 """
 
 import os
+import sys
+import math
 import time
 import logging
 import asyncio
-import aiohttp
-from typing import Dict, List, Set, Optional
-from datetime import datetime, timedelta
-from dataclasses import dataclass
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Set, Optional
+from dataclasses import dataclass, fields, replace
 from collections import defaultdict
+from addresses import to_address
+from whale_index import WhaleIndex
+from whale_scheduler import WhaleScheduler
+from api_client import PolymarketAPIClient
+from data_api import ClosedPosition, LeaderboardEntry, RecordedResponse, decode_positions, encode, timestamp_to_epoch
+from trade_history import TradeHistory, WhaleTrade
+from metrics import COPY_TRADES, DATA_API_LATENCY, DETECTION_LAG, PRETRADE_READ
+from tracing import tracer
 
 logger = logging.getLogger(__name__)
 
-@dataclass
-class WhaleTrade:
-    """Represents a whale trade that should be copied"""
-    whale_address: str
-    market_id: str
-    outcome: int
-    amount_usdc: float
-    price: float
-    timestamp: datetime
-    trade_hash: str
-
-@dataclass
+@dataclass(frozen=True, slots=True)
 class WhaleConfig:
     """Configuration for a whale to monitor"""
     address: str
@@ -36,6 +34,13 @@ class WhaleConfig:
     position_percentage: float = 0.02  # 2% of balance per trade
     max_daily_trades: int = 10
     enabled: bool = True
+    rank: Optional[int] = None  # Leaderboard rank, None for hand-added whales
+
+WHALE_CONFIG_FIELDS = frozenset(field.name for field in fields(WhaleConfig))
+
+def row_key(row: ClosedPosition, whale_address: str) -> str:
+    """Dedup key of a position row: its tx hash, or its trade fields when the API omits the hash"""
+    return row.tx_hash or f"{whale_address}:{row.slug}:{row.outcome}:{row.timestamp}:{row.amount}"
 
 class WhaleMonitor:
     """Monitors whale wallets for new trades"""
@@ -44,85 +49,180 @@ class WhaleMonitor:
         self.trading_engine = trading_engine
         self.web3_client = web3_client
         self.monitored_whales: Dict[str, WhaleConfig] = {}
-        self.recent_trades: Dict[str, Set[str]] = defaultdict(set)  # whale -> trade_hashes
+        self.whale_index = WhaleIndex()
+        self.recent_trades: Dict[str, Set[str]] = defaultdict(set)  # whale -> row keys (trade hashes)
+        self.trade_history = TradeHistory(max_trades=int(os.environ.get('WHALE_TRADE_HISTORY_MAX', '1000000')))
+        self.copy_tasks: Set[asyncio.Task] = set()
         self.running = False
+        self.loop: Optional[asyncio.AbstractEventLoop] = None  # The loop monitoring runs on, once started
+        
+        # Wall clock for trade ages and detection lag; replays swap in a virtual one
+        self.clock = time.time
         
         # Configuration
         self.check_interval = int(os.environ.get('WHALE_CHECK_INTERVAL', 30000)) / 1000  # Convert to seconds
         self.trade_execution_delay = int(os.environ.get('TRADE_EXECUTION_DELAY', 5000)) / 1000
         self.max_position_percentage = float(os.environ.get('MAX_POSITION_PERCENTAGE', 0.05))
+        self.poll_concurrency = int(os.environ.get('WHALE_POLL_CONCURRENCY', '10'))
+        self.copy_venue = os.environ.get('COPY_TRADE_VENUE', 'amm').lower()  # 'amm' or 'clob'
+        self.max_trade_age = float(os.environ.get('WHALE_MAX_TRADE_AGE', '300'))  # on a whale's first poll
+        self.trades_per_cycle = int(os.environ.get('WHALE_TRADES_PER_CYCLE', '5'))  # rows fetched per cycle since the last poll
+        self.trade_page_max = int(os.environ.get('WHALE_TRADE_PAGE_MAX', '50'))  # data-api page size cap
+        self.trade_max_pages = int(os.environ.get('WHALE_TRADE_MAX_PAGES', '10'))
+        self.incomplete_polls: Set[str] = set()  # whales whose last poll could not page back to the previous one
+        
+        # Changed closed-positions responses can be recorded to JSONL for replays
+        self.record_path = os.environ.get('WHALE_RECORD_PATH') or None
+        self._record_file = None
+        
+        # Rate-limited, retrying HTTP client shared by all polls
+        self.api_client = PolymarketAPIClient(max_connections=self.poll_concurrency)
+        
+        # Tiered polling keeps large follow lists within the API budget
+        self.scheduler = WhaleScheduler(self.check_interval)
         
         # Polymarket API endpoints
         self.polymarket_data_api = "https://data-api.polymarket.com"
         self.polymarket_gamma_api = "https://gamma-api.polymarket.com"
         
+        # Never schedule more polls than the data-api limiter currently allows
+        self.scheduler.rate_provider = lambda: self.api_client.current_rate(self.polymarket_data_api)
+        
         logger.info(f"Whale monitor initialized with {self.check_interval}s check interval")
     
     def add_whale(self, whale_config: WhaleConfig):
         """Add a whale to monitor"""
+        # Key whales by their interned checksum address so any spelling finds them
+        whale_config = replace(whale_config, address=to_address(whale_config.address))
         self.monitored_whales[whale_config.address] = whale_config
+        self.whale_index.add(whale_config.address)
+        self.scheduler.add(whale_config.address, whale_config.rank)
         logger.info(f"Added whale to monitor: {whale_config.name} ({whale_config.address})")
     
     def remove_whale(self, whale_address: str):
         """Remove a whale from monitoring"""
+        whale_address = to_address(whale_address)
         if whale_address in self.monitored_whales:
             del self.monitored_whales[whale_address]
+            self.whale_index.remove(whale_address)
+            self.scheduler.remove(whale_address)
+            self.recent_trades.pop(whale_address, None)
+            self.incomplete_polls.discard(whale_address)
             logger.info(f"Removed whale from monitoring: {whale_address}")
     
     def update_whale_config(self, whale_address: str, **kwargs):
         """Update whale configuration"""
+        whale_address = to_address(whale_address)
         if whale_address in self.monitored_whales:
-            whale = self.monitored_whales[whale_address]
-            for key, value in kwargs.items():
-                if hasattr(whale, key):
-                    setattr(whale, key, value)
+            # Configs are frozen; swap in an updated copy
+            updates = {key: value for key, value in kwargs.items() if key in WHALE_CONFIG_FIELDS and key != 'address'}
+            self.monitored_whales[whale_address] = replace(self.monitored_whales[whale_address], **updates)
             logger.info(f"Updated whale config for {whale_address}: {kwargs}")
     
-    async def fetch_recent_trades(self, whale_address: str, limit: int = 10) -> List[Dict]:
-        """Fetch recent trades for a specific whale"""
+    def add_leaderboard(self, entries: List[LeaderboardEntry], category: str = 'leaderboard', position_percentage: float = 0.02) -> int:
+        """Follow decoded leaderboard entries; returns the number added"""
+        added = 0
+        for position, entry in enumerate(entries):
+            try:
+                rank = entry.rank or position + 1
+                address = to_address(entry.address)
+            except ValueError as e:
+                logger.warning(f"Skipping invalid leaderboard entry {entry}: {e}")
+                continue
+            
+            existing = self.monitored_whales.get(address)
+            if existing:
+                # Keep hand-tuned configs, just refresh the rank
+                self.monitored_whales[address] = replace(existing, rank=rank)
+                self.scheduler.add(address, rank)
+                continue
+            
+            whale_config = WhaleConfig(
+                address=address,
+                name=entry.name or f"Rank {rank}",
+                category=category,
+                position_percentage=position_percentage,
+                rank=rank
+            )
+            self.monitored_whales[address] = whale_config
+            self.whale_index.add(address)
+            self.scheduler.add(address, rank)
+            added += 1
+        
+        logger.info(f"Following {added} new leaderboard whales ({len(self.monitored_whales)} total)")
+        return added
+    
+    def is_monitored(self, address) -> bool:
+        """Check whether an address (hex string in any case, or raw bytes) is a monitored whale"""
+        return address in self.whale_index
+    
+    def filter_whale_logs(self, logs: List[Dict], topic_index: int = 1) -> List[Dict]:
+        """Keep block logs whose indexed address topic belongs to a monitored whale"""
+        return list(self.whale_index.filter_logs(logs, topic_index))
+    
+    def filter_whale_activity(self, rows: List[Dict], field: str = 'proxyWallet') -> List[Dict]:
+        """Keep activity-feed rows that belong to a monitored whale"""
+        return list(self.whale_index.filter_rows(rows, field))
+    
+    async def fetch_recent_trades(self, whale_address: str, limit: int = 10, skip_unchanged: bool = False,
+                                  offset: int = 0) -> Optional[List[ClosedPosition]]:
+        """Fetch recent trades for a specific whale, None if the request failed
+
+        With skip_unchanged, a response identical to the previous poll
+        returns [] without being parsed (every trade in it was already seen).
+        """
         try:
-            async with aiohttp.ClientSession() as session:
-                params = {
-                    'user': whale_address,
-                    'limit': limit,
-                    'sortBy': 'timestamp',
-                    'sortDirection': 'DESC'
-                }
-                
-                url = f"{self.polymarket_data_api}/closed-positions"
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data if isinstance(data, list) else data.get('data', [])
-                    else:
-                        logger.warning(f"Failed to fetch trades for {whale_address}: {response.status}")
-                        return []
+            params = {
+                'user': whale_address,
+                'limit': limit,
+                'sortBy': 'timestamp',
+                'sortDirection': 'DESC'
+            }
+            if offset:
+                params['offset'] = offset
+            
+            url = f"{self.polymarket_data_api}/closed-positions"
+            started = time.perf_counter()
+            data, changed = await self.api_client.get_json_conditional(url, params, decode_positions)
+            DATA_API_LATENCY.observe(time.perf_counter() - started, whale_address)
+            if data is None:
+                logger.warning(f"Failed to fetch trades for {whale_address}")
+                return None
+            if changed:
+                self._record(whale_address, data)
+            if skip_unchanged and not changed:
+                return []
+            return data
         except Exception as e:
             logger.error(f"Error fetching trades for {whale_address}: {e}")
-            return []
+            return None
+    
+    def _record(self, whale_address: str, rows: List[ClosedPosition]):
+        """Append a changed response to the WHALE_RECORD_PATH recording for replays"""
+        if self.record_path:
+            if self._record_file is None:
+                self._record_file = open(self.record_path, 'ab')
+            self._record_file.write(encode(RecordedResponse(ts=self.clock(), whale=whale_address, rows=rows)) + b'\n')
     
-    def parse_trade_data(self, trade_data: Dict, whale_address: str) -> Optional[WhaleTrade]:
-        """Parse trade data into WhaleTrade object"""
+    def parse_trade_data(self, trade_data: ClosedPosition, whale_address: str, max_age: Optional[float] = None) -> Optional[WhaleTrade]:
+        """Parse a decoded position row into WhaleTrade object, None if older than max_age seconds"""
         try:
             # Extract relevant information from trade data
-            market_id = trade_data.get('slug', '')
-            outcome = 1 if trade_data.get('outcome', '').lower() in ['yes', 'true', '1'] else 0
-            amount_usdc = float(trade_data.get('amount', 0))
-            price = float(trade_data.get('avgPrice', 0))
-            timestamp_str = trade_data.get('timestamp', '')
-            trade_hash = trade_data.get('txHash', '')
+            market_id = sys.intern(trade_data.slug)
+            outcome = 1 if trade_data.outcome.lower() in ('yes', 'true', '1') else 0
+            amount_usdc = trade_data.amount
+            price = trade_data.avg_price
+            trade_hash = trade_data.tx_hash
             
-            # Parse timestamp
-            if timestamp_str:
-                try:
-                    timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                except:
-                    timestamp = datetime.utcnow()
-            else:
-                timestamp = datetime.utcnow()
+            # Parse timestamp (epoch or ISO-8601) to epoch seconds
+            now = int(self.clock())
+            try:
+                timestamp = timestamp_to_epoch(trade_data.timestamp) or now
+            except ValueError:
+                timestamp = now
             
-            # Only process recent trades (last 5 minutes)
-            if datetime.utcnow() - timestamp > timedelta(minutes=5):
+            # Only process recent trades
+            if now - timestamp > (self.max_trade_age if max_age is None else max_age):
                 return None
             
             return WhaleTrade(
@@ -132,60 +232,243 @@ class WhaleMonitor:
                 amount_usdc=amount_usdc,
                 price=price,
                 timestamp=timestamp,
-                trade_hash=trade_hash
+                trade_hash=trade_hash,
+                asset=sys.intern(trade_data.asset)
             )
             
         except Exception as e:
             logger.error(f"Error parsing trade data: {e}")
             return None
     
+    def _reaches_back(self, row: ClosedPosition, max_age: float) -> bool:
+        """Whether rows older than this one may still be inside the look-back window"""
+        try:
+            timestamp = timestamp_to_epoch(row.timestamp)
+        except ValueError:
+            return False
+        return bool(timestamp) and self.clock() - timestamp <= max_age
+    
     async def check_whale_trades(self, whale_address: str) -> List[WhaleTrade]:
         """Check for new trades from a specific whale"""
         whale_config = self.monitored_whales.get(whale_address)
         if not whale_config or not whale_config.enabled:
             return []
         
-        # Fetch recent trades
-        recent_trades_data = await self.fetch_recent_trades(whale_address, limit=5)
+        # Anything since the previous poll is new, however long the whale's
+        # tier or the poll budget kept us away; a first poll only looks back
+        # max_trade_age so old history is not copied
+        schedule = self.scheduler.entries.get(whale_address)
+        last_polled = schedule.last_polled if schedule else 0.0
+        max_age = self.max_trade_age
+        if last_polled:
+            max_age = max(max_age, self.clock() - last_polled + self.check_interval)
+        
+        # Fetch everything since the last poll: the page grows with the cycles
+        # the whale's tier kept us away, and full pages that still reach back
+        # into the window are followed
+        cycles = math.ceil((self.clock() - last_polled) / self.check_interval) if last_polled else 1
+        limit = max(1, min(self.trade_page_max, self.trades_per_cycle * max(1, cycles)))
+        recent_trades_data = await self.fetch_recent_trades(whale_address, limit=limit,
+                                                            skip_unchanged=whale_address not in self.incomplete_polls)
+        if recent_trades_data is None:
+            # Not a successful poll: the next one still looks back to the last
+            return []
+        page = recent_trades_data
+        complete = True
+        for pages in range(1, self.trade_max_pages + 1):
+            if len(page) < limit or not self._reaches_back(page[-1], max_age):
+                break
+            if pages == self.trade_max_pages:
+                logger.warning(f"Whale {whale_address} has more than {pages * limit} trades since its last poll; older ones skipped")
+                break
+            page = await self.fetch_recent_trades(whale_address, limit=limit, offset=pages * limit)
+            if page is None:
+                complete = False
+                break
+            recent_trades_data = recent_trades_data + page
+        seen = self.recent_trades[whale_address]
         new_trades = []
+        had_activity = False
         
         for trade_data in recent_trades_data:
-            trade = self.parse_trade_data(trade_data, whale_address)
-            if trade and trade.trade_hash not in self.recent_trades[whale_address]:
+            key = row_key(trade_data, whale_address)
+            if key in seen:
+                continue
+            # Unseen rows are activity even when too old to copy, and are
+            # remembered so a later poll does not reconsider them
+            seen.add(key)
+            had_activity = had_activity or bool(last_polled)
+            trade = self.parse_trade_data(trade_data, whale_address, max_age)
+            if trade:
                 new_trades.append(trade)
-                self.recent_trades[whale_address].add(trade.trade_hash)
+                self.trade_history.append(trade)
+                if self.trading_engine.redemption_scheduler:
+                    self.trading_engine.redemption_scheduler.register_market(trade.asset, trade_data.condition_id, trade_data.outcome_index)
+        
+        if complete:
+            self.incomplete_polls.discard(whale_address)
+            self.scheduler.record_poll(whale_address, had_activity or bool(new_trades), self.clock())
+        else:
+            # Keep the look-back window and re-read the first page next time
+            self.incomplete_polls.add(whale_address)
+        
+        # Mirror the books of traded tokens so copies can price locally
+        if new_trades:
+            self.trading_engine.order_books.track(trade.asset for trade in new_trades)
         
         return new_trades
     
     async def execute_copy_trade(self, whale_trade: WhaleTrade, whale_config: WhaleConfig):
         """Execute a copy trade based on whale's trade"""
         try:
-            logger.info(f"Executing copy trade for {whale_config.name}: {whale_trade.amount_usdc} USDC on {whale_trade.market_id}")
-            
-            # Calculate position size based on our balance and whale's percentage
-            balance_info = self.trading_engine.get_polymarket_balance()
-            available_usdc = balance_info.get('usdc_balance_formatted', 0)
+            logger.info("Executing copy trade for %s: %s USDC on %s", whale_config.name, whale_trade.amount_usdc, whale_trade.market_id,
+                        extra={'trace_id': whale_trade.trace_id, 'whale': whale_trade.whale_address})
             
-            # Calculate our position size
-            position_percentage = min(whale_config.position_percentage, self.max_position_percentage)
-            our_amount_usdc = available_usdc * position_percentage
+            # Run on the lane of the account that owns this market so trades
+            # on other accounts are not blocked behind it
+            scheduler = self.trading_engine.account_scheduler
+            with tracer.span('execute_copy_trade', venue=self.copy_venue):
+                if scheduler:
+                    future = scheduler.submit(whale_trade.market_id, self._copy_trade_on_account, whale_trade, whale_config)
+                    result = await asyncio.wrap_future(future)
+                else:
+                    result = self._copy_trade_on_account(0, whale_trade, whale_config)
             
-            if our_amount_usdc < 1:  # Minimum $1 USDC
-                logger.warning(f"Insufficient balance for copy trade: {available_usdc} USDC")
-                return
+            COPY_TRADES.inc(result['status'] if result else 'skipped')
+            if result and result['status'] in ('success', 'partial'):
+                # A partial fill still spent what its sent tranches did
+                self.trading_engine.record_copy_fill(result, whale_trade.asset, whale_trade.whale_address)
+                if result['status'] == 'partial':
+                    logger.warning("Copy trade partially executed: %s USDC via %s (%s)", result['amount_usdc'], result['venue'], result['error'],
+                                   extra={'trace_id': whale_trade.trace_id, 'venue': result['venue']})
+                else:
+                    logger.info("Copy trade executed successfully: %s USDC via %s", result['amount_usdc'], result['venue'],
+                                extra={'trace_id': whale_trade.trace_id, 'venue': result['venue']})
+                self.trading_engine.event_bus.publish('copy_fill', {
+                    'whale_address': whale_trade.whale_address,
+                    'whale_name': whale_config.name,
+                    'market_id': whale_trade.market_id,
+                    'asset': whale_trade.asset,
+                    'amount_usdc': result['amount_usdc'],
+                    'venue': result['venue'],
+                    'partial': result['status'] == 'partial'
+                })
             
-            # Execute the copy trade
-            result = self.trading_engine.execute_polymarket_bet(
-                market_id=whale_trade.market_id,
-                outcome=whale_trade.outcome,
+        except Exception as e:
+            logger.error(f"Failed to execute copy trade: {e}")
+            COPY_TRADES.inc('error')
+            self.trading_engine.event_bus.publish('copy_failed', {
+                'whale_address': whale_trade.whale_address,
+                'whale_name': whale_config.name,
+                'market_id': whale_trade.market_id,
+                'error': str(e)
+            })
+    
+    def _copy_trade_on_account(self, account_index: int, whale_trade: WhaleTrade, whale_config: WhaleConfig) -> Optional[Dict]:
+        """Size and place a copy trade from one of our accounts"""
+        # Calculate position size based on this account's balance and whale's percentage
+        started = time.perf_counter()
+        with tracer.span('pretrade_read', account=account_index):
+            balance_info = self.trading_engine.get_polymarket_balance(account_index)
+        available_usdc = balance_info.get('usdc_balance_formatted', 0)
+        
+        # Calculate our position size
+        position_percentage = min(whale_config.position_percentage, self.max_position_percentage)
+        our_amount_usdc = available_usdc * position_percentage
+        
+        if our_amount_usdc < 1:  # Minimum $1 USDC
+            logger.warning(f"Insufficient balance for copy trade on account {account_index}: {available_usdc} USDC")
+            return None
+        
+        # Price off the local book when it is live, else the whale's fill
+        reference_price = whale_trade.price
+        book = self.trading_engine.order_books.get(whale_trade.asset) if whale_trade.asset else None
+        best_ask = book.best_ask() if book else None
+        if best_ask is not None:
+            reference_price = best_ask
+        PRETRADE_READ.observe(time.perf_counter() - started)
+        
+        # Resting limit orders on the CLOB skip gas and block time
+        if self.copy_venue == 'clob' and whale_trade.asset:
+            return self.trading_engine.execute_clob_bet(
+                token_id=whale_trade.asset,
                 amount_usdc=our_amount_usdc,
-                price=whale_trade.price
+                reference_price=reference_price,
+                account_index=account_index
             )
+        
+        # Execute the copy trade, capped by market depth and split into tranches
+        return self.trading_engine.execute_sized_polymarket_bet(
+            market_id=whale_trade.market_id,
+            outcome=whale_trade.outcome,
+            amount_usdc=our_amount_usdc,
+            reference_price=reference_price,
+            account_index=account_index
+        )
+    
+    async def _delayed_copy_trade(self, whale_trade: WhaleTrade, whale_config: WhaleConfig):
+        """Wait the configured delay, then copy the trade"""
+        root = tracer.current()  # The trade's trace, activated when this task was created
+        try:
+            # Add delay to avoid immediate copying (could be seen as front-running)
+            with tracer.span('execution_delay'):
+                await asyncio.sleep(self.trade_execution_delay)
             
-            logger.info(f"Copy trade executed successfully: {result.get('tx_hash', 'unknown')}")
+            # Configs are replaced on update; copy with the current one, if still enabled
+            whale_config = self.monitored_whales.get(whale_trade.whale_address, whale_config)
+            if not whale_config.enabled:
+                return
+            await self.execute_copy_trade(whale_trade, whale_config)
+        finally:
+            tracer.end(root)
+    
+    async def _poll_whale(self, whale_address: str, semaphore: asyncio.Semaphore):
+        """Poll one whale and hand any new trades to the copy executor"""
+        whale_config = self.monitored_whales.get(whale_address)
+        if not whale_config or not whale_config.enabled:
+            return
+        
+        async with semaphore:
+            try:
+                # Get new trades
+                poll_started_ns = time.time_ns()
+                new_trades = await self.check_whale_trades(whale_address)
+                
+                # Execute copy trades for new trades without blocking
+                # the polling loop; account lanes run them in parallel
+                detected_ns = time.time_ns()
+                for trade in new_trades:
+                    logger.info("New trade detected from %s: %s", whale_config.name, trade.market_id,
+                                extra={'trace_id': trade.trace_id, 'whale': whale_address})
+                    lag = max(0.0, self.clock() - trade.timestamp)
+                    DETECTION_LAG.observe(lag)
+                    
+                    # The trace starts at the whale's trade; lag and poll are its first hops
+                    traded_ns = min(detected_ns - int(lag * 1e9), poll_started_ns)
+                    root = tracer.start_trace(
+                        trade.trace_id, 'copy_trade', start_ns=traded_ns,
+                        whale=whale_address, whale_name=whale_config.name,
+                        market_id=trade.market_id, trade_hash=trade.trade_hash
+                    )
+                    tracer.record('detection_lag', traded_ns, poll_started_ns, parent=root)
+                    tracer.record('check_whale_trades', poll_started_ns, detected_ns, parent=root)
+                    self.trading_engine.event_bus.publish('whale_trade', {
+                        'whale_address': whale_address,
+                        'whale_name': whale_config.name,
+                        'market_id': trade.market_id,
+                        'asset': trade.asset,
+                        'outcome': trade.outcome,
+                        'amount_usdc': trade.amount_usdc,
+                        'price': trade.price
+                    })
+                    
+                    with tracer.activate(root):
+                        task = asyncio.create_task(self._delayed_copy_trade(trade, whale_config))
+                    self.copy_tasks.add(task)
+                    task.add_done_callback(self.copy_tasks.discard)
             
-        except Exception as e:
-            logger.error(f"Failed to execute copy trade: {e}")
+            except Exception as e:
+                logger.error(f"Error monitoring whale {whale_address}: {e}")
     
     async def monitor_whales(self):
         """Main monitoring loop"""
@@ -193,45 +476,82 @@ class WhaleMonitor:
         
         while self.running:
             try:
-                # Check each monitored whale
-                for whale_address, whale_config in self.monitored_whales.items():
-                    if not whale_config.enabled:
-                        continue
-                    
-                    try:
-                        # Get new trades
-                        new_trades = await self.check_whale_trades(whale_address)
-                        
-                        # Execute copy trades for new trades
-                        for trade in new_trades:
-                            logger.info(f"New trade detected from {whale_config.name}: {trade.market_id}")
-                            
-                            # Add delay to avoid immediate copying (could be seen as front-running)
-                            await asyncio.sleep(self.trade_execution_delay)
-                            
-                            # Execute copy trade
-                            await self.execute_copy_trade(trade, whale_config)
-                    
-                    except Exception as e:
-                        logger.error(f"Error monitoring whale {whale_address}: {e}")
+                cycle_started = time.monotonic()
+                
+                # Poll the whales the scheduler picked for this cycle
+                semaphore = asyncio.Semaphore(self.poll_concurrency)
+                batch = self.scheduler.next_batch(self.clock())
+                await asyncio.gather(*(self._poll_whale(address, semaphore) for address in batch))
                 
                 # Wait before next check
-                await asyncio.sleep(self.check_interval)
+                elapsed = time.monotonic() - cycle_started
+                await asyncio.sleep(max(0, self.check_interval - elapsed))
                 
             except Exception as e:
                 logger.error(f"Error in whale monitoring loop: {e}")
                 await asyncio.sleep(5)  # Short delay before retrying
+        
+        await self.api_client.close()
+        if self._record_file is not None:
+            self._record_file.close()
+            self._record_file = None
+    
+    def call_on_loop(self, fn: Callable[..., Any], *args) -> Any:
+        """Run fn on the monitoring loop and wait for its result
+
+        The polling loop iterates monitored_whales and the scheduler's tables,
+        so API and RPC threads hand their changes to it instead of making them
+        concurrently. Runs fn directly when already on the loop or when
+        monitoring has never been started.
+        """
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return fn(*args)
+        try:
+            if asyncio.get_running_loop() is loop:
+                return fn(*args)
+        except RuntimeError:
+            pass
+        
+        future = Future()
+        
+        def run():
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+        
+        loop.call_soon_threadsafe(run)
+        return future.result()
     
     def start_monitoring(self):
-        """Start the whale monitoring service"""
+        """Start the whale monitoring service (on the running event loop)"""
         if not self.running:
+            # Raises off the loop, before anything is marked as running
+            self.loop = asyncio.get_running_loop()
             self.running = True
             asyncio.create_task(self.monitor_whales())
+            asyncio.create_task(self.trading_engine.order_books.run())
+            if self.trading_engine.position_tracker:
+                asyncio.create_task(self.trading_engine.position_tracker.run())
+            if self.trading_engine.redemption_scheduler:
+                asyncio.create_task(self.trading_engine.redemption_scheduler.run())
+            if self.trading_engine.polymarket_client:
+                asyncio.create_task(self.trading_engine.polymarket_client.clob.run())
+                asyncio.create_task(self.trading_engine.polymarket_client.nonce_reconciler.run())
             logger.info("Whale monitoring started")
     
     def stop_monitoring(self):
         """Stop the whale monitoring service"""
         self.running = False
+        self.trading_engine.order_books.stop()
+        if self.trading_engine.position_tracker:
+            self.trading_engine.position_tracker.stop()
+        if self.trading_engine.redemption_scheduler:
+            self.trading_engine.redemption_scheduler.stop()
+        if self.trading_engine.polymarket_client:
+            self.trading_engine.polymarket_client.clob.stop()
+            self.trading_engine.polymarket_client.nonce_reconciler.stop()
         logger.info("Whale monitoring stopped")
     
     def get_monitoring_status(self) -> Dict:
@@ -239,14 +559,22 @@ class WhaleMonitor:
         return {
             'running': self.running,
             'monitored_whales': len(self.monitored_whales),
+            'whale_index': self.whale_index.get_stats(),
+            'scheduler': self.scheduler.get_metrics(),
+            'api_limits': self.api_client.get_stats(),
             'check_interval': self.check_interval,
+            'pending_copy_trades': len(self.copy_tasks),
+            'trade_history': self.trade_history.get_stats(),
+            'order_books': self.trading_engine.order_books.get_stats(),
+            'events': self.trading_engine.event_bus.get_stats(),
             'enabled_whales': [
                 {
                     'address': whale.address,
                     'name': whale.name,
                     'category': whale.category,
                     'position_percentage': whale.position_percentage,
-                    'enabled': whale.enabled
+                    'enabled': whale.enabled,
+                    'rank': whale.rank
                 }
                 for whale in self.monitored_whales.values()
             ]
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Whale Polling Scheduler
+Decides which whales to poll each monitoring cycle so that leaderboard-sized
+follow lists stay within the data-api request budget. Hot whales (top ranked
+or recently active) are polled every cycle, warm and cold whales
+progressively less often, and any whale is promoted to hot on activity.
+Warm and cold whales each have a reserved share of the per-cycle budget, so
+a long hot list cannot starve them.
+"""
+
+import os
+import time
+import logging
+from typing import Dict, List, Optional, Any, Callable
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+HOT = 'hot'
+WARM = 'warm'
+COLD = 'cold'
+TIER_ORDER = {HOT: 0, WARM: 1, COLD: 2}
+
+@dataclass
+class WhaleSchedule:
+    """Polling state for one whale"""
+    address: str
+    rank: Optional[int]
+    tier: str
+    added_at: float
+    last_polled: float = 0.0
+    last_activity: float = 0.0
+    next_due_cycle: int = 0
+
+class WhaleScheduler:
+    """Tiered polling scheduler under a global API budget"""
+
+    def __init__(self, check_interval: float):
+        """Initialize scheduler for a monitoring loop running every check_interval seconds"""
+        self.check_interval = check_interval
+
+        # Configuration
+        self.hot_rank = int(os.environ.get('WHALE_HOT_RANK', '50'))
+        self.warm_rank = int(os.environ.get('WHALE_WARM_RANK', '500'))
+        self.tier_every = {
+            HOT: 1,
+            WARM: int(os.environ.get('WHALE_WARM_EVERY_CYCLES', '4')),
+            COLD: int(os.environ.get('WHALE_COLD_EVERY_CYCLES', '16'))
+        }
+        self.hot_activity_window = float(os.environ.get('WHALE_HOT_ACTIVITY_WINDOW', '3600'))
+        self.api_budget_rps = float(os.environ.get('WHALE_API_BUDGET_RPS', '5'))
+        self.min_tier_share = float(os.environ.get('WHALE_MIN_TIER_SHARE', '0.1'))
+
+        # Optional live request rate (e.g. from an adaptive limiter) capping the budget
+        self.rate_provider: Optional[Callable[[], float]] = None
+
+        self.entries: Dict[str, WhaleSchedule] = {}
+        self.cycle = 0
+        self.last_batch_size = 0
+        self.last_deferred = 0
+        self.promotions = 0
+
+        logger.info(f"Whale scheduler initialized: budget {self.api_budget_rps} req/s, tiers every {self.tier_every} cycles")
+
+    def budget_per_cycle(self) -> int:
+        """Maximum number of whale polls per monitoring cycle"""
+        rate = self.api_budget_rps
+        if self.rate_provider:
+            rate = min(rate, self.rate_provider())
+        return max(1, int(rate * self.check_interval))
+
+    def tier_reserve(self, budget: int) -> int:
+        """Polls per cycle reserved for each of the warm and cold tiers"""
+        if self.min_tier_share <= 0 or budget < len(TIER_ORDER):
+            # Too small a budget to split: strict priority
+            return 0
+        return max(1, int(budget * self.min_tier_share))
+
+    def _base_tier(self, rank: Optional[int]) -> str:
+        if rank is None or rank <= self.hot_rank:
+            # Hand-added whales (no rank) are always followed closely
+            return HOT
+        if rank <= self.warm_rank:
+            return WARM
+        return COLD
+
+    def add(self, address: str, rank: Optional[int] = None, now: Optional[float] = None):
+        """Start scheduling a whale (due on the next cycle)"""
+        entry = self.entries.get(address)
+        if entry:
+            entry.rank = rank
+            entry.tier = min(entry.tier, self._base_tier(rank), key=TIER_ORDER.get)
+            return
+
+        self.entries[address] = WhaleSchedule(
+            address=address,
+            rank=rank,
+            tier=self._base_tier(rank),
+            added_at=now or time.time(),
+            next_due_cycle=self.cycle + 1
+        )
+
+    def remove(self, address: str):
+        """Stop scheduling a whale"""
+        self.entries.pop(address, None)
+
+    def _refresh_tier(self, entry: WhaleSchedule, now: float):
+        if entry.last_activity and now - entry.last_activity < self.hot_activity_window:
+            entry.tier = HOT
+        else:
+            entry.tier = self._base_tier(entry.rank)
+
+    def next_batch(self, now: Optional[float] = None) -> List[str]:
+        """Advance one cycle and return the whales to poll, most urgent first"""
+        now = now or time.time()
+        self.cycle += 1
+
+        due = []
+        for entry in self.entries.values():
+            self._refresh_tier(entry, now)
+            if entry.next_due_cycle <= self.cycle:
+                due.append(entry)
+
+        # Hot first, then the longest overdue, then the best ranked
+        def priority(entry: WhaleSchedule):
+            return (
+                TIER_ORDER[entry.tier],
+                entry.next_due_cycle,
+                entry.rank if entry.rank is not None else 0
+            )
+
+        due.sort(key=priority)
+
+        # Due warm and cold whales take their reserved share first; the rest
+        # of the budget goes by priority
+        budget = self.budget_per_cycle()
+        reserve = self.tier_reserve(budget)
+        batch = []
+        if reserve:
+            for tier in (WARM, COLD):
+                batch.extend([entry for entry in due if entry.tier == tier][:reserve])
+        chosen = set(id(entry) for entry in batch)
+        batch.extend([entry for entry in due if id(entry) not in chosen][:budget - len(batch)])
+        batch.sort(key=priority)
+        for entry in batch:
+            entry.next_due_cycle = self.cycle + self.tier_every[entry.tier]
+
+        self.last_batch_size = len(batch)
+        self.last_deferred = len(due) - len(batch)
+        if self.last_deferred:
+            logger.debug(f"Whale poll budget reached: {self.last_deferred} whales deferred")
+
+        return [entry.address for entry in batch]
+
+    def record_poll(self, address: str, had_activity: bool, now: Optional[float] = None):
+        """Record a completed poll, promoting the whale to hot on activity"""
+        entry = self.entries.get(address)
+        if not entry:
+            return
+
+        now = now or time.time()
+        entry.last_polled = now
+        if had_activity:
+            entry.last_activity = now
+            if entry.tier != HOT:
+                entry.tier = HOT
+                entry.next_due_cycle = self.cycle + 1
+                self.promotions += 1
+                logger.info(f"Promoted whale {address} to hot tier")
+
+    def get_metrics(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Coverage and staleness metrics for the follow list"""
+        now = now or time.time()
+        tiers = {HOT: 0, WARM: 0, COLD: 0}
+        staleness = []
+        covered = 0
+
+        for entry in self.entries.values():
+            tiers[entry.tier] += 1
+            age = now - (entry.last_polled or entry.added_at)
+            staleness.append(age)
+            target = self.tier_every[entry.tier] * self.check_interval
+            if entry.last_polled and age <= target * 1.5:
+                covered += 1
+
+        staleness.sort()
+        count = len(staleness)
+
+        def percentile(fraction: float) -> float:
+            return round(staleness[min(count - 1, int(count * fraction))], 1) if count else 0.0
+
+        return {
+            'tracked_whales': count,
+            'tiers': tiers,
+            'coverage': round(covered / count, 4) if count else 1.0,
+            'staleness_seconds': {
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'max': round(staleness[-1], 1) if count else 0.0
+            },
+            'cycle': self.cycle,
+            'api_budget_rps': self.api_budget_rps,
+            'polls_per_cycle_budget': self.budget_per_cycle(),
+            'polls_reserved_per_tier': self.tier_reserve(self.budget_per_cycle()),
+            'last_cycle_polls': self.last_batch_size,
+            'last_cycle_deferred': self.last_deferred,
+            'promotions': self.promotions
+        }
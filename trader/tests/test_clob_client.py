@@ -0,0 +1,52 @@
+import pytest
+from mock_clob import serve_in_thread
+from wallet_manager import WalletManager
+from clob_client import ClobClient, BUY
+
+TOKEN_ID = "71321045679252212594626385532706912750332728571942532289631379312455583992563"
+
+
+@pytest.fixture
+def clob(monkeypatch):
+    monkeypatch.setenv('WALLET_ACCOUNT_COUNT', '2')
+    monkeypatch.delenv('CLOB_API_KEY', raising=False)
+    server, url = serve_in_thread(page_size=4)
+    yield ClobClient(WalletManager(), host=url)
+    server.shutdown()
+
+
+def specs(count):
+    return [{'token_id': TOKEN_ID, 'side': BUY, 'price': round(0.30 + i * 0.01, 2), 'size': 10} for i in range(count)]
+
+
+def test_batch_is_accepted_on_every_account(clob):
+    for account_index in (0, 1):
+        results = clob.place_orders(specs(20), account_index=account_index)
+        assert len(results) == 20
+        assert all(result['success'] for result in results), results
+    assert len(clob.get_open_orders()) == 40
+
+
+def test_order_ids_are_order_hashes(clob):
+    order = clob.build_order(TOKEN_ID, BUY, 0.5, 10)
+    [result] = clob.post_orders([order])
+    assert result['orderID'] == '0x' + clob.signer.order_hash(order).hex()
+
+
+def test_accounts_hold_their_own_credentials(clob):
+    assert clob.get_credentials(0)['api_key'] != clob.get_credentials(1)['api_key']
+
+    # Account 0's key is refused for account 1's address
+    clob.credentials[1] = clob.get_credentials(0)
+    results = clob.place_orders(specs(2), account_index=1)
+    assert not any(result['success'] for result in results)
+
+
+def test_sync_follows_the_cursor(clob):
+    clob.place_orders(specs(10))
+    assert clob.sync_open_orders() == 10
+    assert len(clob.get_open_orders()) == 10
+
+    canceled = clob.cancel_orders([order['order_id'] for order in clob.get_open_orders()[:3]])
+    assert len(canceled['canceled']) == 3
+    assert clob.sync_all() == 7
@@ -0,0 +1,84 @@
+import os
+
+import pytest
+from order_book import OrderBookMirror
+from bench_order_book import reference_books, write_feed
+
+FEED = os.path.join(os.path.dirname(__file__), 'data', 'book_feed.jsonl')
+TOKEN_A = "71321045679252212594626385532706912750332728571942532289631379312455583992563"
+TOKEN_B = "52114319501245915516055106046884209969926127482827954674443846427813813222426"
+
+
+@pytest.fixture
+def mirror(monkeypatch):
+    monkeypatch.setenv('ORDER_BOOK_MAX_AGE_SECONDS', '30')
+    mirror = OrderBookMirror()
+    now = [1000.0]
+    mirror.clock = lambda: now[0]
+    mirror.now = now
+    assert mirror.replay(FEED) == 5
+    return mirror
+
+
+def test_replayed_feed_sets_best_bid_and_ask(mirror):
+    book = mirror.get(TOKEN_A)
+    assert book.best_bid() == 0.48
+    assert book.best_ask() == 0.55  # 0.52 was removed by a size 0 change
+    assert book.last_trade_price == 0.5
+
+    book = mirror.get(TOKEN_B)
+    assert (book.best_bid(), book.best_ask()) == (0.2, 0.31)
+    assert book.spread() == 0.11
+
+
+def test_replayed_feed_sets_depth(mirror):
+    book = mirror.get(TOKEN_A)
+    assert (len(book.bids), len(book.asks)) == (3, 1)
+    assert book.buy_depth(0.54) == (0.0, 0.0)
+    assert book.buy_depth(0.55) == pytest.approx((110.0, 200.0))
+
+    cost, tokens = mirror.get(TOKEN_B).buy_depth(0.35)
+    assert (cost, tokens) == pytest.approx((47.4, 140.0))
+
+
+def test_quiet_book_stays_fresh_while_the_feed_is_live(mirror):
+    # No update for TOKEN_B for minutes, but heartbeats keep arriving
+    for _ in range(10):
+        mirror.now[0] += 20
+        mirror.handle_message('PONG')
+    assert mirror.get(TOKEN_B) is not None
+    assert mirror.get_stats()['fresh_books'] == 2
+
+
+def test_books_go_stale_when_the_feed_goes_silent(mirror):
+    mirror.now[0] += 31
+    assert mirror.get(TOKEN_A) is None
+    assert mirror.get(TOKEN_A, fresh_only=False).best_bid() == 0.48
+    assert mirror.get_stats()['fresh_books'] == 0
+
+    mirror.handle_message('PONG')
+    assert mirror.get(TOKEN_A) is not None
+
+
+def test_books_are_stale_on_a_new_connection_until_resnapshotted(mirror):
+    mirror.connection += 1
+    mirror.handle_message('PONG')
+    assert mirror.get(TOKEN_A) is None
+
+    mirror.handle_message({'event_type': 'book', 'asset_id': TOKEN_A, 'bids': [{'price': '0.4', 'size': '5'}], 'asks': []})
+    assert mirror.get(TOKEN_A).best_bid() == 0.4
+    assert mirror.get(TOKEN_B) is None
+
+
+def test_seeded_feed_matches_reference_books(tmp_path):
+    path = str(tmp_path / 'feed.jsonl')
+    write_feed(path, seed=11)
+    mirror = OrderBookMirror()
+    mirror.replay(path)
+
+    for asset_id, (bids, asks) in reference_books(path).items():
+        book = mirror.get(asset_id)
+        assert book.bids.ticks == sorted(bids)
+        assert book.asks.ticks == sorted(asks)
+        assert book.bids.sizes == bids
+        assert book.asks.sizes == asks
@@ -0,0 +1,86 @@
+import asyncio
+from types import SimpleNamespace
+
+from data_api import ClosedPosition
+from whale_monitor import WhaleConfig, WhaleMonitor
+from whale_scheduler import WhaleScheduler
+
+WHALE = "0x1111111111111111111111111111111111111111"
+
+
+class FakeDataApi:
+    """Serves one whale's trades newest first, honouring limit and offset"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.rows = []
+        self.requests = []
+
+    def trade(self, ts):
+        self.rows.append(ClosedPosition(slug=f"market-{ts}", outcome='Yes', amount=1.0, avg_price=0.5,
+                                        timestamp=int(ts), tx_hash=f"0x{int(ts):064x}"))
+
+    async def get_json_conditional(self, url, params=None, decoder=None):
+        self.requests.append(dict(params))
+        visible = sorted((row for row in self.rows if row.timestamp <= self.clock()), key=lambda row: -row.timestamp)
+        offset = params.get('offset', 0)
+        return visible[offset:offset + params['limit']], True
+
+    def current_rate(self, url_or_host):
+        return 5.0
+
+
+def make_monitor(monkeypatch, **env):
+    for key, value in env.items():
+        monkeypatch.setenv(key, value)
+    engine = SimpleNamespace(redemption_scheduler=None, order_books=SimpleNamespace(track=lambda assets: None))
+    monitor = WhaleMonitor(engine, None)
+    now = [1_000_000.0]
+    monitor.clock = lambda: now[0]
+    monitor.api_client = FakeDataApi(monitor.clock)
+    monitor.add_whale(WhaleConfig(address=WHALE, name='whale', category='test', rank=10_000))
+    return monitor, now
+
+
+def test_cold_whale_poll_fetches_every_trade_since_last_poll(monkeypatch):
+    monitor, now = make_monitor(monkeypatch, WHALE_CHECK_INTERVAL='30000', WHALE_TRADE_PAGE_MAX='500')
+    assert asyncio.run(monitor.check_whale_trades(WHALE)) == []
+
+    # 40 trades over the 16 cycles a cold whale waits between polls
+    for i in range(40):
+        monitor.api_client.trade(now[0] + 1 + i * 10)
+    now[0] += 16 * monitor.check_interval
+    trades = asyncio.run(monitor.check_whale_trades(WHALE))
+
+    assert len(trades) == 40
+    assert monitor.api_client.requests[-1]['limit'] == 16 * monitor.trades_per_cycle
+
+
+def test_full_pages_are_followed_back_to_the_last_poll(monkeypatch):
+    monitor, now = make_monitor(monkeypatch, WHALE_CHECK_INTERVAL='30000', WHALE_TRADE_PAGE_MAX='10')
+    asyncio.run(monitor.check_whale_trades(WHALE))
+
+    for i in range(35):
+        monitor.api_client.trade(now[0] + 1 + i)
+    now[0] += monitor.check_interval * 2
+    trades = asyncio.run(monitor.check_whale_trades(WHALE))
+
+    assert len(trades) == 35
+    assert [request.get('offset', 0) for request in monitor.api_client.requests[1:]] == [0, 10, 20, 30]
+
+
+def test_hot_whales_cannot_starve_lower_tiers(monkeypatch):
+    monkeypatch.setenv('WHALE_API_BUDGET_RPS', '1')
+    scheduler = WhaleScheduler(check_interval=10)  # 10 polls per cycle
+    for i in range(50):
+        scheduler.add(f"hot-{i}")
+    for i in range(3):
+        scheduler.add(f"warm-{i}", rank=100)
+        scheduler.add(f"cold-{i}", rank=10_000)
+
+    polled = set()
+    for cycle in range(20):
+        polled.update(scheduler.next_batch(now=1000.0 + cycle))
+
+    assert {f"warm-{i}" for i in range(3)} <= polled
+    assert {f"cold-{i}" for i in range(3)} <= polled